@@ -1,16 +1,17 @@
 from dotenv import load_dotenv
 import os
-import obsidiantools.api as otools
-from src.utils import get_okr_data, get_okr_pivot_data, get_daily_notes_tasks, get_habit_tracker_data
-from src.note_utils import filter_daily_tasks
+from src.reload_utils import DataReloader
+from src.api_utils import serve_rows, get_task_parts, get_habit_parts, get_pivot_parts
+from src.metrics_utils import format_prometheus
+from src.shared_utils import SharedDataReader
+from src.watch_utils import VaultWatcher
 import pathlib
-from dash import Dash, html, dcc, callback, Output, Input, State
-import plotly.express as px
+from dash import Dash, html, dcc, ctx, Output, Input, State, ALL, no_update
+from flask import Response, jsonify, request
 import dash_bootstrap_components as dbc
-import datetime as dt
-import pandas as pd
-import pickle
-from src.ui_utils import get_okr_graph_data, get_habit_graph_data, display_page
+from src.ui_utils import FigureCache, get_figure_patch, get_okr_graph_data, \
+    get_okr_cycle_krs, get_okr_cycle_options, get_okr_grid_style, \
+    get_okr_trend_graph_data, get_habit_graph_data, get_view_range, display_page, get_page
 
 # Load the environment variables
 load_dotenv()
@@ -25,25 +26,37 @@ CRITERIA = [criterion.strip()
 START_DATES = [date.strip() for date in os.getenv(
     'START_DATES').split(',')]  # Start dates for each habit
 
+# Folder of the note cache snapshots, no snapshots if not set
+SNAPSHOT_LOC = os.getenv('SNAPSHOT_LOC')
+# How to watch the vault for changes: auto, inotify or poll, not watched if not set
+WATCH_VAULT = os.getenv('WATCH_VAULT')
+# Folder of the data shared by builder.py, the data is built in this process if not set
+SHARED_DATA_LOC = os.getenv('SHARED_DATA_LOC')
+# Folder for a cProfile profile of the first load & of the reloads triggered
+# with a PROFILE_NEXT file there, not profiled if not set
+PROFILE_LOC = os.getenv('PROFILE_LOC')
+
 ENV = os.getenv('ENV')
 PATH_PREFIX = os.getenv('PATH_PREFIX')
 
-# Generate the vault to use
-vault = otools.Vault(VAULT_LOC).connect().gather()
-
 # Get the data relevant for the OKR & Habit Trackers
-okr_data, okr_start_date, okr_end_date = get_okr_data(OKR_NOTE, vault)
-okrs = [k for k, v in sorted(
-    okr_data.items(), key=lambda item: item[1]['priority'])]
-okr_pivot_data = get_okr_pivot_data(
-    okr_data, okr_start_date, okr_end_date)
-habit_data = {habit: get_habit_tracker_data(habit, CRITERIA[i], dt.date.fromisoformat(
-    START_DATES[i]), vault) for i, habit in enumerate(HABITS)}
-
-# # For efficient testing & debugging - Disable in production
-# with open('all_data.pkl', 'rb') as f:
-#     vault, okr_data, okr_start_date, okr_end_date, okr_pivot_data, habit_data = \
-#         pickle.load(f)
+# Later reloads run in the background & only re-parse the changed notes
+if SHARED_DATA_LOC:
+    # Map the data built by builder.py, shared by all the gunicorn workers
+    reloader = SharedDataReader(SHARED_DATA_LOC)
+    data = reloader.data
+else:
+    reloader = DataReloader(VAULT_LOC, OKR_NOTE, HABITS, CRITERIA, START_DATES,
+                            SNAPSHOT_LOC, PROFILE_LOC)
+    data = reloader.load()
+if WATCH_VAULT and not SHARED_DATA_LOC:
+    # Reload just the changed notes, shortly after they are saved
+    watcher = VaultWatcher(VAULT_LOC, reloader.start, mode=WATCH_VAULT)
+    watcher.start()
+okrs = get_okr_cycle_krs(data['okr_data'])
+
+# Figures of the trackers, built once per data version
+figure_cache = FigureCache()
 
 # Create the Dash app
 app = Dash(__name__, external_stylesheets=[dbc.themes.BOOTSTRAP],
@@ -54,19 +67,19 @@ server = app.server
 
 # Define the layout
 okr_layout = html.Div(children=[
-    html.H1('OKR Tracker - ' + OKR_NOTE, style={'textAlign': 'center'}),
+    html.H1('OKR Tracker - ' + OKR_NOTE, id='okr-title', style={'textAlign': 'center'}),
     dcc.Link('Go to Habit Tracker', href=f'{PATH_PREFIX}/habit'),
+    # Any OKR note with dates in its front matter is a cycle, OKR_NOTE is shown first
+    dcc.Dropdown(get_okr_cycle_options(data['okr_cycles']), OKR_NOTE,
+                 id='okr-cycle-selection', clearable=False),
     html.Div(children=[
-        dcc.Graph(id='graph-content-' + okr,
-                  figure=get_okr_graph_data(okr, okr_data, okr_pivot_data))
-        for okr in okrs
-    ], style={'display': 'grid',
-              'gap': '0px',  # Spacing between items
-              # 2 columns
-              'grid-template-columns': " ".join(['1fr'] * ((len(okr_data.keys())+1)//2)),
-              'grid-auto-flow': 'row dense',  # Ensures children fill rows first
-              'align-items': 'start'  # Align items to the start of the row
-              })
+        # The figures are built when the page is first shown
+        dcc.Graph(id={'type': 'okr-graph', 'okr': okr}) for okr in okrs
+    ], id='okr-graphs', style=get_okr_grid_style(len(okrs))),
+    # Cycle & KRs of the graphs in the grid
+    dcc.Store(id='okr-graphs-shown', data=[OKR_NOTE, okrs]),
+    dcc.Store(id='okr-figures-version'),
+    dcc.Graph(id='okr-trend-graph'),
 ])
 
 habit_layout = html.Div(children=[
@@ -77,6 +90,7 @@ habit_layout = html.Div(children=[
     ]),
     dcc.Graph(id='graph-content-habit'),
     dcc.Graph(id='graph-content-habit-weekly'),
+    dcc.Store(id='habit-figures-version'),
 ])
 
 # sidebar = html.Div(
@@ -111,6 +125,10 @@ app.layout = html.Div([
     #          style={"margin-left": "220px", "padding": "20px"}),
     html.Button('Reload Data', id='reload-button', n_clicks=0,
                 className="btn btn-primary"),
+    html.Span(reloader.get_status(), id='reload-status', style={'marginLeft': '10px'}),
+    # Polls the reload status, & the data version to refresh the graphs after a reload
+    dcc.Interval(id='reload-interval', interval=1000),
+    dcc.Store(id='data-version', data=data['version']),
     html.Div(okr_layout, id='okr-container', style={'display': 'none'}),
     html.Div(habit_layout, id='habit-container', style={'display': 'none'})
 ], style={'fontFamily': 'Open Sans, sans-serif'})
@@ -126,35 +144,145 @@ def display_page_callback(pathname):
     return display_page(pathname.replace(PATH_PREFIX, '/'))
 
 
+# The graphs are patched with the changes since the data version they show
+@ app.callback(
+    [Output('graph-content-habit', 'figure'),
+     Output('graph-content-habit-weekly', 'figure'),
+     Output('habit-figures-version', 'data')],
+    [Input('dropdown-selection', 'value'),
+     Input('graph-content-habit', 'relayoutData'),
+     Input('url', 'pathname'),
+     Input('data-version', 'data')],
+    State('habit-figures-version', 'data')
+)
+def update_graph(value, relayout_data, pathname, version, shown):
+    data = reloader.data
+    if get_page(pathname.replace(PATH_PREFIX, '/')) != 'habit':
+        return no_update, no_update, no_update
+    # Zooming or panning the daily graph fetches the bars of the viewed range
+    view_range = shown[2] if shown is not None and shown[0] == value else None
+    if ctx.triggered_id == 'graph-content-habit':
+        view_range = get_view_range(relayout_data, view_range)
+    new_shown = [value, data['version'], view_range]
+    if shown == new_shown:
+        return no_update, no_update, no_update
+    figures = figure_cache.get(
+        data['version'], ('habit', value, str(view_range)),
+        lambda: get_habit_graph_data(value, data['habit_rollups'], view_range))
+    if shown is not None and shown[0] == value and shown[2] == view_range:
+        old_figures = figure_cache.peek(shown[1], ('habit', value, str(view_range))) \
+            or (None, None)
+        figures = [get_figure_patch(old_figure, figure)
+                   for old_figure, figure in zip(old_figures, figures)]
+    return *figures, new_shown
+
+
+# The grid only gets new graphs when the cycle or its KRs change
+@ app.callback(
+    [Output('okr-cycle-selection', 'options'),
+     Output('okr-title', 'children'),
+     Output('okr-graphs', 'children'),
+     Output('okr-graphs', 'style'),
+     Output('okr-graphs-shown', 'data')],
+    [Input('okr-cycle-selection', 'value'),
+     Input('data-version', 'data')],
+    State('okr-graphs-shown', 'data')
+)
+def update_okr_cycle(cycle, version, shown):
+    data = reloader.data
+    if cycle not in data['okr_cycles']:  # The OKR note was deleted
+        cycle = data['okr_note']
+    cycle_okrs = get_okr_cycle_krs(data['okr_cycles'][cycle]['okr_data'])
+    options = get_okr_cycle_options(data['okr_cycles'])
+    if shown == [cycle, cycle_okrs]:
+        return options, no_update, no_update, no_update, no_update
+    return options, 'OKR Tracker - ' + cycle, \
+        [dcc.Graph(id={'type': 'okr-graph', 'okr': okr}) for okr in cycle_okrs], \
+        get_okr_grid_style(len(cycle_okrs)), [cycle, cycle_okrs]
+
+
 @ app.callback(
-    [Output('graph-content-habit', 'figure', allow_duplicate=True),
-     Output('graph-content-habit-weekly', 'figure', allow_duplicate=True)],
-    Input('dropdown-selection', 'value'), prevent_initial_call='initial_duplicate'
+    [Output({'type': 'okr-graph', 'okr': ALL}, 'figure'),
+     Output('okr-trend-graph', 'figure'),
+     Output('okr-figures-version', 'data')],
+    [Input('url', 'pathname'),
+     Input('okr-graphs-shown', 'data'),
+     Input('data-version', 'data')],
+    State('okr-figures-version', 'data')
 )
-def update_graph(value):
-    return get_habit_graph_data(value, habit_data)
+def update_okr_graphs(pathname, graphs_shown, version, shown):
+    data = reloader.data
+    cycle_okrs = [output['id']['okr'] for output in ctx.outputs_list[0]]
+    cycle = graphs_shown[0] if graphs_shown[0] in data['okr_cycles'] else data['okr_note']
+    new_shown = [cycle, data['version'], cycle_okrs]
+    cycle_data = data['okr_cycles'][cycle]
+    # KRs no longer in the cycle are replaced by update_okr_cycle first
+    if get_page(pathname.replace(PATH_PREFIX, '/')) != 'okr' or shown == new_shown or \
+            any(okr not in cycle_data['okr_data'] for okr in cycle_okrs):
+        return [no_update] * len(cycle_okrs), no_update, no_update
+    figures = []
+    for okr in cycle_okrs:
+        figure = figure_cache.get(data['version'], ('okr', cycle, okr), lambda: get_okr_graph_data(
+            okr, cycle_data['okr_data'], cycle_data['okr_pivot_parts']))
+        # Graphs kept in the grid are patched, new ones get the whole figure
+        if shown is not None and shown[0] == cycle and shown[2] == cycle_okrs:
+            figure = get_figure_patch(
+                figure_cache.peek(shown[1], ('okr', cycle, okr)), figure)
+        figures.append(figure)
+    trend_figure = no_update
+    if shown is None or shown[1] != data['version']:
+        trend_figure = figure_cache.get(data['version'], ('okr-trend',), lambda: get_okr_trend_graph_data(
+            data['okr_cycles']))
+    return figures, trend_figure, new_shown
 
 
 @ app.callback(
-    [Output('graph-content-habit', 'figure', allow_duplicate=True),
-     Output('graph-content-habit-weekly', 'figure', allow_duplicate=True)] +
-    [Output('graph-content-' + okr, 'figure')
-     for okr in okr_pivot_data.okr.unique()],
-    [Input('reload-button', 'n_clicks'),
-     Input('dropdown-selection', 'value')], prevent_initial_call=True
+    Output('reload-status', 'children', allow_duplicate=True),
+    Input('reload-button', 'n_clicks'), prevent_initial_call=True
 )
-def reload_data(n_clicks, value):
-    global okr_data, okr_start_date, okr_end_date, okr_pivot_data, habit_data
-    vault = otools.Vault(VAULT_LOC).connect().gather()
-    okr_data, okr_start_date, okr_end_date = get_okr_data(OKR_NOTE, vault)
-    okr_pivot_data = get_okr_pivot_data(
-        okr_data, okr_start_date, okr_end_date)
-    habit_data = {habit: get_habit_tracker_data(
-        habit, CRITERIA[i], dt.date.fromisoformat(START_DATES[i]), vault)
-        for i, habit in enumerate(HABITS)}
-    return list(get_habit_graph_data(value, habit_data)) + \
-        [get_okr_graph_data(okr, okr_data, okr_pivot_data)
-         for okr in okr_pivot_data.okr.unique()]
+def reload_data(n_clicks):
+    # The graphs keep showing the current data until the reload is done
+    reloader.start()
+    return reloader.get_status()
+
+
+@ app.callback(
+    [Output('reload-status', 'children'),
+     Output('data-version', 'data')],
+    Input('reload-interval', 'n_intervals'),
+    State('data-version', 'data')
+)
+def update_reload_status(n_intervals, version):
+    new_version = reloader.data['version']
+    return reloader.get_status(), new_version if new_version != version else no_update
+
+
+# Timing metrics of the reloads, as JSON or ?format=prometheus for a Prometheus scraper
+@ server.route(f"{PATH_PREFIX or '/'}metrics")
+def metrics():
+    reload_metrics = reloader.get_metrics()
+    if request.args.get('format') == 'prometheus':
+        return Response(format_prometheus(reload_metrics),
+                        mimetype='text/plain; version=0.0.4')
+    return jsonify(reload_metrics)
+
+
+# Read-only JSON API for external consumers, paged with offset & limit, filtered
+# with cycle, tracker, status, start & end, and answered with a 304 to the
+# clients that already have the data version
+@ server.route(f"{PATH_PREFIX or '/'}api/tasks")
+def api_tasks():
+    return serve_rows(request, reloader.data, get_task_parts)
+
+
+@ server.route(f"{PATH_PREFIX or '/'}api/habits")
+def api_habits():
+    return serve_rows(request, reloader.data, get_habit_parts)
+
+
+@ server.route(f"{PATH_PREFIX or '/'}api/okr-pivot")
+def api_okr_pivot():
+    return serve_rows(request, reloader.data, get_pivot_parts)
 
 
 # Run the app
@@ -0,0 +1,78 @@
+"""Benchmark of the parallel note parsing against the serial one, on a cold load
+of a large synthetic vault.
+
+The task table of every parallel run must first be identical to the serial one.
+
+Usage:
+    python -m benchmarks.bench_parallel [--notes N] [--workers N [N ...]] [--dirpath DIRPATH]
+"""
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+import numpy as np
+from benchmarks.synthetic_vault import make_vault
+
+
+def load_table(vault_loc, workers):
+    """Cold load the task table of a vault.
+
+    Args:
+        vault_loc (Path): Path of the vault folder.
+        workers (int): Number of parsing processes.
+
+    Returns:
+        tuple: Time in seconds of the note cache refresh & the task table.
+    """
+    # The src modules read the vault location from the environment on import
+    from src import cache_utils
+    from src.vault_utils import Vault
+
+    cache_utils.PARSE_WORKERS = workers
+    vault = Vault(vault_loc)
+    start = time.perf_counter()
+    note_cache = cache_utils.NoteCache()
+    note_cache.refresh(vault)
+    return time.perf_counter() - start, note_cache.get_table()
+
+
+def check_identical(expected, actual):
+    """Check that two task tables have the same rows.
+
+    Args:
+        expected (TaskTable): Task table of the serial load.
+        actual (TaskTable): Task table of a parallel load.
+    """
+    for name, column in expected.columns.items():
+        if column.dtype.kind in 'fM':
+            same = np.array_equal(column, actual.columns[name], equal_nan=True)
+        else:
+            same = np.array_equal(column, actual.columns[name])
+        if not same:
+            raise AssertionError(f"Serial & parallel loads differ in the {name} column")
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--notes', type=int, default=20000)
+    arg_parser.add_argument('--workers', type=int, nargs='+',
+                            default=sorted({2, 4, os.cpu_count() or 1}))
+    arg_parser.add_argument('--dirpath', default=None,
+                            help="Folder for the synthetic vault, a temporary folder by default")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dirpath:
+        vault_loc = pathlib.Path(args.dirpath or tmp_dirpath) / 'vault'
+        os.environ['VAULT_LOC'] = str(vault_loc)
+        os.environ['DAILY_NOTES_LOC'] = str(vault_loc / 'journals')
+        make_vault(vault_loc, args.notes)
+
+        serial_time, serial_table = load_table(vault_loc, 1)
+        print(f"{os.cpu_count()} CPUs, {args.notes} notes, {len(serial_table)} tasks")
+        print(f"Serial: {serial_time * 1000:.0f} ms")
+        for workers in args.workers:
+            parallel_time, parallel_table = load_table(vault_loc, workers)
+            check_identical(serial_table, parallel_table)
+            print(f"{workers} workers: {parallel_time * 1000:.0f} ms, "
+                  f"speedup {serial_time / parallel_time:.2f}x (identical output)")
@@ -0,0 +1,91 @@
+"""Benchmark of the line-based task parser against the Markdown -> HTML ->
+BeautifulSoup parser it replaced.
+
+Both parsers must first give the same tasks, with the same nesting, for every
+note in the vault (the raw_text of the tasks is not compared, the HTML parser
+stores the text of the whole list item in it). The parsers differ by design on
+the loose lists & the text after a nested list, see parse_text_for_tasks.
+
+Usage:
+    python -m benchmarks.bench_parser [VAULT_LOC] [--repeat N]
+"""
+import argparse
+import os
+import time
+from dotenv import load_dotenv
+from src.note_utils import parse_text_for_tasks
+from src.vault_utils import Vault
+from benchmarks.html_parser import parse_text_for_tasks_html
+
+
+def get_task_records(task_tree):
+    """Get the tasks of a task tree in document order, for comparing task trees.
+
+    Args:
+        task_tree (Tree): Tasks tree object.
+
+    Returns:
+        list: (depth, task details without the raw_text) tuples.
+    """
+    return [(task_tree.depth(nid), {k: v for k, v in task_tree[nid].data.items()
+                                    if k != 'raw_text'})
+            for nid in task_tree.expand_tree(sorting=False) if nid != task_tree.root]
+
+
+def check_conformance(texts):
+    """Check that both parsers give the same tasks for every note.
+
+    Args:
+        texts (dict): Markdown text of the notes, keyed by the note name.
+
+    Returns:
+        int: Number of tasks in the notes.
+    """
+    n_tasks = 0
+    for note, text in texts.items():
+        expected = get_task_records(parse_text_for_tasks_html(text, note))
+        actual = get_task_records(parse_text_for_tasks(text, note))
+        if actual != expected:
+            raise AssertionError(f"Parsers disagree on '{note}':\n"
+                                 f"html: {expected}\nline: {actual}")
+        n_tasks += len(actual)
+    return n_tasks
+
+
+def time_parser(parser, texts, repeat):
+    """Get the best time of parsing all the notes with a parser.
+
+    Args:
+        parser (function): Parser function, taking the text & name of a note.
+        texts (dict): Markdown text of the notes, keyed by the note name.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        float: Best time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for note, text in texts.items():
+            parser(text, note)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('vault_loc', nargs='?', default=os.getenv('VAULT_LOC'))
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    vault = Vault(args.vault_loc)
+    texts = {note: vault.get_source_text(note) for note in vault.md_file_index}
+    n_tasks = check_conformance(texts)
+    print(f"Conformance: OK ({len(texts)} notes, {n_tasks} tasks)")
+
+    html_time = time_parser(parse_text_for_tasks_html, texts, args.repeat)
+    line_time = time_parser(parse_text_for_tasks, texts, args.repeat)
+    print(f"HTML parser: {html_time * 1000:.1f} ms")
+    print(f"Line parser: {line_time * 1000:.1f} ms")
+    print(f"Speedup: {html_time / line_time:.1f}x")
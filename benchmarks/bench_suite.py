@@ -0,0 +1,292 @@
+"""End-to-end benchmark of the dashboard stages on a synthetic vault, with
+machine-readable results to compare across commits.
+
+Each stage (vault scan, note parsing, task filtering, OKR pivot, habit data,
+figure build & Dash callback round trips) is timed over a few runs, then run
+once more under tracemalloc for its peak memory. The results are written as
+JSON, and compared stage by stage with the results of another commit if given.
+
+Usage:
+    python -m benchmarks.bench_suite [--notes N] [--days N] [--cycles N] [--repeat N]
+        [--habit-days N] [--end-date YYYY-MM-DD] [--output FILE] [--baseline FILE]
+        [--threshold X]
+"""
+import argparse
+import datetime as dt
+import json
+import os
+import pathlib
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from benchmarks.synthetic_vault import make_vault
+
+RESULTS_VERSION = 1  # Version of the results format
+HABITS = ['#gratitude', 'mindful breathing', 'jogging']
+HABIT_CRITERIA = ['count', 'duration', 'duration']
+
+
+def get_stages(vault_loc, daily_notes_loc, okr_note, start_date, end_date):
+    """Get the stages of a cold load of the dashboard data, in order.
+
+    Each stage reads the results of the previous ones from a shared state dict.
+    As in the app, only the daily notes within the dates of the habits & of
+    the OKR cycles are parsed.
+
+    Args:
+        vault_loc (Path): Path of the vault folder.
+        daily_notes_loc (Path): Path of the daily notes folder.
+        okr_note (str): Name of the OKR note.
+        start_date (datetime.date): Start date of the habits.
+        end_date (datetime.date): Date of the last daily note.
+
+    Returns:
+        list: (stage name, function of the state) tuples.
+    """
+    # The src modules read the vault location from the environment on import
+    from src.vault_utils import Vault
+    from src.cache_utils import NoteCache
+    from src.utils import get_daily_notes_tasks, get_okr_data, get_okr_pivot_data, \
+        split_okr_pivot_data, get_habit_tracker_data, get_habit_rollups
+    from src.ui_utils import get_okr_graph_data, get_habit_graph_data
+
+    def scan(state):
+        state['vault'] = Vault(vault_loc)
+        state['vault'].get_notes_in(daily_notes_loc)
+
+    def parse(state):
+        state['note_cache'] = NoteCache()
+        state['note_cache'].refresh(state['vault'], [(start_date, end_date)])
+
+    def filter_tasks(state):
+        state['daily_notes_tasks'] = get_daily_notes_tasks(
+            state['note_cache'], start_date, end_date)
+        state['okr'] = get_okr_data(okr_note, state['vault'], state['note_cache'])
+
+    def pivot(state):
+        okr_data, okr_start_date, okr_end_date = state['okr']
+        state['okr_pivot_parts'] = split_okr_pivot_data(
+            get_okr_pivot_data(okr_data, okr_start_date, okr_end_date))
+
+    def habits(state):
+        state['habit_rollups'] = {habit: get_habit_rollups(get_habit_tracker_data(
+            habit, HABIT_CRITERIA[i], start_date, state['daily_notes_tasks']))
+            for i, habit in enumerate(HABITS)}
+
+    def figures(state):
+        okr_data = state['okr'][0]
+        for okr in okr_data.keys():
+            get_okr_graph_data(okr, okr_data, state['okr_pivot_parts'])
+        for habit in HABITS:
+            get_habit_graph_data(habit, state['habit_rollups'])
+
+    return [('scan', scan), ('parse', parse), ('filter', filter_tasks),
+            ('pivot', pivot), ('habits', habits), ('figures', figures)]
+
+
+def get_callback_stages():
+    """Get the Dash callback round trips, through the test client of the app.
+
+    Every run starts with an empty figure cache, so the figures are built again.
+
+    Returns:
+        list: (stage name, function of the state) tuples.
+    """
+    import app
+    from src.ui_utils import FigureCache
+
+    client = app.server.test_client()
+    prefix = app.PATH_PREFIX or '/'
+    okrs = app.okrs
+    okr_request = {
+        'output': '..{"okr":["ALL"],"type":"okr-graph"}.figure...okr-trend-graph.figure'
+                  '...okr-figures-version.data..',
+        'outputs': [[{'id': {'type': 'okr-graph', 'okr': okr}, 'property': 'figure'}
+                     for okr in okrs],
+                    {'id': 'okr-trend-graph', 'property': 'figure'},
+                    {'id': 'okr-figures-version', 'property': 'data'}],
+        'inputs': [{'id': 'url', 'property': 'pathname', 'value': prefix + 'okr'},
+                   {'id': 'okr-graphs-shown', 'property': 'data', 'value': [app.OKR_NOTE, okrs]},
+                   {'id': 'data-version', 'property': 'data', 'value': 1}],
+        'state': [{'id': 'okr-figures-version', 'property': 'data', 'value': None}],
+        'changedPropIds': ['url.pathname']}
+    habit_request = {
+        'output': '..graph-content-habit.figure...graph-content-habit-weekly.figure'
+                  '...habit-figures-version.data..',
+        'outputs': [{'id': 'graph-content-habit', 'property': 'figure'},
+                    {'id': 'graph-content-habit-weekly', 'property': 'figure'},
+                    {'id': 'habit-figures-version', 'property': 'data'}],
+        'inputs': [{'id': 'dropdown-selection', 'property': 'value', 'value': app.HABITS[-1]},
+                   {'id': 'graph-content-habit', 'property': 'relayoutData', 'value': None},
+                   {'id': 'url', 'property': 'pathname', 'value': prefix + 'habit'},
+                   {'id': 'data-version', 'property': 'data', 'value': 1}],
+        'state': [{'id': 'habit-figures-version', 'property': 'data', 'value': None}],
+        'changedPropIds': ['dropdown-selection.value']}
+
+    def post(request):
+        app.figure_cache = FigureCache()
+        response = client.post(prefix + '_dash-update-component', json=request)
+        if response.status_code != 200:
+            raise RuntimeError(f"Callback failed ({response.status_code}): "
+                               f"{response.get_data(as_text=True)[:200]}")
+
+    return [('okr callback', lambda state: post(okr_request)),
+            ('habit callback', lambda state: post(habit_request))]
+
+
+def run_stages(stages, repeat):
+    """Time the stages over some runs, then measure their peak memory in one more run.
+
+    Args:
+        stages (list): (stage name, function of the state) tuples.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        dict: Times of the runs in seconds & peak memory in bytes of each stage.
+    """
+    results = {name: {'runs': []} for name, _ in stages}
+    for _ in range(repeat):
+        state = {}
+        for name, stage in stages:
+            start = time.perf_counter()
+            stage(state)
+            results[name]['runs'].append(time.perf_counter() - start)
+
+    # tracemalloc slows the stages down, so it only runs untimed
+    state = {}
+    tracemalloc.start()
+    for name, stage in stages:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        stage(state)
+        results[name]['peak_bytes'] = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    for result in results.values():
+        result['seconds'] = min(result['runs'])
+        result['median_seconds'] = statistics.median(result['runs'])
+    return results
+
+
+def get_commit():
+    """Get the commit of the working tree, marked if it has local changes.
+
+    Returns:
+        str: Commit hash, None if not in a git repository.
+    """
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True,
+                                text=True, check=True).stdout.strip()
+        changes = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                 capture_output=True, text=True, check=True).stdout
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ('-dirty' if changes else '')
+
+
+def compare_results(baseline, results, threshold):
+    """Print the ratio of the time & peak memory of each stage to a baseline.
+
+    Args:
+        baseline (dict): Results of another commit.
+        results (dict): Results of this run.
+        threshold (float): Ratio above which a stage is a regression.
+
+    Returns:
+        list: Names of the regressed stages.
+    """
+    if baseline['vault'] != results['vault']:
+        print("Warning: the baseline was run on another vault")
+    regressions = []
+    for name, result in results['stages'].items():
+        base = baseline['stages'].get(name)
+        if base is None:
+            print(f"{name:>15}: new stage")
+            continue
+        time_ratio = result['seconds'] / max(base['seconds'], 1e-9)
+        memory_ratio = result['peak_bytes'] / max(base['peak_bytes'], 1)
+        regressed = time_ratio > threshold or memory_ratio > threshold
+        if regressed:
+            regressions.append(name)
+        print(f"{name:>15}: time {time_ratio:.2f}x, peak memory {memory_ratio:.2f}x"
+              + (" REGRESSION" if regressed else ""))
+    return regressions
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--notes', type=int, default=20000)
+    arg_parser.add_argument('--days', type=int, default=3650)
+    arg_parser.add_argument('--habit-days', type=int, default=None,
+                            help="Days tracked by the habits, all the days by default")
+    arg_parser.add_argument('--cycles', type=int, default=4)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--end-date', type=dt.date.fromisoformat, default=None,
+                            help="Date of the last daily note, today by default")
+    arg_parser.add_argument('--repeat', type=int, default=3)
+    arg_parser.add_argument('--dirpath', default=None,
+                            help="Folder for the synthetic vault, a temporary folder by default")
+    arg_parser.add_argument('--output', default=None,
+                            help="File for the JSON results, printed if not set")
+    arg_parser.add_argument('--baseline', default=None,
+                            help="JSON results of another commit to compare with")
+    arg_parser.add_argument('--threshold', type=float, default=1.25,
+                            help="Time or memory ratio to the baseline of a regression")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dirpath:
+        vault_loc = pathlib.Path(args.dirpath or tmp_dirpath) / 'vault'
+        daily_notes_loc = vault_loc / 'journals'
+        okr_note = make_vault(vault_loc, args.notes, args.days, args.seed,
+                              args.cycles, args.end_date)
+        end_date = args.end_date or dt.date.today()
+        start_date = end_date - dt.timedelta(days=(args.habit_days or args.days) - 1)
+        # Set before loading the .env file of the app, which does not override them
+        os.environ.update({
+            'VAULT_LOC': str(vault_loc), 'DAILY_NOTES_LOC': str(daily_notes_loc),
+            'OKR_NOTE': okr_note, 'HABITS': ', '.join(HABITS),
+            'CRITERIA': ', '.join(HABIT_CRITERIA),
+            'START_DATES': ', '.join([start_date.isoformat()] * len(HABITS)),
+            'SNAPSHOT_LOC': '', 'WATCH_VAULT': '', 'SHARED_DATA_LOC': ''})
+        for name, value in [('CRITERIA_STORY_POINTS', 'story-points'),
+                            ('CRITERIA_COUNT', 'count'), ('CRITERIA_DURATION', 'duration')]:
+            os.environ.setdefault(name, value)
+
+        stage_results = run_stages(
+            get_stages(vault_loc, daily_notes_loc, okr_note, start_date, end_date), args.repeat)
+        start = time.perf_counter()
+        callback_stages = get_callback_stages()  # Loads the data of the app
+        app_load_seconds = time.perf_counter() - start
+        stage_results.update(run_stages(callback_stages, args.repeat))
+
+    results = {
+        'version': RESULTS_VERSION,
+        'commit': get_commit(),
+        'created_at': dt.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'vault': {'notes': args.notes, 'days': args.days, 'cycles': args.cycles,
+                  'habit_days': args.habit_days, 'seed': args.seed,
+                  'end_date': args.end_date.isoformat() if args.end_date else None},
+        'stages': stage_results,
+        'app_load_seconds': app_load_seconds,
+        # ru_maxrss is in KiB on Linux
+        'max_rss_bytes': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024,
+    }
+    for name, result in stage_results.items():
+        print(f"{name:>15}: {result['seconds'] * 1000:9.1f} ms, "
+              f"peak {result['peak_bytes'] / 2**20:7.1f} MB", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w', encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding="utf-8") as f:
+            baseline = json.load(f)
+        if compare_results(baseline, results, args.threshold):
+            sys.exit(1)
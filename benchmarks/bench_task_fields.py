@@ -0,0 +1,161 @@
+"""Benchmark of the compiled & cached task field extraction of convert_to_task
+& read_event against the extraction it replaced.
+
+Both must first give the same task details & events for every task in the
+vault, or fail with the same kind of error. The edge cases (comments, quotes,
+escapes, fields & malformed times) are checked by tests/test_task_fields.py.
+The timed runs start with empty caches, so the caches only help with the
+titles repeated within a run, e.g. the habits of the daily notes.
+
+Usage:
+    python -m benchmarks.bench_task_fields [VAULT_LOC] [--daily-notes-loc DIR] [--repeat N]
+"""
+import argparse
+import contextlib
+import datetime as dt
+import io
+import math
+import os
+import pathlib
+import time
+from dotenv import load_dotenv
+from src.note_utils import parse_text_for_tasks, render_inline_text, convert_to_task, \
+    get_title_fields
+from src.task_utils import read_event, get_event_times, get_event_date
+from src.vault_utils import Vault
+from benchmarks.reference_fields import convert_to_task_reference, read_event_reference
+
+def get_inputs(vault, daily_notes_loc):
+    """Get the arguments of the convert_to_task & read_event calls of a load.
+
+    Args:
+        vault (Vault): The vault object.
+        daily_notes_loc (Path): Path of the daily notes folder.
+
+    Returns:
+        tuple: convert_to_task arguments & read_event arguments, as lists of tuples.
+    """
+    daily_notes = set(vault.get_notes_in(daily_notes_loc))
+    task_args, event_args = [], []
+    for note in vault.md_file_index:
+        task_tree = parse_text_for_tasks(vault.get_source_text(note), note)
+        try:
+            date = dt.date.fromisoformat(note.split()[0]) if note in daily_notes else None
+        except (ValueError, IndexError):
+            date = None
+        for nid in task_tree.expand_tree(sorting=False):
+            if nid == task_tree.root:
+                continue
+            task = task_tree[nid].data
+            task_args.append((render_inline_text(task['raw_text']), note, task['raw_text']))
+            if date is not None:
+                event_args.append((date.isoformat(), task['title']))
+    return task_args, event_args
+
+
+def get_result(function, args):
+    """Get the result of a call, or the type of its error.
+
+    Args:
+        function (function): Function to call.
+        args (tuple): Arguments of the call.
+
+    Returns:
+        object: The task details, the event dict or the error type.
+    """
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):  # Errors print the task
+            result = function(*args)
+    except Exception as e:  # pylint: disable=broad-except
+        return type(e)
+    return result.data if hasattr(result, 'data') else result
+
+
+def is_same(expected, actual):
+    """Check that two results are equal, NaN included, with the same types.
+
+    Args:
+        expected (object): Result of the reference.
+        actual (object): Result of the new extraction.
+
+    Returns:
+        bool: True if the results are the same.
+    """
+    if isinstance(expected, float) and isinstance(actual, float) and \
+            math.isnan(expected) and math.isnan(actual):
+        return True
+    if type(expected) is not type(actual):
+        return False
+    if isinstance(expected, dict):
+        return list(expected) == list(actual) and \
+            all(is_same(expected[key], actual[key]) for key in expected)
+    if isinstance(expected, (list, tuple)):
+        return len(expected) == len(actual) and all(map(is_same, expected, actual))
+    return expected == actual
+
+
+def check_conformance(reference, function, calls):
+    """Check that a function gives the same results as its reference.
+
+    Args:
+        reference (function): Reference function.
+        function (function): New function.
+        calls (list): Arguments of the calls.
+    """
+    for args in calls:
+        expected, actual = get_result(reference, args), get_result(function, args)
+        if not is_same(expected, actual):
+            raise AssertionError(f"{function.__name__} disagrees on {args!r}:\n"
+                                 f"reference: {expected}\nnew: {actual}")
+
+
+def clear_caches():
+    """Empty the caches of the field extraction."""
+    for cached_function in [get_title_fields, get_event_times, get_event_date]:
+        cached_function.cache_clear()
+
+
+def time_calls(function, calls, repeat):
+    """Get the best time of a function over all the calls, starting with empty caches.
+
+    Args:
+        function (function): Function to time.
+        calls (list): Arguments of the calls, which must not fail.
+        repeat (int): Number of timed runs.
+
+    Returns:
+        float: Best time in seconds.
+    """
+    times = []
+    for _ in range(repeat):
+        clear_caches()
+        start = time.perf_counter()
+        for args in calls:
+            function(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == '__main__':
+    load_dotenv()
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('vault_loc', nargs='?', default=os.getenv('VAULT_LOC'))
+    arg_parser.add_argument('--daily-notes-loc', default=os.getenv('DAILY_NOTES_LOC'))
+    arg_parser.add_argument('--repeat', type=int, default=5)
+    args = arg_parser.parse_args()
+
+    vault = Vault(args.vault_loc)
+    task_args, event_args = get_inputs(vault, pathlib.Path(args.daily_notes_loc))
+    check_conformance(convert_to_task_reference, convert_to_task, task_args)
+    check_conformance(read_event_reference, read_event, event_args)
+    print(f"Conformance: OK ({len(task_args)} tasks, {len(event_args)} daily tasks)")
+
+    for name, reference, function, calls in [
+            ('convert_to_task', convert_to_task_reference, convert_to_task, task_args),
+            ('read_event', read_event_reference, read_event, event_args)]:
+        calls = [call for call in calls if not isinstance(get_result(reference, call), type)]
+        reference_time = time_calls(reference, calls, args.repeat)
+        new_time = time_calls(function, calls, args.repeat)
+        print(f"{name}: {reference_time / len(calls) * 1e6:.2f} us -> "
+              f"{new_time / len(calls) * 1e6:.2f} us per call, "
+              f"speedup {reference_time / new_time:.1f}x")
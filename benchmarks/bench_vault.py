@@ -0,0 +1,77 @@
+"""Benchmark of the vault scan & cold load on synthetic vaults of growing size.
+
+The time per note of each stage should stay flat as the vault grows, up to
+20k notes by default.
+
+Usage:
+    python -m benchmarks.bench_vault [--sizes N [N ...]] [--dirpath DIRPATH]
+"""
+import argparse
+import os
+import pathlib
+import tempfile
+import time
+from benchmarks.synthetic_vault import make_vault
+
+
+def time_stages(vault_loc, daily_notes_loc):
+    """Time the stages of a cold load of a vault.
+
+    Args:
+        vault_loc (Path): Path of the vault folder.
+        daily_notes_loc (Path): Path of the daily notes folder.
+
+    Returns:
+        dict: Time in seconds of each stage.
+    """
+    # The src modules read the vault location from the environment on import
+    from src.vault_utils import Vault
+    from src.cache_utils import NoteCache
+    from src.utils import get_daily_notes_tasks
+
+    times = {}
+    start = time.perf_counter()
+    vault = Vault(vault_loc)
+    times['scan'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vault.get_notes_in(daily_notes_loc)
+    times['journals'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    note_cache = NoteCache()
+    note_cache.refresh(vault)
+    times['refresh'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    get_daily_notes_tasks(note_cache)
+    times['daily tasks'] = time.perf_counter() - start
+    return times
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('--sizes', type=int, nargs='+',
+                            default=[2500, 5000, 10000, 20000])
+    arg_parser.add_argument('--dirpath', default=None,
+                            help="Folder for the synthetic vault, a temporary folder by default")
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dirpath:
+        vault_loc = pathlib.Path(args.dirpath or tmp_dirpath) / 'vault'
+        daily_notes_loc = vault_loc / 'journals'
+        os.environ['VAULT_LOC'] = str(vault_loc)
+        os.environ['DAILY_NOTES_LOC'] = str(daily_notes_loc)
+
+        per_note = {}
+        for n_notes in args.sizes:
+            make_vault(vault_loc, n_notes)
+            times = time_stages(vault_loc, daily_notes_loc)
+            per_note[n_notes] = sum(times.values()) / n_notes
+            print(f"{n_notes:>6} notes: " + ", ".join(
+                f"{stage} {t * 1000:.1f} ms" for stage, t in times.items()) +
+                f" ({per_note[n_notes] * 1e6:.0f} us/note)")
+
+    smallest, largest = min(per_note), max(per_note)
+    print(f"Time per note, {largest} vs {smallest} notes: "
+          f"{per_note[largest] / per_note[smallest]:.2f}x")
@@ -0,0 +1,68 @@
+# The Markdown -> HTML -> BeautifulSoup task parser that parse_text_for_tasks
+# replaced, kept as the reference for the conformance check in bench_parser.py
+from markdown_it import MarkdownIt
+from bs4 import BeautifulSoup
+from treelib import Tree
+from src.note_utils import convert_to_task, filter_okr_tasks
+
+md = MarkdownIt()
+
+
+def parse_text_for_tasks_html(text, note, okr=None):
+    """Parse the text of a note to get all its tasks, through its rendered HTML.
+
+    Args:
+        text (str): Markdown text of the note.
+        note (str): Name of the note in the vault.
+        okr (str, optional): The OKR tag used in the tasks to mark for a specific OKR.
+            Defaults to None.
+
+    Returns:
+        Tree: Tasks tree object containing the tasks from the note.
+    """
+    html = md.render(text)
+    soup = BeautifulSoup(html, 'html.parser')
+    task_tree = Tree()
+    task_tree.create_node("Root", 'root')
+    parse_html_for_tasks(soup, task_tree, 'root', note)
+    if okr is not None:
+        return filter_okr_tasks(task_tree, okr)
+    return task_tree
+
+
+def parse_html_for_tasks(elem, task_tree, root, note):
+    """Recursively filters the element tree to retain only the required tasks
+    while retaining the tree structure.
+
+    Args:
+        elem (BeautifulSoup): A HTML element tree that needs to be parsed for tasks.
+        task_tree (Tree): A basic Tree object with just the master / root node.
+        root (str): Identifier of the root node in the task tree.
+        note (str): Name of the note in the vault.
+    """
+    children = elem.findChildren(recursive=False)
+
+    # It is a todo/task if it is a Checkbox
+    if elem.name == "li" and elem.text.startswith('['):
+        task = convert_html_to_task(elem.__copy__(), note)
+        task_tree.add_node(task, root)
+        root = task.identifier
+    for child in children:
+        parse_html_for_tasks(child, task_tree, root, note)
+
+
+def convert_html_to_task(elem, note):
+    """Converts a HTML list item element into a task object.
+
+    Args:
+        elem (Tag): A HTML element to be converted into a task.
+        note (str): Name of the note in the vault containing elem.
+
+    Returns:
+        Node: Node object containing the task details.
+    """
+    raw_text = elem.text
+    for child in elem.find_all():
+        if child.name not in ['a', 'span', 'strong']:
+            child.decompose()
+    return convert_to_task(elem.get_text(), note, raw_text)
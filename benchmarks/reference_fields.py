@@ -0,0 +1,143 @@
+# The task field extraction that convert_to_task & read_event replaced, kept as
+# the reference for the conformance check in bench_task_fields.py
+import datetime as dt
+import json
+import re
+from treelib import Node
+from src.note_utils import STATUS_MAP, PRIORITY_MAP, DATES_MAP
+
+
+def convert_to_task_reference(text, note, raw_text=None):
+    """Converts the text of a checkbox list item into a task object, as before the
+    title fields were cached.
+
+    Args:
+        text (str): Rendered text of the list item, starting with its checkbox.
+        note (str): Name of the note in the vault containing the list item.
+        raw_text (str, optional): Markdown source of the list item. Defaults to text.
+
+    Raises:
+        ValueError: If the task text contains multiple task types.
+
+    Returns:
+        Node: Node object containing the task details.
+    """
+    task_node = Node()
+    task = {}
+    task['raw_text'] = text if raw_text is None else raw_text  # storing raw text
+
+    # Extract task title
+    md_comment_pattern = r'%%(.+)[%%]?'
+    text = re.sub(md_comment_pattern, '', text, flags=re.DOTALL)
+    task['title'] = text[3:].strip()
+
+    task['status'] = STATUS_MAP.get(text[:3], None)
+
+    task['tags'] = [word.strip('#') for word in task['title'].split()
+                    if word.startswith('#')]
+    title_words = json.dumps(task['title']).strip('"').split()
+    task['fields'] = [word for word in title_words if word.startswith('\\u')]
+
+    # Priority field (Tasks Obsidian plugin)
+    priority = [PRIORITY_MAP.get(field) for field in task['fields']
+                if field in PRIORITY_MAP]
+    task['priority'] = priority[0] if priority else None
+
+    # Date fields (Tasks Obsidian plugin)
+    date_fields_utf = [field for field in task['fields'] if field in DATES_MAP]
+    for date_field in date_fields_utf:
+        task[DATES_MAP.get(date_field)] = dt.datetime.fromisoformat(
+            title_words[title_words.index(date_field)+1])
+
+    # OKR field (Dataview Obsidian plugin)
+    pattern_okr = r'\(([a-zA-Z\s]+)::(.+)\)'
+    matches_okr = re.findall(pattern_okr, task['title'])
+    for match in matches_okr:
+        task[match[0].strip()] = match[1].strip()
+    task['title'] = re.sub(pattern_okr, '', task['title']).strip()
+
+    # Dataview fields (Dataview Obsidian plugin)
+    pattern_dv = r'[\[\(]([a-zA-Z\s]+)::(.+)[\]\)]'
+    matches_dv = re.findall(pattern_dv, task['title'])
+    for match in matches_dv:
+        key, val = match[0].strip(), match[1].strip()
+        if key in ['Story Points', 'duration']:
+            val = float(val)
+        task[key] = val
+
+    # Task type field
+    task_types = [tag for tag in task['tags']
+                  if tag in ['epic', 'story', 'task']]
+    if len(task_types) == 1:
+        task['type'] = task_types[0]
+    elif len(task_types) == 0:
+        task['type'] = 'todo'
+    else:
+        print(task['raw_text'])
+        raise ValueError(f"Multiple task types found: {task_types}")
+
+    # Story Points field (Dataview Obsidian plugin)
+    if task['type'] in ['epic', 'story']:
+        task['Story Points'] = task.get('Story Points', 0)
+    elif task['type'] == 'task':
+        task['Story Points'] = task.get('Story Points', 1)
+
+    task['file_name'] = note
+
+    task_node.data = task
+    return task_node
+
+
+def read_event_reference(date_string, title):
+    """Read the event start, end date-times from the title of a task if it is an event,
+    as before the event times were cached.
+
+    Args:
+        date_string (str): The date string in ISO format of the task/event.
+        title (str): The title of the task.
+
+    Returns:
+        dict: A dict containing the event start & end date-times and duration.
+    """
+    pattern_event = r'^\b(\d{1,2}(:\d{2})?\s*(AM|PM)?)\s*-\s*(\d{1,2}(:\d{2})?\s*(AM|PM)?)\b'
+    match = re.search(pattern_event, title)
+
+    if match is not None:
+        # Extract the event start time
+        if match[2] is not None:
+            minutes = int(match[2][1:])
+        else:
+            minutes = 0
+        hours = int(match[1].split(':')[0].split()[0])
+        am_pm = match[3]
+        if am_pm is not None:
+            if am_pm == 'PM' and hours != 12:
+                hours += 12
+            elif am_pm == 'AM' and hours == 12:
+                hours = 0
+        event_start = dt.datetime.strptime(
+            date_string + ' ' + str(hours) + ':' + str(minutes), '%Y-%m-%d %H:%M')
+
+        # Extract the event end time
+        if match[5] is not None:
+            minutes = int(match[5][1:])
+        else:
+            minutes = 0
+        hours = int(match[4].split(':')[0].split()[0])
+        am_pm = match[6]
+        if am_pm is not None:
+            if am_pm == 'PM' and hours != 12:
+                hours += 12
+            elif am_pm == 'AM' and hours == 12:
+                hours = 0
+        event_end = dt.datetime.strptime(
+            date_string + ' ' + str(hours) + ':' + str(minutes), '%Y-%m-%d %H:%M')
+
+        # If the event ends on the next day
+        if event_end < event_start:
+            event_end += dt.timedelta(days=1)
+        duration = (event_end - event_start).total_seconds()/3600
+
+        return {'event_start': event_start, 'event_end': event_end, 'duration': duration}
+    else:
+        return None
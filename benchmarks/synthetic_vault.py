@@ -0,0 +1,226 @@
+"""Generator of synthetic Obsidian vaults for the benchmarks.
+
+The vault has a year of daily notes with habit tasks, events & nested tasks,
+OKR notes with a KR of each criteria, one per quarter, and other notes in
+nested folders, some of them with tasks tagged for the story points KRs. The
+tasks use the Tasks plugin dates & priorities and the Dataview fields.
+
+The same arguments always give the same vault, the dates are relative to the
+end date, today by default.
+
+Usage:
+    python -m benchmarks.synthetic_vault DIRPATH [--notes N] [--days N] [--cycles N]
+        [--end-date YYYY-MM-DD] [--seed N]
+"""
+import argparse
+import datetime as dt
+import pathlib
+import random
+import shutil
+
+OKR_NOTE = 'Synthetic OKR'
+HABITS = ['[[Jogging]]', '[[Mindful breathing]]', 'Body awareness scan',
+          'Grateful for the sun #gratitude', '[[Reading]]']
+CYCLE_DAYS = 90  # Length of an OKR cycle
+# Date fields of the Tasks plugin, other than the done date
+TASK_DATE_FIELDS = ['\u2795', '\U0001f6eb', '\u23f3', '\U0001f4c5']
+TASK_PRIORITIES = ['', '\u23ec', '\U0001f53d', '\U0001f53c', '\u23eb', '\U0001f53a']
+OKR_NOTE_TEXT = """---
+start_date: {start_date}
+end_date: {end_date}
+---
+
+# O1: Career
+### O1 KR1: Hobby projects
+[criteria:: story-points] [priority:: 4]
+
+# O2: Personal
+### O2 KR1: Gratitude
+[criteria:: count]  [target:: 60] [priority:: 1]  (keywords:: ["#gratitude"])
+
+### O2 KR2: Mindfulness
+[criteria:: duration]  [target:: 20] [priority:: 2]  (keywords:: ["Mindful breathing", "Body awareness"])
+
+### O2 KR3: Exercise
+[criteria:: duration]  [target:: 20] [priority:: 3]  (keywords:: ["Jogging"])
+"""
+
+
+def make_vault(dirpath, n_notes, n_days=365, seed=0, n_cycles=1, end_date=None):
+    """Create a synthetic vault, replacing any existing folder.
+
+    Args:
+        dirpath (Path): Path of the vault folder.
+        n_notes (int): Total number of notes in the vault.
+        n_days (int, optional): Number of daily notes, ending on the end date.
+            Defaults to 365.
+        seed (int, optional): Seed of the random generator. Defaults to 0.
+        n_cycles (int, optional): Number of OKR notes, one per quarter up to
+            the end date. Defaults to 1.
+        end_date (datetime.date, optional): Date of the last daily note.
+            Defaults to today.
+
+    Returns:
+        str: Name of the latest OKR note of the vault.
+    """
+    dirpath = pathlib.Path(dirpath)
+    rng = random.Random(seed)
+    if dirpath.exists():
+        shutil.rmtree(dirpath)
+    (dirpath / 'journals').mkdir(parents=True)
+
+    today = end_date or dt.date.today()
+    n_cycles = min(n_cycles, n_notes - 1)
+    n_days = min(n_days, n_notes - n_cycles)
+    for i in range(n_days):
+        date = today - dt.timedelta(days=n_days - 1 - i)
+        write_note(dirpath / 'journals' / f"{date.isoformat()} {date.strftime('%A')}.md",
+                   get_daily_note_text(rng, date))
+
+    # The latest cycle runs past the end date, the earlier ones are back to back
+    okr_start_date = today - dt.timedelta(days=min(n_days, CYCLE_DAYS))
+    cycles = [(OKR_NOTE, okr_start_date, today + dt.timedelta(days=30))]
+    for i in range(1, n_cycles):
+        start_date = okr_start_date - dt.timedelta(days=CYCLE_DAYS * i)
+        cycles.append((f'{OKR_NOTE} {start_date:%Y-%m-%d}', start_date,
+                       start_date + dt.timedelta(days=CYCLE_DAYS - 1)))
+    for okr_note, start_date, end_date in cycles:
+        write_note(dirpath / f'{okr_note}.md', OKR_NOTE_TEXT.format(
+            start_date=start_date, end_date=end_date))
+
+    for i in range(n_notes - n_days - n_cycles):
+        folder = dirpath / 'notes' / f'area {i % 20}' / f'topic {i % 7}'
+        folder.mkdir(parents=True, exist_ok=True)
+        okr_note, start_date, end_date = cycles[rng.randrange(n_cycles)]
+        write_note(folder / f'Note {i}.md', get_note_text(
+            rng, f'[[{okr_note}#O1 KR1 Hobby projects]]', start_date, min(end_date, today)))
+    return OKR_NOTE
+
+
+def get_daily_note_text(rng, date):
+    """Get the text of a daily note, with habit tasks, events, nested tasks &
+    plain bullets.
+
+    Args:
+        rng (Random): Random generator.
+        date (datetime.date): Date of the daily note.
+
+    Returns:
+        str: Markdown text of the note.
+    """
+    lines = ['# Log', '- [x] Import events from ics']
+    for habit in HABITS:
+        r = rng.random()
+        if r < 0.3:
+            lines.append(f'- [x] {habit} [duration:: {rng.choice([0.25, 0.5, 1])}]')
+        elif r < 0.5:
+            start = rng.randint(6, 20)
+            lines.append(f'- [x] {get_time(rng, start)} - {get_time(rng, start + 1)} {habit}')
+        elif r < 0.6:
+            lines.append(f'- [ ] **7:15** {habit} ⏫ 📅 {date.isoformat()}')
+            lines.append(f'\t- [x] Subtask of {habit} ✅ {date.isoformat()}')
+            if rng.random() < 0.5:
+                lines.append(f'\t\t- [/] Sub-subtask of {habit} %% a comment %%')
+    if rng.random() < 0.3:
+        lines += ['- [x] Plan the week #task', '\t- [ ] Review the notes',
+                  '\t\t- [-] Clean up the inbox ❌ ' + date.isoformat()]
+    lines += ['- Plain bullet', '\t- [x] Checkbox under a plain bullet', '',
+              'Some text with *emphasis* and `code`.']
+    return '\n'.join(lines)
+
+
+def get_note_text(rng, okr_tag, okr_start_date, today):
+    """Get the text of a note, a tenth of the notes have tasks tagged for an OKR.
+
+    Args:
+        rng (Random): Random generator.
+        okr_tag (str): The OKR tag of the story points KR.
+        okr_start_date (datetime.date): Start date of the OKR cycle.
+        today (datetime.date): Last date of the done dates, within the cycle.
+
+    Returns:
+        str: Markdown text of the note.
+    """
+    lines = ['---', 'tags: [synthetic]', '---', '# Notes',
+             'Some text with [[links]] and **strong** words.', '']
+    tagged = rng.random() < 0.1
+    for i in range(rng.randint(0, 10)):
+        status = rng.choice(['[x]', '[ ]', '[/]', '[-]'])
+        if tagged:
+            kind = rng.choice(['#task', '#story [Story Points:: 3]', '#epic'])
+            done_date = okr_start_date + dt.timedelta(
+                days=rng.randint(0, (today - okr_start_date).days))
+            done = f' ✅ {done_date.isoformat()}' if status == '[x]' else ''
+            lines.append(f'- {status} Item {i} {kind} (okr:: {okr_tag})'
+                         f'{get_task_fields(rng, okr_start_date)}{done}')
+            if rng.random() < 0.4:
+                lines.append(f'    - [x] Subitem {i} #task{done}')
+                if rng.random() < 0.3:
+                    lines.append(f'        - [ ] Subsubitem {i} #task')
+        else:
+            lines.append(f'- {status} Item {i} about something #tag'
+                         f'{get_task_fields(rng, okr_start_date)}')
+    lines += [''] + ['More paragraph text.'] * rng.randint(1, 20)
+    return '\n'.join(lines)
+
+
+def get_task_fields(rng, date):
+    """Get a random priority & Tasks plugin dates for a task.
+
+    Args:
+        rng (Random): Random generator.
+        date (datetime.date): Date around which the dates are picked.
+
+    Returns:
+        str: The fields, with a leading space, empty for most tasks.
+    """
+    if rng.random() < 0.7:
+        return ''
+    fields = [rng.choice(TASK_PRIORITIES)]
+    for field in rng.sample(TASK_DATE_FIELDS, rng.randint(1, 2)):
+        fields.append(f'{field} {date + dt.timedelta(days=rng.randint(-10, 10))}')
+    return ' ' + ' '.join(field for field in fields if field)
+
+
+def get_time(rng, hours):
+    """Get a random time within an hour, in one of the formats of the events.
+
+    Args:
+        rng (Random): Random generator.
+        hours (int): Hours of the time, in the 24-hour format.
+
+    Returns:
+        str: Time string, e.g. 7:15 PM, 7 PM or 19:15.
+    """
+    minutes = rng.choice(['00', '15', '30'])
+    time_format = rng.random()
+    if time_format < 0.6:
+        return f"{(hours - 1) % 12 + 1}:{minutes} {'AM' if hours < 12 else 'PM'}"
+    if time_format < 0.8:
+        return f"{(hours - 1) % 12 + 1} {'AM' if hours < 12 else 'PM'}"
+    return f"{hours}:{minutes}"
+
+
+def write_note(note_path, text):
+    """Write the text of a note file.
+
+    Args:
+        note_path (Path): Path of the note file.
+        text (str): Markdown text of the note.
+    """
+    with open(note_path, 'w', encoding="utf-8") as f:
+        f.write(text)
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    arg_parser.add_argument('dirpath')
+    arg_parser.add_argument('--notes', type=int, default=2000)
+    arg_parser.add_argument('--days', type=int, default=365)
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--cycles', type=int, default=1)
+    arg_parser.add_argument('--end-date', type=dt.date.fromisoformat, default=None)
+    args = arg_parser.parse_args()
+    okr_note = make_vault(args.dirpath, args.notes, args.days, args.seed,
+                          args.cycles, args.end_date)
+    print(f"Created {args.notes} notes in {args.dirpath}, OKR note: {okr_note}")
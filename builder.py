@@ -0,0 +1,35 @@
+from dotenv import load_dotenv
+import os
+import pathlib
+from src.reload_utils import DataReloader
+from src.shared_utils import serve_shared_data
+from src.watch_utils import VaultWatcher
+
+# Builds the data of the dashboard once for all the gunicorn workers, e.g.
+#   python builder.py & gunicorn -w 4 app:server
+# with SHARED_DATA_LOC set for both
+
+# Load the environment variables
+load_dotenv()
+VAULT_LOC = pathlib.Path(os.getenv('VAULT_LOC'))
+OKR_NOTE = os.getenv('OKR_NOTE')
+HABITS = [habit.strip() for habit in os.getenv('HABITS').split(',')]
+CRITERIA = [criterion.strip()
+            for criterion in os.getenv('CRITERIA').split(',')]
+START_DATES = [date.strip() for date in os.getenv(
+    'START_DATES').split(',')]  # Start dates for each habit
+SNAPSHOT_LOC = os.getenv('SNAPSHOT_LOC')
+WATCH_VAULT = os.getenv('WATCH_VAULT')
+SHARED_DATA_LOC = os.getenv('SHARED_DATA_LOC')
+PROFILE_LOC = os.getenv('PROFILE_LOC')
+
+if __name__ == '__main__':
+    if not SHARED_DATA_LOC:
+        raise SystemExit("Set SHARED_DATA_LOC to the folder of the shared data")
+    reloader = DataReloader(VAULT_LOC, OKR_NOTE, HABITS, CRITERIA, START_DATES,
+                            SNAPSHOT_LOC, PROFILE_LOC)
+    reloader.load()
+    if WATCH_VAULT:
+        watcher = VaultWatcher(VAULT_LOC, reloader.start, mode=WATCH_VAULT)
+        watcher.start()
+    serve_shared_data(reloader, SHARED_DATA_LOC)
@@ -0,0 +1,65 @@
+from dotenv import load_dotenv
+import argparse
+import os
+import pathlib
+import time
+from src.export_utils import export_trackers, EXPORT_FORMATS, PLOTLYJS_MODES
+from src.reload_utils import DataReloader
+
+# Exports the OKR & habit trackers to data files & static HTML pages, without
+# running the dashboard, e.g. from a nightly cron job:
+#   python export.py reports/ --format parquet
+
+# Load the environment variables, the defaults of the command line options
+load_dotenv()
+VAULT_LOC = pathlib.Path(os.getenv('VAULT_LOC'))
+OKR_NOTE = os.getenv('OKR_NOTE')
+HABITS = os.getenv('HABITS')
+CRITERIA = os.getenv('CRITERIA')
+START_DATES = os.getenv('START_DATES')
+
+
+def split_list(value):
+    return [item.strip() for item in value.split(',')]
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description="Export the OKR & habit trackers to data files & HTML pages.")
+    arg_parser.add_argument('out_dirpath', help="Output folder, also holds the "
+                            "manifest used to export only the changed trackers")
+    arg_parser.add_argument('--okr-note', default=OKR_NOTE)
+    arg_parser.add_argument('--habits', default=HABITS, help="Comma-separated habits")
+    arg_parser.add_argument('--criteria', default=CRITERIA,
+                            help="Comma-separated criteria, one per habit")
+    arg_parser.add_argument('--start-dates', default=START_DATES,
+                            help="Comma-separated start dates, one per habit")
+    arg_parser.add_argument('--format', choices=EXPORT_FORMATS, default='csv',
+                            help="Format of the data files, parquet needs pyarrow")
+    arg_parser.add_argument('--plotlyjs', choices=list(PLOTLYJS_MODES), default='inline',
+                            help="Embed plotly.js in the HTML pages or load it from its CDN")
+    arg_parser.add_argument('--snapshot-loc', default=None,
+                            help="Folder of the note cache snapshots, to parse only the notes "
+                            "changed since the last run. Defaults to .note-cache in the "
+                            "output folder, not to race with the dashboard snapshots")
+    args = arg_parser.parse_args()
+
+    habits = split_list(args.habits)
+    criteria = split_list(args.criteria)
+    start_dates = split_list(args.start_dates)
+    if not len(habits) == len(criteria) == len(start_dates):
+        arg_parser.error("--habits, --criteria & --start-dates need as many items")
+
+    start = time.perf_counter()
+    reloader = DataReloader(VAULT_LOC, args.okr_note, habits, criteria, start_dates,
+                            args.snapshot_loc or pathlib.Path(args.out_dirpath) / '.note-cache')
+    data = reloader.load()
+    try:
+        summary = export_trackers(data, args.out_dirpath, args.format, args.plotlyjs)
+    except ImportError as e:  # No parquet engine
+        raise SystemExit(str(e))
+    print(f"Exported {len(summary['written'])} trackers, {len(summary['unchanged'])} "
+          f"unchanged, {len(summary['deleted'])} deleted in "
+          f"{time.perf_counter() - start:.1f}s to {args.out_dirpath}")
+    for name in summary['written']:
+        print(f"  {name}")
@@ -0,0 +1,381 @@
+import datetime as dt
+import json
+import zlib
+import numpy as np
+from flask import Response, jsonify
+from src.task_utils import STATUSES, STATUS_CODES
+from src.utils import HABIT_ROLLUP_FREQS
+
+API_PAGE_SIZE = 1000  # Rows per page when the limit is not given
+STREAM_CHUNK_ROWS = 1000  # Rows encoded at once while streaming a response
+GZIP_LEVEL = 6
+# Columns of the task rows, the row & parent are the rows in the table of the KR
+TASK_COLUMNS = ['row', 'parent', 'date', 'done_date', 'status', 'duration',
+                'story_points', 'okr', 'file', 'title']
+PIVOT_COLUMNS = ['date', 'score', 'target', 'target_70_pct']
+
+
+def serve_rows(request, data, get_parts):
+    """Serve a page of rows of the data as a streamed JSON response.
+
+    The response has a weak ETag of the data version, so a client polling with
+    If-None-Match gets an empty 304 response until the data changes, before
+    any row is read. The rows are encoded a chunk at a time while the response
+    is sent, gzipped if the client accepts it, so a large export is never
+    built in memory.
+
+    Args:
+        request (Request): The Flask request, with the query parameters.
+        data (dict): Data of the dashboard, read once for the whole response.
+        get_parts (function): Function getting the parts of the rows from the
+            data & the query parameters, e.g. get_task_parts.
+
+    Returns:
+        Response: The JSON response, 304 if the client has the data version,
+            400 for an invalid parameter, 404 for an unknown tracker.
+    """
+    etag = get_etag(data)
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        try:
+            offset, limit = get_page(request.args)
+            parts = get_parts(data, request.args)
+        except KeyError as e:
+            return jsonify(error=e.args[0]), 404
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        chunks = iter_json_chunks(data['version'], parts, offset, limit)
+        response = Response(mimetype='application/json')
+        if request.accept_encodings['gzip']:
+            chunks = gzip_chunks(chunks)
+            response.headers['Content-Encoding'] = 'gzip'
+        response.response = chunks
+    response.set_etag(etag, weak=True)
+    # Cached responses must be checked again, which is a 304 until a reload
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def get_etag(data):
+    """Get the ETag of a version of the data.
+
+    The version alone is not enough, as it starts again from 1 when the
+    dashboard is restarted, so the build time is part of the ETag too.
+
+    Args:
+        data (dict): Data of the dashboard.
+
+    Returns:
+        str: The ETag, without quotes.
+    """
+    return f"{data['version']}-{data['built_at']:%Y%m%d%H%M%S%f}"
+
+
+def get_page(args):
+    """Get the page of rows asked for by the offset & limit query parameters.
+
+    Args:
+        args (MultiDict): Query parameters of the request.
+
+    Raises:
+        ValueError: If the offset or the limit is not a valid number.
+
+    Returns:
+        tuple: Offset of the first row & number of rows, None for all the rows.
+    """
+    offset = parse_count(args.get('offset', '0'), 'offset')
+    limit = args.get('limit', str(API_PAGE_SIZE))
+    if limit == 'all':
+        return offset, None
+    limit = parse_count(limit, 'limit')
+    if limit == 0:
+        raise ValueError("The limit must be positive, or all")
+    return offset, limit
+
+
+def parse_count(value, name):
+    """Parse a count query parameter.
+
+    Args:
+        value (str): Value of the parameter.
+        name (str): Name of the parameter, for the error message.
+
+    Raises:
+        ValueError: If the value is not a non-negative integer.
+
+    Returns:
+        int: The count.
+    """
+    if not value.isdigit():
+        raise ValueError(f"Invalid {name}: {value!r}")
+    return int(value)
+
+
+def parse_date(args, name):
+    """Parse a date query parameter.
+
+    Args:
+        args (MultiDict): Query parameters of the request.
+        name (str): Name of the parameter.
+
+    Raises:
+        ValueError: If the date is not in the YYYY-MM-DD format.
+
+    Returns:
+        numpy.datetime64: The date, None if not given.
+    """
+    value = args.get(name)
+    if value is None:
+        return None
+    try:
+        return np.datetime64(dt.date.fromisoformat(value), 'D')
+    except ValueError:
+        raise ValueError(f"Invalid {name} date: {value!r}") from None
+
+
+def get_date_mask(dates, start_date, end_date):
+    """Get the rows within a date range, both dates included.
+
+    Args:
+        dates (ndarray): Dates of the rows, as datetime64 values.
+        start_date (numpy.datetime64): Start date, None for no start date.
+        end_date (numpy.datetime64): End date, None for no end date.
+
+    Returns:
+        ndarray: Boolean mask over the rows, False for the rows without a
+            date if a start or end date is given.
+    """
+    dates = dates.astype('datetime64[D]')
+    mask = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        mask &= dates >= start_date
+    if end_date is not None:
+        mask &= dates <= end_date
+    return mask
+
+
+def get_trackers(trackers, args):
+    """Get the trackers asked for by the tracker query parameters.
+
+    Args:
+        trackers (list): Names of the available trackers.
+        args (MultiDict): Query parameters of the request, the tracker
+            parameter may be given several times.
+
+    Raises:
+        KeyError: If a tracker is unknown.
+
+    Returns:
+        list: Names of the trackers, all of them if none is given.
+    """
+    names = args.getlist('tracker')
+    for name in names:
+        if name not in trackers:
+            raise KeyError(f"Unknown tracker: {name}")
+    return [name for name in trackers if name in names] if names else list(trackers)
+
+
+def get_okr_cycle(data, args):
+    """Get the OKR cycle asked for by the cycle query parameter.
+
+    Args:
+        data (dict): Data of the dashboard.
+        args (MultiDict): Query parameters of the request.
+
+    Raises:
+        KeyError: If the cycle is unknown.
+
+    Returns:
+        dict: The cycle, as kept in the OKR cycle index, the cycle of
+            OKR_NOTE if not given.
+    """
+    okr_note = args.get('cycle', data['okr_note'])
+    if okr_note not in data['okr_cycles']:
+        raise KeyError(f"Unknown cycle: {okr_note}")
+    return data['okr_cycles'][okr_note]
+
+
+def get_task_parts(data, args):
+    """Get the tasks of the KRs of a cycle, filtered by the query parameters.
+
+    The query parameters are the cycle, the tracker (the KR), the status, and
+    the start & end dates, matched against the date of the daily note of a
+    task, or its done date for the other tasks.
+
+    Args:
+        data (dict): Data of the dashboard.
+        args (MultiDict): Query parameters of the request.
+
+    Raises:
+        KeyError: If the cycle or a KR is unknown.
+        ValueError: If a status or a date is not valid.
+
+    Returns:
+        list: Name of the KR & columns of its tasks, for each KR.
+    """
+    okr_data = get_okr_cycle(data, args)['okr_data']
+    statuses = args.getlist('status')
+    for status in statuses:
+        if status not in STATUS_CODES:
+            raise ValueError(f"Invalid status: {status!r}, expected one of {STATUSES}")
+    start_date, end_date = parse_date(args, 'start'), parse_date(args, 'end')
+    parts = []
+    for kr in get_trackers(okr_data, args):
+        if 'data' not in okr_data[kr]:  # KR without tasks
+            continue
+        table = okr_data[kr]['data']
+        dates = table['date']
+        mask = get_date_mask(np.where(np.isnat(dates), table['done_date'], dates),
+                             start_date, end_date)
+        if statuses:
+            mask &= np.isin(table['status'], [STATUS_CODES[status] for status in statuses])
+        table = table.select(mask)
+        columns = {name: table[name] for name in TASK_COLUMNS[2:]}
+        columns['status'] = np.array(STATUSES + [None], dtype=object)[columns['status']]
+        parents = table['parent']
+        parts.append(('kr', kr, {
+            'row': table.rows,
+            # None for the top level tasks
+            'parent': np.where(parents >= 0, parents.astype(object), None),
+            **columns}))
+    return parts
+
+
+def get_habit_parts(data, args):
+    """Get the scores of the habits, filtered by the query parameters.
+
+    The query parameters are the tracker (the habit), the freq of the scores,
+    D, W, M or Y for the total scores per day, week, month or year, and the
+    start & end dates, matched against the start date of each period.
+
+    Args:
+        data (dict): Data of the dashboard.
+        args (MultiDict): Query parameters of the request.
+
+    Raises:
+        KeyError: If a habit is unknown.
+        ValueError: If the freq or a date is not valid.
+
+    Returns:
+        list: Name of the habit & columns of its scores, for each habit.
+    """
+    freq = args.get('freq', 'D')
+    if freq not in HABIT_ROLLUP_FREQS:
+        raise ValueError(f"Invalid freq: {freq!r}, expected one of {HABIT_ROLLUP_FREQS}")
+    start_date, end_date = parse_date(args, 'start'), parse_date(args, 'end')
+    parts = []
+    for habit in get_trackers(data['habit_rollups'], args):
+        scores_df = data['habit_rollups'][habit][freq]
+        mask = get_date_mask(scores_df['date'].to_numpy(), start_date, end_date)
+        parts.append(('habit', habit, {column: scores_df[column].to_numpy()[mask]
+                                       for column in ['date', 'score']}))
+    return parts
+
+
+def get_pivot_parts(data, args):
+    """Get the cumulative scores & targets of the KRs of a cycle, filtered by
+    the query parameters.
+
+    The query parameters are the cycle, the tracker (the KR), and the start &
+    end dates.
+
+    Args:
+        data (dict): Data of the dashboard.
+        args (MultiDict): Query parameters of the request.
+
+    Raises:
+        KeyError: If the cycle or a KR is unknown.
+        ValueError: If a date is not valid.
+
+    Returns:
+        list: Name of the KR & columns of its pivot data, for each KR.
+    """
+    cycle = get_okr_cycle(data, args)
+    start_date, end_date = parse_date(args, 'start'), parse_date(args, 'end')
+    parts = []
+    for kr in get_trackers(cycle['okr_data'], args):
+        if kr not in cycle['okr_pivot_parts']:
+            continue
+        pivot_df = cycle['okr_pivot_parts'][kr]
+        mask = get_date_mask(pivot_df['date'].to_numpy(), start_date, end_date)
+        parts.append(('kr', kr, {column: pivot_df[column].to_numpy()[mask]
+                                 for column in PIVOT_COLUMNS}))
+    return parts
+
+
+def iter_json_chunks(version, parts, offset, limit):
+    """Encode a page of rows as JSON, a chunk of rows at a time.
+
+    The rows of all the parts are paged as one list. The JSON object has the
+    data version, the total number of rows, the offset & limit of the page,
+    the offset of the next page (null on the last page), and the rows.
+
+    Args:
+        version (int): Version of the data.
+        parts (list): Name & value of the label of each part, e.g. the KR, and
+            the columns of its rows.
+        offset (int): Offset of the first row of the page.
+        limit (int): Number of rows of the page, None for all the rows.
+
+    Yields:
+        bytes: UTF-8 encoded JSON text.
+    """
+    lengths = [len(next(iter(columns.values()))) for _, _, columns in parts]
+    total = sum(lengths)
+    stop = total if limit is None else min(offset + limit, total)
+    header = {'version': version, 'total': total, 'offset': offset, 'limit': limit,
+              'next_offset': stop if stop < total else None}
+    yield (json.dumps(header)[:-1] + ', "rows": [').encode()
+
+    separator = ''
+    part_start = 0
+    for (label, value, columns), length in zip(parts, lengths):
+        # Rows of the page within this part
+        start, end = max(offset - part_start, 0), min(stop - part_start, length)
+        part_start += length
+        for chunk_start in range(start, end, STREAM_CHUNK_ROWS):
+            chunk = slice(chunk_start, min(chunk_start + STREAM_CHUNK_ROWS, end))
+            names = [label] + list(columns)
+            values = [[value] * (chunk.stop - chunk.start)] + \
+                [to_json_values(column[chunk]) for column in columns.values()]
+            rows = [dict(zip(names, row)) for row in zip(*values)]
+            yield (separator + json.dumps(rows, ensure_ascii=False)[1:-1]).encode()
+            separator = ', '
+    yield b']}'
+
+
+def to_json_values(values):
+    """Convert the values of a column to JSON values.
+
+    Args:
+        values (ndarray): Values of the column.
+
+    Returns:
+        list: The values, with the dates in the YYYY-MM-DD format, and None
+            for NaT & NaN, which JSON does not have.
+    """
+    if np.issubdtype(values.dtype, np.datetime64):
+        dates = np.datetime_as_string(values.astype('datetime64[D]')).tolist()
+        return [None if date == 'NaT' else date for date in dates]
+    if values.dtype.kind == 'f':
+        return [None if value != value else value for value in values.tolist()]
+    return values.tolist()
+
+
+def gzip_chunks(chunks):
+    """Compress a stream of chunks as a single gzip stream.
+
+    Args:
+        chunks (iterable): The chunks, as bytes.
+
+    Yields:
+        bytes: The gzip stream, in chunks.
+    """
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
@@ -0,0 +1,516 @@
+import datetime as dt
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import yaml
+from dotenv import load_dotenv
+from src.note_utils import parse_text_for_tasks
+from src.task_utils import TaskTable, KeywordIndex
+from src.vault_utils import JournalIndex, parse_front_matter, get_front_matter_date
+
+load_dotenv()
+DAILY_NOTES_LOC = pathlib.Path(os.getenv('DAILY_NOTES_LOC'))
+# Number of processes parsing the notes, 1 to parse them in the app process
+PARSE_WORKERS = int(os.getenv('PARSE_WORKERS', '1'))
+PARSE_CHUNK_SIZE = 64  # Notes per unit of work of the parsing processes
+# Version of the snapshot format, to be bumped whenever the snapshot content
+# changes, e.g. when the task columns or the parsing of the notes change
+SNAPSHOT_VERSION = 4
+# Name of the OKR note in the OKR tag of a task, e.g. [[2025 Jan - 1#O1 KR1 Hobby projects]]
+OKR_TAG_NOTE_PATTERN = re.compile(r'\[\[([^#|\]]+)')
+
+logger = logging.getLogger(__name__)
+
+
+def read_notes_tasks(jobs):
+    """Read & parse some note files, the unit of work of the parsing processes.
+
+    Args:
+        jobs (list): (note name, file path, date if it is a daily note, digest
+            of the cached content or None, OKR tasks only) tuples.
+
+    Returns:
+        list: (digest, task table, cycle dates) tuples, in the order of the
+            jobs. The task table is None if the content has the cached digest.
+    """
+    return [read_note_tasks(note_path, note, date, digest, okr_only)
+            for note, note_path, date, digest, okr_only in jobs]
+
+
+def read_note_tasks(note_path, note, date=None, digest=None, okr_only=False):
+    """Read & parse a note file, unless its content has some known digest.
+
+    Only the daily notes & the notes that may have tasks marked for an OKR are
+    parsed, the tasks of the other notes are not used by any tracker. The
+    dates of the OKR cycle are read from the front matter of the OKR notes.
+
+    Args:
+        note_path (Path): Path of the note file.
+        note (str): Name of the note in the vault.
+        date (datetime.date, optional): Date of the note if it is a daily note.
+            Defaults to None.
+        digest (str, optional): Digest of the cached content of the note.
+            Defaults to None.
+        okr_only (bool, optional): Only parse the daily note if it may have
+            tasks marked for an OKR, as the other notes, e.g. when it is outside
+            the dates of every tracker. Defaults to False.
+
+    Returns:
+        tuple: Digest of the content, the task table of the note & the start &
+            end dates of its OKR cycle if it is an OKR note, both None if the
+            digest is the known one.
+    """
+    with open(note_path, 'rb') as f:
+        content = f.read()
+    new_digest = hashlib.sha1(content).hexdigest()
+    if new_digest == digest:
+        return new_digest, None, None
+    cycle = get_cycle_dates(content) if date is None else None
+    if (date is None or okr_only) and not may_have_okr_tasks(content):
+        return new_digest, TaskTable.concat([]), cycle
+    return new_digest, TaskTable.from_tree(
+        parse_text_for_tasks(content.decode('utf-8'), note), date), cycle
+
+
+def get_cycle_dates(content):
+    """Get the dates of the OKR cycle of an OKR note, from its front matter.
+
+    Only the notes with KR criteria fields & both dates in their front matter
+    are OKR notes, the front matter of the other notes is not parsed.
+
+    Args:
+        content (bytes): Content of the note file.
+
+    Returns:
+        tuple: Start & end dates of the cycle, as ISO strings, None if the note
+            is not an OKR note.
+    """
+    if not content.startswith(b'---') or b'criteria::' not in content or \
+            b'start_date' not in content or b'end_date' not in content:
+        return None
+    try:
+        front_matter = parse_front_matter(
+            content.decode('utf-8').splitlines(keepends=True))
+        dates = [get_front_matter_date(front_matter.get(key))
+                 for key in ['start_date', 'end_date']]
+    except (ValueError, yaml.YAMLError, AttributeError):
+        return None
+    return tuple(date.isoformat() for date in dates)
+
+
+def get_okr_notes(tasks):
+    """Get the OKR notes referenced by the OKR tags of some tasks.
+
+    Args:
+        tasks (TaskTable): Table of the tasks of a note.
+
+    Returns:
+        list: Names of the OKR notes.
+    """
+    okr_tags = tasks['okr']
+    return sorted({match[1] for okr_tag in okr_tags[okr_tags != None]  # noqa: E711
+                   if (match := OKR_TAG_NOTE_PATTERN.match(okr_tag))})
+
+
+def get_snapshot_dirpath(snapshot_loc):
+    """Get the folder of the latest snapshot of the note cache.
+
+    Args:
+        snapshot_loc (Path): Path of the snapshots folder.
+
+    Returns:
+        Path: Path of the snapshot folder, None if there is no snapshot.
+    """
+    try:
+        with open(pathlib.Path(snapshot_loc) / 'CURRENT', 'r', encoding="utf-8") as f:
+            return pathlib.Path(snapshot_loc) / f.read().strip()
+    except FileNotFoundError:
+        return None
+
+
+def get_column_types():
+    """Get the types of the task table columns, as stored in the snapshots.
+
+    Returns:
+        dict: Name of the type of each column, keyed by the column name.
+    """
+    return {name: np.dtype(dtype).str for name, dtype in TaskTable.COLUMNS.items()}
+
+
+def may_have_okr_tasks(content):
+    """Check the raw content of a note for any sign of an OKR field.
+
+    The OKR field of a task, i.e. `(okr:: [[OKR note#KR]])`, needs both the
+    field name & the `::` separator in the note file, whatever its formatting.
+
+    Args:
+        content (bytes): Content of the note file.
+
+    Returns:
+        bool: False if the note cannot have any task marked for an OKR.
+    """
+    return b'okr' in content and b'::' in content
+
+
+def is_daily_note(note_path):
+    """Check if a note file is a daily note.
+
+    Args:
+        note_path (Path): Path of the note file.
+
+    Returns:
+        bool: True if the note is in the daily notes folder.
+    """
+    return note_path.is_relative_to(DAILY_NOTES_LOC)
+
+
+class NoteCache:
+    """Cache of the tasks parsed from every note in the vault.
+
+    Entries are kept across reloads and are validated against the mtime & size
+    of the note files. If those differ, the content hash decides whether the
+    note really needs to be parsed again, e.g. when a sync tool just touched it.
+
+    The tasks of all the notes are kept in a single task table, each entry has
+    the range of rows of its note in the table. Each entry also has the dates
+    of the OKR cycle of its note, if it is an OKR note, & the OKR notes its
+    tasks are marked for, so the OKR cycles are indexed along with the tasks.
+
+    The daily notes are indexed by date, so the notes outside the dates of
+    every tracker are not parsed, and each tracker only reads the rows of the
+    daily notes within its own dates. The tracker keywords are found once in
+    the titles of all the daily tasks, by a keyword index shared by the tables
+    of the daily tasks, whatever their dates.
+    """
+
+    def __init__(self):
+        # note name -> dict with the file path, fingerprint, rows in the table,
+        # OKR cycle dates, referenced OKR notes & whether only the OKR tasks of
+        # the daily note were needed
+        self._entries = {}
+        self._table = TaskTable.concat([])
+        self._journal = None  # Index of the daily notes of the last refresh
+        # KeywordIndex over the titles of the daily tasks, built on first use
+        # after each change of the table
+        self._keyword_index = None
+        # OKR notes referenced by the changed notes, before or after the change
+        self._changed_okr_notes = set()
+
+    @classmethod
+    def load(cls, snapshot_loc, vault):
+        """Load the cache from its latest snapshot, if it is valid for the vault.
+
+        Args:
+            snapshot_loc (Path): Path of the snapshots folder.
+            vault (Vault): The vault object the cache is for.
+
+        Returns:
+            NoteCache: The cache, None if there is no valid snapshot.
+        """
+        snapshot_dirpath = get_snapshot_dirpath(snapshot_loc)
+        if snapshot_dirpath is None:
+            return None
+        try:
+            with open(snapshot_dirpath / 'meta.json', 'r', encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta['version'] != SNAPSHOT_VERSION or \
+                    meta['columns'] != get_column_types() or \
+                    meta['vault_loc'] != str(vault.dirpath) or \
+                    meta['daily_notes_loc'] != str(DAILY_NOTES_LOC):
+                return None
+            note_cache = cls()
+            note_cache._table = TaskTable.load(snapshot_dirpath)
+            for note, (path, mtime, size, digest, start, stop, cycle, okr_notes,
+                       okr_only) in meta['entries'].items():
+                note_cache._entries[note] = {
+                    'path': pathlib.Path(path), 'mtime': mtime, 'size': size,
+                    'digest': digest, 'rows': (start, stop),
+                    'cycle': tuple(cycle) if cycle is not None else None,
+                    'okr_notes': okr_notes, 'okr_only': okr_only}
+        except (OSError, ValueError, KeyError, IndexError, TypeError) as e:
+            logger.warning("Ignoring the snapshot in %s: %r", snapshot_dirpath, e)
+            return None
+        if sum(stop - start for start, stop in (
+                entry['rows'] for entry in note_cache._entries.values())) != \
+                len(note_cache._table):
+            return None
+        note_cache._journal = JournalIndex(vault, DAILY_NOTES_LOC)
+        return note_cache
+
+    def save(self, snapshot_loc, vault):
+        """Save the cache as a new snapshot, replacing the previous ones.
+
+        The snapshot is written to a folder of its own, then made the latest
+        one by atomically replacing the CURRENT file, so a snapshot is never
+        read half-written.
+
+        Args:
+            snapshot_loc (Path): Path of the snapshots folder.
+            vault (Vault): The vault object the cache is for.
+
+        Returns:
+            Path: Path of the snapshot folder.
+        """
+        snapshot_loc = pathlib.Path(snapshot_loc)
+        current_dirpath = get_snapshot_dirpath(snapshot_loc)
+        number = int(current_dirpath.name.split('-')[1]) + 1 if current_dirpath else 1
+        snapshot_dirpath = snapshot_loc / f'snapshot-{number}'
+        if snapshot_dirpath.exists():  # Left over by an interrupted save
+            shutil.rmtree(snapshot_dirpath)
+        snapshot_dirpath.mkdir(parents=True)
+
+        self._table.save(snapshot_dirpath)
+        meta = {'version': SNAPSHOT_VERSION, 'columns': get_column_types(),
+                'vault_loc': str(vault.dirpath), 'daily_notes_loc': str(DAILY_NOTES_LOC),
+                'entries': {note: [str(entry['path']), entry['mtime'], entry['size'],
+                                   entry['digest'], *entry['rows'], entry['cycle'],
+                                   entry['okr_notes'], entry['okr_only']]
+                            for note, entry in self._entries.items()}}
+        with open(snapshot_dirpath / 'meta.json', 'w', encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+
+        with open(snapshot_loc / 'CURRENT.tmp', 'w', encoding="utf-8") as f:
+            f.write(snapshot_dirpath.name)
+        os.replace(snapshot_loc / 'CURRENT.tmp', snapshot_loc / 'CURRENT')
+
+        # Keep the previous snapshot, it may still be being read
+        for dirpath in snapshot_loc.glob('snapshot-*'):
+            if dirpath not in [snapshot_dirpath, current_dirpath]:
+                shutil.rmtree(dirpath, ignore_errors=True)
+        return snapshot_dirpath
+
+    def __contains__(self, note):
+        return note in self._entries
+
+    def notes(self):
+        """Get the names of all the notes in the cache.
+
+        Returns:
+            list: Names of the notes.
+        """
+        return list(self._entries.keys())
+
+    def get_tasks(self, note):
+        """Get the tasks of a note, parsed without any OKR tag.
+
+        Args:
+            note (str): Name of the note in the vault.
+
+        Returns:
+            TaskTable: Table of the tasks from the note, empty if the note was
+                skipped for not having any OKR field.
+        """
+        start, stop = self._entries[note]['rows']
+        return TaskTable(self._table.columns, np.arange(start, stop))
+
+    def get_table(self):
+        """Get the tasks of all the notes in the cache.
+
+        Returns:
+            TaskTable: Table of the tasks from all the notes, the tasks of the
+                daily notes have their date set.
+        """
+        return self._table
+
+    def get_daily_tasks(self, start_date=None, end_date=None):
+        """Get the tasks of the daily notes within a date range, only reading
+        the rows of those notes.
+
+        Args:
+            start_date (datetime.date, optional): First date of the range.
+                Defaults to None, for no lower bound.
+            end_date (datetime.date, optional): Last date of the range.
+                Defaults to None, for no upper bound.
+
+        Returns:
+            TaskTable: Table of the tasks from the daily notes in the range,
+                in the order of the full table.
+        """
+        notes = self._journal.get_notes(start_date, end_date) \
+            if self._journal is not None else []
+        # Consecutive notes usually have consecutive rows, so the rows are
+        # gathered by range
+        row_ranges = []
+        for start, stop in sorted(self._entries[note]['rows'] for note in notes
+                                  if note in self._entries):
+            if row_ranges and row_ranges[-1][1] == start:
+                row_ranges[-1][1] = stop
+            elif start < stop:
+                row_ranges.append([start, stop])
+        rows = np.concatenate([np.arange(start, stop) for start, stop in row_ranges]) \
+            if row_ranges else np.array([], dtype=np.int64)
+        return TaskTable(self._table.columns, rows, self.get_keyword_index())
+
+    def get_keyword_index(self):
+        """Get the keyword index over the titles of all the daily tasks.
+
+        Returns:
+            KeywordIndex: The index, shared by the tables from get_daily_tasks.
+        """
+        if self._keyword_index is None:
+            columns = self._table.columns
+            self._keyword_index = KeywordIndex(
+                columns['title'], np.flatnonzero(~np.isnat(columns['date'])))
+        return self._keyword_index
+
+    def get_cycles(self):
+        """Get the OKR cycles of the vault, i.e. the OKR notes & their dates.
+
+        Returns:
+            dict: Start & end dates of each cycle, keyed by the OKR note name.
+        """
+        return {note: tuple(dt.date.fromisoformat(date) for date in entry['cycle'])
+                for note, entry in self._entries.items() if entry['cycle'] is not None}
+
+    def pop_changed_okr_notes(self):
+        """Get the OKR notes whose tagged tasks may have changed since the last
+        call, i.e. the ones referenced by a changed note before or after the
+        change.
+
+        Returns:
+            set: Names of the OKR notes.
+        """
+        changed_okr_notes, self._changed_okr_notes = self._changed_okr_notes, set()
+        return changed_okr_notes
+
+    def refresh(self, vault, date_ranges=None):
+        """Parse the notes in the vault that changed since the last refresh.
+
+        The notes are read & parsed by PARSE_WORKERS processes if it is more
+        than 1 and there are enough notes to parse, else in this process.
+
+        If the dates read by the trackers are given, the daily notes outside
+        of them & of every OKR cycle are handled as the other notes, i.e. only
+        parsed if they may have tasks marked for an OKR. The OKR cycles are
+        only known once the other notes are parsed, so the daily notes are
+        parsed after them.
+
+        Args:
+            vault (Vault): The vault object with the current notes & their file stats.
+            date_ranges (list, optional): (start date, end date) tuples of the
+                dates read by the trackers, besides the OKR cycles. Defaults to
+                None, to parse all the daily notes.
+
+        Returns:
+            dict: Paths of the notes that were added, modified or deleted, keyed
+                by the note name.
+        """
+        self._journal = JournalIndex(vault, DAILY_NOTES_LOC)
+        changed_notes = {}
+        new_tables = {}
+        if date_ranges is None:
+            self._refresh_notes(vault, vault.md_file_index.keys(), set(),
+                                changed_notes, new_tables)
+        else:
+            self._refresh_notes(vault, [note for note in vault.md_file_index
+                                        if note not in self._journal],
+                                set(), changed_notes, new_tables)
+            date_ranges = list(date_ranges) + list(self.get_cycles().values())
+            window_notes = {note for start_date, end_date in date_ranges
+                            for note in self._journal.get_notes(start_date, end_date)}
+            self._refresh_notes(vault, self._journal.notes,
+                                set(self._journal.notes) - window_notes,
+                                changed_notes, new_tables)
+
+        # Notes deleted from the vault
+        for note in set(self._entries.keys()) - set(vault.md_file_index.keys()):
+            entry = self._entries.pop(note)
+            changed_notes[note] = entry['path']
+            self._changed_okr_notes.update(entry['okr_notes'])
+
+        if changed_notes:
+            self._rebuild_table(vault, new_tables)
+        return changed_notes
+
+    def _refresh_notes(self, vault, notes, okr_only_notes, changed_notes, new_tables):
+        """Parse some notes of the vault if they changed since the last refresh.
+
+        Args:
+            vault (Vault): The vault object with the current notes & their file stats.
+            notes (iterable): Names of the notes.
+            okr_only_notes (set): Names of the daily notes of which only the
+                tasks marked for an OKR are needed.
+            changed_notes (dict): Paths of the changed notes, keyed by the note
+                name, updated with these notes.
+            new_tables (dict): Task tables of the changed notes, keyed by the
+                note name, updated with these notes.
+        """
+        jobs = []  # Notes to read, with their file path, date, known digest & OKR only flag
+        for note in notes:
+            note_path = vault.dirpath / vault.md_file_index[note]
+            okr_only = note in okr_only_notes
+            entry = self._entries.get(note)
+            # A daily note of which only the OKR tasks were needed is parsed in
+            # full once a tracker reads its date
+            if entry is not None and entry['path'] == note_path and \
+                    not (entry['okr_only'] and not okr_only):
+                if (entry['mtime'], entry['size']) == vault.file_stats[note]:
+                    continue
+                digest = entry['digest']
+            else:
+                digest = None
+            jobs.append((note, note_path, self._journal.get_date(note), digest, okr_only))
+
+        if PARSE_WORKERS > 1 and len(jobs) > PARSE_CHUNK_SIZE:
+            chunks = [jobs[i:i + PARSE_CHUNK_SIZE]
+                      for i in range(0, len(jobs), PARSE_CHUNK_SIZE)]
+            with ProcessPoolExecutor(PARSE_WORKERS) as executor:
+                results = [result for chunk_results in executor.map(read_notes_tasks, chunks)
+                           for result in chunk_results]
+        else:
+            results = read_notes_tasks(jobs)
+
+        for (note, note_path, _, _, okr_only), (digest, tasks, cycle) in zip(jobs, results):
+            entry = self._entries.get(note)
+            if tasks is None:  # Same content, e.g. a sync tool just touched it
+                rows, cycle, okr_notes = entry['rows'], entry['cycle'], entry['okr_notes']
+                okr_only = entry['okr_only']
+            else:
+                new_tables[note] = tasks
+                rows = None
+                okr_notes = get_okr_notes(tasks)
+                changed_notes[note] = note_path
+                self._changed_okr_notes.update(okr_notes)
+                if entry is not None:
+                    self._changed_okr_notes.update(entry['okr_notes'])
+            mtime, size = vault.file_stats[note]
+            self._entries[note] = {'path': note_path, 'mtime': mtime, 'size': size,
+                                   'digest': digest, 'rows': rows, 'cycle': cycle,
+                                   'okr_notes': okr_notes, 'okr_only': okr_only}
+
+    def _rebuild_table(self, vault, new_tables):
+        """Rebuild the task table with the tasks of the changed notes, in the
+        order of the notes in the vault.
+
+        Args:
+            vault (Vault): The vault object with the current notes.
+            new_tables (dict): Task tables of the added & modified notes, keyed
+                by the note name.
+        """
+        pieces = []  # Task tables & row ranges of the old table, in order
+        position = 0
+        for note in vault.md_file_index.keys():
+            entry = self._entries[note]
+            if note in new_tables:
+                pieces.append(new_tables[note])
+                length = len(new_tables[note])
+            else:
+                start, stop = entry['rows']
+                length = stop - start
+                # Consecutive notes usually keep consecutive rows
+                if pieces and isinstance(pieces[-1], tuple) and pieces[-1][1] == start:
+                    pieces[-1] = (pieces[-1][0], stop)
+                else:
+                    pieces.append((start, stop))
+            entry['rows'] = (position, position + length)
+            position += length
+        self._table = TaskTable.concat(
+            self._table.slice(*piece) if isinstance(piece, tuple) else piece
+            for piece in pieces)
+        self._keyword_index = None
@@ -0,0 +1,194 @@
+import collections
+import hashlib
+import html
+import json
+import os
+import pathlib
+import re
+import pandas as pd
+import plotly.io as pio
+from src.ui_utils import get_okr_graph_data, get_habit_graph_data
+
+EXPORT_VERSION = 1  # Version of the export layout, a new one exports everything again
+MANIFEST_FILE = 'manifest.json'
+EXPORT_FORMATS = ['csv', 'parquet']
+# How the HTML pages get plotly.js: embedded, or from its CDN for lighter pages
+PLOTLYJS_MODES = {'inline': True, 'cdn': 'cdn'}
+
+
+def export_trackers(data, out_dirpath, fmt='csv', plotlyjs='inline'):
+    """Export the data & figures of every tracker, skipping the unchanged ones.
+
+    Each tracker gets a data file with its columns & an HTML page with its
+    figures. A manifest in the output folder keeps the digest of the data of
+    each exported tracker, so a tracker is only written again if its data
+    changed, and the files of the trackers that are gone are deleted.
+
+    Args:
+        data (dict): Data of the dashboard, as built by DataReloader.
+        out_dirpath (Path): Path of the output folder.
+        fmt (str, optional): Format of the data files, csv or parquet (needs
+            pyarrow). Defaults to 'csv'.
+        plotlyjs (str, optional): How the HTML pages get plotly.js, inline
+            for self-contained pages or cdn, see PLOTLYJS_MODES. Defaults to
+            'inline'.
+
+    Returns:
+        dict: Names of the written, unchanged & deleted trackers.
+    """
+    out_dirpath = pathlib.Path(out_dirpath)
+    out_dirpath.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest(out_dirpath)
+    options = {'version': EXPORT_VERSION, 'format': fmt, 'plotlyjs': plotlyjs}
+    if manifest.get('options') != options:
+        # Export everything again, but still delete the files of the trackers that are gone
+        manifest = {'options': options, 'trackers': {
+            name: {**entry, 'digest': None}
+            for name, entry in manifest.get('trackers', {}).items()}}
+
+    trackers = {}
+    for okr, okr_info in data['okr_data'].items():
+        trackers[f'okr/{okr}'] = (
+            data['okr_pivot_parts'].get(okr, data['okr_pivot_data'].iloc[:0]),
+            {key: value for key, value in okr_info.items() if key != 'data'},
+            lambda okr=okr: [get_okr_graph_data(okr, data['okr_data'], data['okr_pivot_parts'])])
+    for habit, scores_df in data['habit_data'].items():
+        trackers[f'habit/{habit}'] = (
+            scores_df, {'habit': habit},
+            lambda habit=habit: list(get_habit_graph_data(habit, data['habit_rollups'])))
+
+    summary = {'written': [], 'unchanged': [], 'deleted': []}
+    stems = get_tracker_stems(trackers)
+    # Files of the trackers of this export, never deleted as the old files of another
+    files = {name: [stem.with_suffix(suffix).as_posix() for suffix in [f'.{fmt}', '.html']]
+             for name, stem in stems.items()}
+    used_files = {path for paths in files.values() for path in paths}
+    for name, (df, info, get_figures) in trackers.items():
+        digest = get_frame_digest(df, info)
+        entry = manifest['trackers'].get(name)
+        if entry is not None and entry['digest'] == digest and entry['files'] == files[name] and \
+                all((out_dirpath / path).exists() for path in entry['files']):
+            summary['unchanged'].append(name)
+            continue
+        data_path, html_path = files[name]
+        (out_dirpath / stems[name].parent).mkdir(exist_ok=True)
+        if fmt == 'parquet':
+            df.to_parquet(out_dirpath / data_path, index=False)
+        else:
+            df.to_csv(out_dirpath / data_path, index=False)
+        write_html_page(out_dirpath / html_path, name.split('/', 1)[1], get_figures(), plotlyjs)
+        for path in entry['files'] if entry is not None else []:
+            if path not in used_files:  # e.g. a data file of another format
+                (out_dirpath / path).unlink(missing_ok=True)
+        manifest['trackers'][name] = {'digest': digest, 'files': files[name]}
+        summary['written'].append(name)
+
+    for name in list(manifest['trackers']):
+        if name not in trackers:
+            for path in manifest['trackers'].pop(name)['files']:
+                if path not in used_files:
+                    (out_dirpath / path).unlink(missing_ok=True)
+            summary['deleted'].append(name)
+
+    write_manifest(out_dirpath, manifest)
+    return summary
+
+
+def get_frame_digest(df, info):
+    """Get a digest of the data of a tracker.
+
+    Args:
+        df (DataFrame): Data of the tracker.
+        info (dict): Other details shown by the tracker, e.g. the KR criteria.
+
+    Returns:
+        str: Hex digest of the data.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([list(df.columns), info], sort_keys=True,
+                             default=lambda value: value.item()).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def write_html_page(html_path, title, figures, plotlyjs):
+    """Write the figures of a tracker to an HTML page.
+
+    Args:
+        html_path (Path): Path of the HTML file.
+        title (str): Title of the page.
+        figures (list): Figure dicts of the tracker.
+        plotlyjs (str): How the page gets plotly.js, see export_trackers.
+    """
+    # plotly.js is only needed once per page. The figures are not validated,
+    # as the dashboard ones, e.g. the 'line' traces plotly.js draws as scatter
+    divs = [pio.to_html(figure, full_html=False, validate=False,
+                        include_plotlyjs=PLOTLYJS_MODES[plotlyjs] if i == 0 else False)
+            for i, figure in enumerate(figures)]
+    with open(html_path, 'w', encoding="utf-8") as f:
+        f.write(f'<!DOCTYPE html>\n<html>\n<head><meta charset="utf-8"><title>{html.escape(title)}</title></head>\n'
+                f'<body>\n{"".join(divs)}\n</body>\n</html>\n')
+
+
+def get_tracker_stems(names):
+    """Get the paths of the files of some trackers, without their suffix.
+
+    Trackers whose names give the same slug, e.g. "O1 KR1: Hobby" & "O1 KR1
+    Hobby", get a short hash of their name after the slug, so one export never
+    overwrites another.
+
+    Args:
+        names (list): Names of the trackers, as kind/name, e.g. habit/jogging.
+
+    Returns:
+        dict: Path of the files of each tracker relative to the output folder,
+            keyed by the tracker name.
+    """
+    stems = {name: pathlib.Path(name.split('/', 1)[0]) / slugify(name.split('/', 1)[1])
+             for name in names}
+    counts = collections.Counter(stems.values())
+    for name, stem in stems.items():
+        if counts[stem] > 1:
+            digest = hashlib.sha256(name.encode()).hexdigest()[:8]
+            stems[name] = stem.with_name(f'{stem.name}-{digest}')
+    return stems
+
+
+def slugify(name):
+    """Get a file name for a tracker.
+
+    Args:
+        name (str): Name of the tracker, e.g. a habit or a KR.
+
+    Returns:
+        str: The name in lower case, with dashes for anything but letters & digits.
+    """
+    return re.sub(r'[^\w]+', '-', name.lower()).strip('-') or 'tracker'
+
+
+def read_manifest(out_dirpath):
+    """Read the manifest of a previous export.
+
+    Args:
+        out_dirpath (Path): Path of the output folder.
+
+    Returns:
+        dict: The manifest, empty if there was no export.
+    """
+    try:
+        with open(out_dirpath / MANIFEST_FILE, 'r', encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_manifest(out_dirpath, manifest):
+    """Write the manifest of an export, after all its files.
+
+    Args:
+        out_dirpath (Path): Path of the output folder.
+        manifest (dict): The manifest.
+    """
+    with open(out_dirpath / f'{MANIFEST_FILE}.tmp', 'w', encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(out_dirpath / f'{MANIFEST_FILE}.tmp', out_dirpath / MANIFEST_FILE)
@@ -0,0 +1,187 @@
+import cProfile
+import datetime as dt
+import os
+import pathlib
+import threading
+import time
+from contextlib import contextmanager
+
+METRICS_PREFIX = 'obsidian_dashboard'
+PROFILE_KEEP = 10  # Most reload profiles kept on disk
+# Created in the profiles folder to profile the next reload, e.g. with touch
+PROFILE_TRIGGER_FILE = 'PROFILE_NEXT'
+
+
+class ReloadMetrics:
+    """Wall time, call counts & note / task counts of the stages of the data
+    loads & reloads.
+
+    The stages are recorded by the reload thread, while the metrics endpoint
+    reads them from the request threads, so all the access goes through a lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # stage name -> dict with the calls & total seconds over all the reloads
+        self._stages = {}
+        # 'ok' / 'failed' -> number of reloads, including the first load
+        self._reloads = {'ok': 0, 'failed': 0}
+        self._last_reload = None  # Details of the last finished reload
+        self._current = None  # Stage seconds & counts of the running reload
+
+    def start_reload(self, kind):
+        """Start recording a reload.
+
+        Args:
+            kind (str): 'load' for the first load, 'reload' for the later ones.
+        """
+        with self._lock:
+            self._current = {'kind': kind, 'started_at': dt.datetime.now(),
+                             'start': time.perf_counter(), 'stages': {}, 'counts': {}}
+
+    @contextmanager
+    def stage(self, name):
+        """Record the wall time of a stage of the running reload.
+
+        Args:
+            name (str): Name of the stage.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self._lock:
+                totals = self._stages.setdefault(name, {'calls': 0, 'seconds': 0.0})
+                totals['calls'] += 1
+                totals['seconds'] += seconds
+                if self._current is not None:
+                    self._current['stages'][name] = \
+                        self._current['stages'].get(name, 0.0) + seconds
+
+    def count(self, name, value):
+        """Record a count of the running reload, e.g. the parsed notes or the tasks.
+
+        Args:
+            name (str): Name of the count.
+            value (int): The count.
+        """
+        with self._lock:
+            if self._current is not None:
+                self._current['counts'][name] = value
+
+    def finish_reload(self, error=None, version=None):
+        """Finish recording the running reload.
+
+        Args:
+            error (Exception, optional): Error of the reload, None if it
+                succeeded. Defaults to None.
+            version (int, optional): Version of the data after the reload.
+                Defaults to None.
+        """
+        with self._lock:
+            current, self._current = self._current, None
+            if current is None:
+                return
+            self._reloads['failed' if error is not None else 'ok'] += 1
+            self._last_reload = {
+                'kind': current['kind'],
+                'started_at': current['started_at'].isoformat(),
+                'seconds': time.perf_counter() - current['start'],
+                'stages': current['stages'],
+                'counts': current['counts'],
+                'error': str(error) if error is not None else None,
+                'version': version,
+            }
+
+    def to_dict(self):
+        """Get the metrics as a JSON-compatible dict.
+
+        Returns:
+            dict: Totals of the stages & reloads, and details of the last reload.
+        """
+        with self._lock:
+            return {'stages': {name: dict(totals) for name, totals in self._stages.items()},
+                    'reloads': dict(self._reloads),
+                    'last_reload': self._last_reload}
+
+
+def format_prometheus(metrics):
+    """Format metrics in the Prometheus text exposition format.
+
+    Args:
+        metrics (dict): Metrics from ReloadMetrics.to_dict.
+
+    Returns:
+        str: The metrics as Prometheus text.
+    """
+    lines = []
+
+    def add(name, metric_type, help_text, samples):
+        lines.append(f'# HELP {METRICS_PREFIX}_{name} {help_text}')
+        lines.append(f'# TYPE {METRICS_PREFIX}_{name} {metric_type}')
+        for labels, value in samples:
+            label_text = ','.join(f'{key}="{label}"' for key, label in labels.items())
+            lines.append(f'{METRICS_PREFIX}_{name}' + (f'{{{label_text}}}' if label_text else '')
+                         + f' {float(value):g}')
+
+    stages = metrics.get('stages', {})
+    add('stage_seconds_total', 'counter', "Wall time spent in each reload stage.",
+        [({'stage': name}, totals['seconds']) for name, totals in stages.items()])
+    add('stage_calls_total', 'counter', "Number of runs of each reload stage.",
+        [({'stage': name}, totals['calls']) for name, totals in stages.items()])
+    add('reloads_total', 'counter', "Number of data loads & reloads.",
+        [({'result': result}, count) for result, count in metrics.get('reloads', {}).items()])
+    last_reload = metrics.get('last_reload')
+    if last_reload is not None:
+        add('last_reload_seconds', 'gauge', "Wall time of the last reload.",
+            [({'kind': last_reload['kind']}, last_reload['seconds'])])
+        add('last_reload_stage_seconds', 'gauge', "Wall time of each stage of the last reload.",
+            [({'stage': name}, seconds) for name, seconds in last_reload['stages'].items()])
+        add('last_reload_count', 'gauge', "Notes, tasks & trackers handled by the last reload.",
+            [({'count': name}, count) for name, count in last_reload['counts'].items()])
+    return '\n'.join(lines) + '\n'
+
+
+def pop_profile_trigger(profile_loc):
+    """Check if the next reload is to be profiled, removing the trigger file.
+
+    Args:
+        profile_loc (Path): Path of the profiles folder, None if not set.
+
+    Returns:
+        bool: True if the trigger file was there.
+    """
+    if not profile_loc:
+        return False
+    try:
+        os.remove(pathlib.Path(profile_loc) / PROFILE_TRIGGER_FILE)
+    except FileNotFoundError:
+        return False
+    return True
+
+
+@contextmanager
+def profile_reload(profile_loc):
+    """Profile the calling thread with cProfile, writing the profile to a file
+    of its own, e.g. for `python -m pstats` or snakeviz.
+
+    Only the last PROFILE_KEEP profiles are kept.
+
+    Args:
+        profile_loc (Path): Path of the profiles folder, nothing is profiled if None.
+    """
+    if not profile_loc:
+        yield
+        return
+    profile_loc = pathlib.Path(profile_loc)
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profile_loc.mkdir(parents=True, exist_ok=True)
+        profiler.dump_stats(profile_loc / f'reload-{dt.datetime.now():%Y%m%d-%H%M%S-%f}.prof')
+        for path in sorted(profile_loc.glob('reload-*.prof'))[:-PROFILE_KEEP]:
+            path.unlink(missing_ok=True)
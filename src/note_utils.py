@@ -1,5 +1,6 @@
-from markdown_it import MarkdownIt
-from bs4 import BeautifulSoup
+import functools
+import html
+import itertools
 import json
 import re
 from treelib import Node, Tree
@@ -8,7 +9,6 @@ import pathlib
 import os
 import datetime as dt
 
-md = MarkdownIt()
 load_dotenv()
 VAULT_LOC = pathlib.Path(os.getenv('VAULT_LOC'))
 # Maps for different fields
@@ -34,6 +34,62 @@ DATES_MAP = {
     '\\u2705': 'Done Date',
     '\\u274c': 'Cancelled Date'
 }
+# Patterns for the Markdown blocks & inline elements
+BLOCKQUOTE_PATTERN = re.compile(r'(?:[ ]{0,3}>[ ]?)+')
+LIST_ITEM_PATTERN = re.compile(r'(?:[-*+]|(\d{1,9})[.)])(?=[ \t]|$)')
+FENCE_PATTERN = re.compile(r'`{3,}(?=[^`]*$)|~{3,}')
+BLOCK_START_PATTERN = re.compile(
+    r'#{1,6}(?:[ \t]|$)|`{3,}(?=[^`]*$)|~{3,}|'
+    r'(?:(?:\*[ \t]*){3,}|(?:-[ \t]*){3,}|(?:_[ \t]*){3,})$')
+SETEXT_UNDERLINE_PATTERN = re.compile(r'(?:=+|-+)[ \t]*$')
+ESCAPE_PATTERN = re.compile(r'\\([!-/:-@\[-`{-~])')
+ESCAPE_OFFSET = 0xF0000  # Escaped characters are mapped to the private use area
+ESCAPE_MAP = {ESCAPE_OFFSET + c: c for c in range(0x21, 0x7f)}
+CODE_SPAN_PATTERN = re.compile(r'(?<!`)(`+)(?!`)(.+?)(?<!`)\1(?!`)', re.DOTALL)
+AUTOLINK_PATTERN = re.compile(
+    r'<([A-Za-z][A-Za-z0-9+.-]{1,31}:[^\s<>]*|[\w.!#$%&\'*+/=?^`{|}~-]+@[A-Za-z0-9-]+(?:\.[A-Za-z0-9-]+)*)>')
+HTML_COMMENT_PATTERN = re.compile(r'<!--.*?-->', re.DOTALL)
+HTML_ELEMENT_PATTERN = re.compile(
+    r'<([A-Za-z][A-Za-z0-9-]*)(?:\s[^<>]*)?>.*?</\1\s*>', re.DOTALL)
+HTML_TAG_PATTERN = re.compile(r'</?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?>')
+IMAGE_PATTERN = re.compile(
+    r'!\[(?:[^\[\]]|\[[^\[\]]*\])*\]\([^()\s]*(?:\s+"[^"]*")?\s*\)')
+LINK_PATTERN = re.compile(
+    r'\[((?:[^\[\]]|\[[^\[\]]*\])*)\]'
+    r'\((?:<[^<>\n]*>|[^()\s]*(?:\([^()\s]*\)[^()\s]*)*)'
+    r'(?:\s+(?:"[^"]*"|\'[^\']*\'|\([^()]*\)))?\s*\)')
+STRONG_PATTERNS = [
+    re.compile(r'\*\*(?=[^\s*])(.+?)(?<=[^\s*])\*\*', re.DOTALL),
+    re.compile(r'(?<![A-Za-z0-9_])__(?=[^\s_])(.+?)(?<=[^\s_])__(?![A-Za-z0-9_])', re.DOTALL)]
+EMPHASIS_PATTERNS = [
+    re.compile(r'\*(?=[^\s*])([^*]*?)(?<=[^\s*])\*'),
+    re.compile(r'(?<![A-Za-z0-9_])_(?=[^\s_])([^_]*?)(?<=[^\s_])_(?![A-Za-z0-9_])')]
+ENTITY_PATTERN = re.compile(
+    r'&(?:#[0-9]{1,7}|#[xX][0-9a-fA-F]{1,6}|[A-Za-z][A-Za-z0-9]{1,31});')
+# Patterns for the fields in the task titles
+OKR_FIELD_PATTERN = re.compile(r'\(([a-zA-Z\s]+)::(.+)\)')
+DATAVIEW_FIELD_PATTERN = re.compile(r'[\[\(]([a-zA-Z\s]+)::(.+)[\]\)]')
+# All the fields of a title in one scan. A match is the first character of a
+# field, and the field is read after it without consuming it, so the fields may
+# overlap.
+TITLE_FIELD_PATTERN = re.compile(r"""
+    # First character of any field, so the scan skips the other characters fast
+    [#(\[\x00-\x07\x0b\x0e-\x1f\x7f-\U0010ffff]
+    (?:
+        # Tag: a word starting with '#'
+        (?<=(?<!\S)\#) (?=(?P<tag>\S*))
+        # Tasks emoji field: a word starting with a character escaped as '\u'
+        # in JSON, with the next word, e.g. its date
+        | (?<=(?<![^ ])[^\x20-\x7e\b\f\n\r\t]) (?=(?P<field>[^ ]*)(?:[ ]+(?P<next>[^ ]+))?)
+        # OKR field, in parentheses: (key:: value)
+        | (?<=\() (?=(?P<okr_key>[a-zA-Z\s]+)::(?P<okr_value>.+)\))
+        # Dataview field, in brackets or parentheses: [key:: value]
+        | (?<=[\[(]) (?=(?P<dataview_key>[a-zA-Z\s]+)::(?P<dataview_value>.+)[\])])
+    )""", re.VERBOSE)
+TITLE_CACHE_SIZE = 2**16  # Most task titles kept with their fields
+# Identifiers of the task nodes, only unique within the process. Much cheaper
+# than the default uuid1 of treelib, as they only link the nodes of a tree.
+TASK_IDS = itertools.count()
 
 
 def parse_note_for_tasks(note, vault, okr=None):
@@ -51,113 +107,332 @@ def parse_note_for_tasks(note, vault, okr=None):
     note_path = VAULT_LOC / vault.md_file_index[note]
     with open(note_path, 'r', encoding="utf-8") as f:
         text = f.read()
-    html = md.render(text)
-    soup = BeautifulSoup(html, 'html.parser')
-    task_tree = Tree()
-    task_tree.create_node("Root", 'root')
-    # Passing an empty Tree with just the root node, it'll be filled with the tasks by the function
-    parse_html_for_tasks(soup, task_tree, 'root', note, okr)
-    return task_tree
+    return parse_text_for_tasks(text, note, okr)
+
 
+def parse_text_for_tasks(text, note, okr=None):
+    """Parse the text of a note to get all its tasks.
 
-def parse_html_for_tasks(elem, task_tree, root, note, okr=None):
-    """Recursively filters the element tree to retain only the required tasks
-    while retaining the tree structure.
+    Reads the checkbox list items straight from the Markdown source, line by line,
+    keeping a stack of the open list items to get their nesting from the indentation.
+    The list items & their lazy continuation lines follow the rules of markdown-it,
+    but the items of loose lists are read as tasks too. The title of an item is
+    only its first paragraph, even if some text follows a nested list in the item.
 
     Args:
-        elem (BeautifulSoup): A HTML element tree that needs to be parsed for tasks.
-        task_tree (Tree): A basic Tree object with just the master / root node.
-        root (str): Identifier of the root node in the task tree.
+        text (str): Markdown text of the note.
         note (str): Name of the note in the vault.
         okr (str, optional): The OKR tag used in the tasks to mark for a specific OKR.
             Defaults to None.
+
+    Returns:
+        Tree: Tasks tree object containing the tasks from the note.
     """
-    # Recursion just to one level below in this step
-    children = elem.findChildren(recursive=False)
-
-    # It is a todo/task if it is a Checkbox
-    if elem.name == "li" and elem.text.startswith('['):
-        task = convert_to_task(elem.__copy__(), note)
-        if okr is not None:
-            # Check if the task is marked for the OKR
-            if 'okr' in task.data and task.data['okr'] == okr:
-                task_tree.add_node(task, root)
-                # Children SHOULD NOT be checked for OKR if the parent is marked for the OKR
-                [parse_html_for_tasks(
-                    child, task_tree, task.identifier, note) for child in children]
-            else:  # Skip the task if it is not marked for the OKR
-                [parse_html_for_tasks(child, task_tree, root, note, okr)
-                 for child in children]
-        else:  # If OKR check is not needed, just add the task and parse the children
-            task_tree.add_node(task, root)
-            [parse_html_for_tasks(
-                child, task_tree, task.identifier, note, okr) for child in children]
-    else:  # If it is not a checkbox item, just parse the children
-        [parse_html_for_tasks(child, task_tree, root, note, okr)
-         for child in children]
-
-
-def convert_to_task(elem, note):
-    """Converts a HTML element into a task object.
+    task_tree = Tree()
+    task_tree.create_node("Root", 'root')
+    # Open list items, innermost last. Each item is a dict with the column of its
+    # marker & of its content, the lines of its first paragraph & the identifier
+    # of its task node.
+    items = []
+    paragraph = None  # Lines of the open paragraph
+    quote_depth = 0
+    fence = None  # Opening fence of the open fenced code block
+
+    def close_paragraph():
+        nonlocal paragraph
+        if paragraph is not None and items and items[-1]['lines'] is paragraph:
+            add_task(items[-1])
+        paragraph = None
+
+    def add_task(item):
+        # It is a todo/task if it is a Checkbox. Tasks are nested under the
+        # closest task, skipping the list items that are not tasks.
+        raw_text = '\n'.join(item['lines'])
+        if render_inline_text(raw_text, title=False).startswith('['):
+            parent = next((i['task'] for i in reversed(items[:-1])
+                           if i['task'] is not None), 'root')
+            task = convert_to_task(render_inline_text(raw_text), note, raw_text)
+            task_tree.add_node(task, parent)
+            item['task'] = task.identifier
+
+    def close_items(indent):
+        # Close the items that a line with this indentation is not a part of
+        while items and indent < items[-1]['column']:
+            close_paragraph()
+            items.pop()
+
+    for line in get_body_lines(text):
+        # Lines in a fenced code block are skipped until its closing fence, or
+        # until the blockquote containing it ends
+        if fence is not None:
+            match = re.match(r'(?:[ ]{0,3}>[ ]?){%d}' % quote_depth, line)
+            if match is not None:
+                content = line[match.end():].lstrip(' \t')
+                if content.startswith(fence) and not content.rstrip().strip(fence[0]):
+                    fence = None
+                continue
+            fence = None
+
+        # Lists do not continue across blockquote boundaries, but a paragraph in
+        # a blockquote does continue on lazy continuation lines
+        match = BLOCKQUOTE_PATTERN.match(line)
+        depth = match[0].count('>') if match else 0
+        if match:
+            line = line[match.end():]
+        content = line.lstrip(' \t')
+        if depth < quote_depth and paragraph is not None and content and \
+                (get_column(line, len(line) - len(content)) >= 4 or
+                 not (BLOCK_START_PATTERN.match(content) or LIST_ITEM_PATTERN.match(content))):
+            paragraph.append(content.strip())
+            continue
+        if depth != quote_depth:
+            close_items(0)
+            close_paragraph()
+            quote_depth = depth
+
+        if not content:
+            close_paragraph()
+            continue
+        indent = get_column(line, len(line) - len(content))
+        container = next((item['column'] for item in reversed(items)
+                          if indent >= item['column']), 0)
+
+        # Indented code, unless it continues the open paragraph. A list item
+        # less indented than the innermost item still ends the paragraph, if it
+        # is not indented by 4 or more from the content of the enclosing item.
+        if indent - container >= 4:
+            if paragraph is not None and not (
+                    items and LIST_ITEM_PATTERN.match(content) and indent < items[-1]['column'] and
+                    indent - (items[-2]['column'] if len(items) > 1 else 0) < 4):
+                paragraph.append(content.strip())
+            else:
+                close_items(indent)
+                close_paragraph()
+            continue
+
+        # A setext heading underline turns the open paragraph into a heading,
+        # unless it is a lazy continuation line
+        if paragraph is not None and SETEXT_UNDERLINE_PATTERN.match(content) and \
+                indent >= (items[-1]['column'] if items else 0):
+            paragraph = None
+            continue
+
+        # Headings, fenced code blocks & thematic breaks
+        if BLOCK_START_PATTERN.match(content):
+            close_items(indent)
+            close_paragraph()
+            fence = get_fence(content)
+            continue
+
+        match = LIST_ITEM_PATTERN.match(content)
+        if match is not None and paragraph is not None and \
+                (not items or indent >= items[-1]['column']) and \
+                not interrupts_paragraph(content):
+            match = None
+
+        if match is None:
+            if paragraph is not None:  # Continuation lines, even if lazy
+                paragraph.append(content.strip())
+                continue
+            close_items(indent)
+            if items and items[-1]['lines'] == [] and items[-1]['task'] is None:
+                # The first paragraph of an item that starts on the next line
+                paragraph = items[-1]['lines']
+            else:
+                paragraph = []
+            paragraph.append(content.strip())
+            continue
+
+        close_items(indent)
+        close_paragraph()
+        # The item content can directly start with another list item or block
+        start = len(line) - len(content)
+        while match is not None:
+            marker_end = start + match.end()
+            item_indent = get_column(line, start)
+            content = line[marker_end:].lstrip(' \t')
+            start = len(line) - len(content)
+            marker_column = get_column(line, marker_end)
+            column = get_column(line, start)
+            item = {'indent': item_indent, 'column': column, 'lines': None, 'task': None}
+            items.append(item)
+            if not content:
+                item['column'] = marker_column + 1
+                item['lines'] = []
+                break
+            if column - marker_column > 4:  # Indented code
+                item['column'] = marker_column + 1
+                break
+            if BLOCK_START_PATTERN.match(content):
+                fence = get_fence(content)
+                break
+            match = LIST_ITEM_PATTERN.match(content)
+            if match is None:
+                paragraph = item['lines'] = [content.strip()]
+
+    close_items(0)
+    close_paragraph()
+
+    if okr is not None:
+        return filter_okr_tasks(task_tree, okr)
+    return task_tree
+
+
+def interrupts_paragraph(content):
+    """Check if a line starts a list item that can interrupt a paragraph, i.e. a
+    non-empty item of a bullet list or of an ordered list starting at 1.
 
     Args:
-        elem (Tag): A HTML element to be converted into a task.
-        note (str): Name of the note in the vault containing elem.
+        content (str): Line of text, without its indentation.
 
-    Raises:
-        ValueError: If the task text contains multiple task types, perhaps due to its child elements.
+    Returns:
+        bool: True if the line interrupts a paragraph.
+    """
+    match = LIST_ITEM_PATTERN.match(content)
+    return match is not None and content[match.end():].strip() != '' and \
+        match[1] in [None, '1']
+
+
+def get_body_lines(text):
+    """Get the lines of a note's text, without its front matter.
+
+    Args:
+        text (str): Markdown text of the note.
 
     Returns:
-        dict: Dict object containing the task details.
+        list: Lines of the note's body.
     """
-    # TODO: Consider refactoring this function to make it more readable and maintainable
-    # TODO: Add comments in this function body
-    task_node = Node()
-    task = {}
-    task['raw_text'] = elem.text  # storing raw text
+    lines = re.split(r'\r\n?|\n', text)
+    if lines[0].rstrip() == '---':
+        for i, line in enumerate(lines[1:], start=1):
+            if line.rstrip() == '---':
+                return lines[i+1:]
+    return lines
 
-    # Extract task title
-    for child in elem.find_all():
-        if child.name not in ['a', 'span', 'strong']:
-            child.decompose()
-    text = elem.get_text()
-    md_comment_pattern = r'%%(.+)[%%]?'
-    text = re.sub(md_comment_pattern, '', text, flags=re.DOTALL)
-    task['title'] = text[3:].strip()
 
-    task['status'] = STATUS_MAP.get(text[:3], None)
+def get_column(line, index):
+    """Get the column of a position in a line, with tab stops of 4 characters.
 
-    task['tags'] = [word.strip('#') for word in task['title'].split()
-                    if word.startswith('#')]
-    title_words = json.dumps(task['title']).strip('"').split()
-    task['fields'] = [word for word in title_words if word.startswith('\\u')]
+    Args:
+        line (str): Line of text.
+        index (int): Position in the line.
 
-    # Priority field (Tasks Obsidian plugin)
-    priority = [PRIORITY_MAP.get(field) for field in task['fields']
-                if field in PRIORITY_MAP]
-    task['priority'] = priority[0] if priority else None
+    Returns:
+        int: Column of the position.
+    """
+    return len(line[:index].expandtabs(4))
 
-    # Date fields (Tasks Obsidian plugin)
-    date_fields_utf = [field for field in task['fields'] if field in DATES_MAP]
-    for date_field in date_fields_utf:
-        task[DATES_MAP.get(date_field)] = dt.datetime.fromisoformat(
-            title_words[title_words.index(date_field)+1])
 
-    # OKR field (Dataview Obsidian plugin)
-    pattern_okr = r'\(([a-zA-Z\s]+)::(.+)\)'
-    matches_okr = re.findall(pattern_okr, task['title'])
-    for match in matches_okr:
-        task[match[0].strip()] = match[1].strip()
-    task['title'] = re.sub(pattern_okr, '', task['title']).strip()
+def get_fence(content):
+    """Get the opening fence of a fenced code block.
 
-    # Dataview fields (Dataview Obsidian plugin)
-    pattern_dv = r'[\[\(]([a-zA-Z\s]+)::(.+)[\]\)]'
-    matches_dv = re.findall(pattern_dv, task['title'])
-    for match in matches_dv:
-        key, val = match[0].strip(), match[1].strip()
-        if key in ['Story Points', 'duration']:
-            val = float(val)
-        task[key] = val
+    Args:
+        content (str): Line of text, without its indentation.
+
+    Returns:
+        str: The fence characters, None if the line does not open a fenced code block.
+    """
+    match = FENCE_PATTERN.match(content)
+    return match[0] if match else None
+
+
+def render_inline_text(text, title=True):
+    """Get the text of some inline Markdown content, as rendered in the note.
+
+    Args:
+        text (str): Inline Markdown content, e.g. the first paragraph of a list item.
+        title (bool, optional): Drop the text of the inline elements that are not
+            part of a task title, i.e. all but links, spans & strong emphasis.
+            Defaults to True.
+
+    Returns:
+        str: Text of the content.
+    """
+    # Escaped characters are hidden from the other patterns until the end
+    text = ESCAPE_PATTERN.sub(lambda m: chr(ESCAPE_OFFSET + ord(m[1])), text)
+    text = CODE_SPAN_PATTERN.sub('' if title else r'\2', text)
+    text = AUTOLINK_PATTERN.sub(r'\1', text)
+    text = HTML_COMMENT_PATTERN.sub('', text)
+    if title:
+        text = HTML_ELEMENT_PATTERN.sub(
+            lambda m: m[0] if m[1].lower() in ['a', 'span', 'strong'] else '', text)
+    text = HTML_TAG_PATTERN.sub('', text)
+    text = IMAGE_PATTERN.sub('', text)
+    text = LINK_PATTERN.sub(r'\1', text)
+    for pattern in STRONG_PATTERNS:
+        text = pattern.sub(r'\1', text)
+    for pattern in EMPHASIS_PATTERNS:
+        text = pattern.sub('' if title else r'\1', text)
+    text = ENTITY_PATTERN.sub(lambda m: html.unescape(m[0]), text)
+    return text.translate(ESCAPE_MAP)
+
+
+def filter_okr_tasks(task_tree, okr):
+    """Get the tasks marked for an OKR from the task tree of a fully parsed note.
+
+    Gives the same tree as parsing the note with the OKR tag, i.e. the children
+    of a marked task are kept without checking them for the OKR.
+
+    Args:
+        task_tree (Tree): Tasks tree of a note, parsed without an OKR tag.
+        okr (str): The OKR tag used in the tasks to mark for a specific OKR.
+
+    Returns:
+        Tree: Tasks tree object containing the tasks marked for the OKR.
+    """
+    okr_tree = Tree()
+    okr_tree.create_node("Root", 'root')
+
+    def add_marked_tasks(nid, root, marked):
+        for child in task_tree.children(nid):
+            child_marked = marked or child.data.get('okr') == okr
+            child_root = root
+            if child_marked:
+                okr_tree.create_node(child.tag, child.identifier,
+                                     parent=root, data=child.data)
+                child_root = child.identifier
+            add_marked_tasks(child.identifier, child_root, child_marked)
+
+    add_marked_tasks(task_tree.root, 'root', False)
+    return okr_tree
+
+
+def convert_to_task(text, note, raw_text=None):
+    """Converts the text of a checkbox list item into a task object.
+
+    Args:
+        text (str): Rendered text of the list item, starting with its checkbox.
+        note (str): Name of the note in the vault containing the list item.
+        raw_text (str, optional): Markdown source of the list item. Defaults to text.
+
+    Raises:
+        ValueError: If the task text contains multiple task types.
+
+    Returns:
+        Node: Node object containing the task details.
+    """
+    task_node = Node(identifier=next(TASK_IDS))
+    task = {}
+    task['raw_text'] = text if raw_text is None else raw_text  # storing raw text
+
+    # Extract task title, without the Markdown comment from its first '%%' on
+    comment_start = text.find('%%')
+    if comment_start != -1 and comment_start + 2 < len(text):
+        text = text[:comment_start]
+    title = text[3:].strip()
+    task['title'] = title
+    task['status'] = STATUS_MAP.get(text[:3], None)
+
+    # The fields only depend on the title, which repeats a lot, e.g. in habits
+    tags, fields, priority, dates, okr_fields, title, dataview_fields = \
+        get_title_fields(title)
+    task['tags'] = list(tags)
+    task['fields'] = list(fields)
+    task['priority'] = priority
+    task.update(dates)
+    task.update(okr_fields)
+    task['title'] = title
+    task.update(dataview_fields)
 
     # Task type field
     task_types = [tag for tag in task['tags']
@@ -167,8 +442,7 @@ def convert_to_task(elem, note):
     elif len(task_types) == 0:
         task['type'] = 'todo'
     else:
-        print(elem)
-        raise ValueError(f"Multiple task types found: {task_types}")
+        raise ValueError(f"Multiple task types found: {task_types} in {task['raw_text']!r}")
 
     # Story Points field (Dataview Obsidian plugin)
     if task['type'] in ['epic', 'story']:
@@ -182,26 +456,88 @@ def convert_to_task(elem, note):
     return task_node
 
 
-def filter_daily_tasks(task_tree, keywords, start_date=None, end_date=None):
-    """Filter a task tree, likely containing all the tasks from daily notes, based on keywords and date range.
+@functools.lru_cache(maxsize=TITLE_CACHE_SIZE)
+def get_title_fields(title):
+    """Get the fields of a task from its title.
+
+    The fields are found with a single scan of the title. The results are cached
+    by title, so they are all immutable.
 
     Args:
-        task_tree (Tree): Tree object containing the tasks from daily notes.
-        keywords (list): List of keywords to filter tasks.
-        start_date (datetime.date, optional): Start date for filtering. Defaults to None.
-        end_date (datetime.date, optional): End date for filtering. Defaults to None.
+        title (str): Title of the task, without its checkbox & comment.
 
     Returns:
-        Tree: Filtered task tree.
+        tuple: The tags, the Tasks emoji fields (escaped as in JSON), the
+            priority, the (name, date) pairs of the dates, the (name, value)
+            pairs of the OKR fields, the title without them & the (name, value)
+            pairs of the Dataview fields.
     """
-    subtree = Tree(task_tree, deep=True)
-    for node in subtree.expand_tree():
-        if subtree.depth(node) > 0:
-            date = subtree[node].data.get('file_name_date')
-            if (start_date is None or date >= start_date) and \
-                (end_date is None or date <= end_date) and \
-                    any(keyword.lower() in subtree[node].data.get('title').lower() for keyword in keywords):
-                continue
+    tags, fields, next_words, okr_matches, dataview_matches = [], [], {}, [], []
+    okr_end = dataview_end = 0
+    for match in TITLE_FIELD_PATTERN.finditer(title):
+        if match['tag'] is not None:
+            tags.append(match['tag'].strip('#'))
+        elif match['field'] is not None:
+            # The fields are escaped as in JSON, e.g. the emojis as '\\u' escapes
+            field = get_json_word(title, title[match.start():match.end('field')],
+                                  match.end('field'))
+            fields.append(field)
+            # The date of a date field is the word after its first occurrence
+            if match['next'] is not None:
+                next_words.setdefault(field, get_json_word(title, match['next'], match.end('next')))
             else:
-                subtree.link_past_node(node)
-    return subtree
+                next_words.setdefault(field, None)
+        elif match['okr_key'] is not None:
+            if match.start() >= okr_end:
+                okr_matches.append((match['okr_key'], match['okr_value']))
+                okr_end = match.end('okr_value') + 1
+        elif match.start() >= dataview_end:
+            dataview_matches.append((match['dataview_key'], match['dataview_value']))
+            dataview_end = match.end('dataview_value') + 1
+    tags, fields = tuple(tags), tuple(fields)
+
+    # Priority field (Tasks Obsidian plugin)
+    priority = next((PRIORITY_MAP[field] for field in fields if field in PRIORITY_MAP), None)
+
+    # Date fields (Tasks Obsidian plugin)
+    dates = []
+    for field in fields:
+        if field in DATES_MAP:
+            if next_words[field] is None:
+                raise IndexError(f"No date after the {DATES_MAP[field]} in {title!r}")
+            dates.append((DATES_MAP[field], dt.datetime.fromisoformat(next_words[field])))
+    dates = tuple(dates)
+
+    # OKR field (Dataview Obsidian plugin)
+    okr_fields = tuple((key.strip(), value.strip()) for key, value in okr_matches)
+    if okr_fields:
+        # A 'title' field replaces the title before the fields are removed from
+        # it, the Dataview fields are then those of the title left
+        title = OKR_FIELD_PATTERN.sub('', dict(okr_fields).get('title', title)).strip()
+        dataview_matches = DATAVIEW_FIELD_PATTERN.findall(title)
+
+    # Dataview fields (Dataview Obsidian plugin)
+    dataview_fields = tuple(
+        (key, float(val) if key in ['Story Points', 'duration'] else val)
+        for key, val in ((key.strip(), value.strip()) for key, value in dataview_matches))
+    return tags, fields, priority, dates, okr_fields, title, dataview_fields
+
+
+def get_json_word(title, word, end):
+    """Get a word of a task title escaped as in JSON, if it needs escaping.
+
+    Args:
+        title (str): Title of the task.
+        word (str): Word of the title, between spaces.
+        end (int): Position of the end of the word in the title.
+
+    Returns:
+        str: The escaped word, without its closing '"' if it ends a title ending
+            with '"'.
+    """
+    if word.isascii() and word.isprintable() and '"' not in word and '\\' not in word:
+        return word
+    word = json.dumps(word)[1:-1]
+    if title.endswith('"') and not title[end:].strip(' '):
+        word = word.rstrip('"')
+    return word
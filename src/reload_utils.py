@@ -0,0 +1,388 @@
+import datetime as dt
+import logging
+import threading
+import yaml
+from src.cache_utils import NoteCache, is_daily_note
+from src.metrics_utils import ReloadMetrics, profile_reload, pop_profile_trigger
+from src.utils import get_okr_cycle_data, get_daily_notes_tasks, \
+    get_habit_tracker_data, update_habit_tracker_data, get_habit_rollups, \
+    update_habit_rollups, parse_okr_note, get_kr_keywords
+from src.vault_utils import Vault, get_note_date
+
+RELOAD_STAGES = ['Scanning the vault', 'Parsing the changed notes',
+                 'Computing the OKR data', 'Computing the habit data']
+
+logger = logging.getLogger(__name__)
+
+
+class DataReloader:
+    """Builds the data of the dashboard & reloads it on a background thread.
+
+    The data is a dict that is never modified once built. A reload builds a new
+    one from the previous one & swaps it in with a single assignment, so the
+    callbacks always read a complete data snapshot, even while a reload runs.
+    """
+
+    def __init__(self, vault_loc, okr_note, habits, criteria, start_dates,
+                 snapshot_loc=None, profile_loc=None):
+        self.vault_loc = vault_loc
+        self.okr_note = okr_note
+        self.habits = habits
+        self.criteria = criteria
+        self.start_dates = start_dates
+        self.snapshot_loc = snapshot_loc
+        # Folder of the cProfile profiles, not profiled if not set. Only the
+        # first load & the reloads asked for with the trigger file are profiled.
+        self.profile_loc = profile_loc
+        self._profile_next = bool(profile_loc)
+        self.metrics = ReloadMetrics()
+        self.note_cache = None
+        # Latest vault index, ahead of the data's one if the last reload failed
+        self.vault = None
+        self.data = None
+        # Stage number & name of the running reload, None if no reload is running
+        self.progress = None
+        self.checked_at = None  # When the vault was last checked for changes
+        self.error = None  # Error of the last reload, None if it succeeded
+        self._lock = threading.Lock()
+        self._thread = None
+        # Changes to reload: a full vault scan, or the paths of the changed files
+        self._rescan = False
+        self._changed_paths = set()
+        # Notes changed since the data was last built, kept if a build fails
+        self._changed_notes = {}
+        # OKR notes whose tagged tasks may have changed since then
+        self._changed_okr_notes = set()
+
+    def load(self):
+        """Build the data in the calling thread, starting from the last snapshot
+        of the note cache if any.
+
+        Returns:
+            dict: Data of the dashboard.
+        """
+        with profile_reload(self._pop_profile_loc()):
+            self.metrics.start_reload('load')
+            error = None
+            try:
+                with self.metrics.stage('scan'):
+                    vault = self.vault = Vault(self.vault_loc)
+                if self.snapshot_loc:
+                    with self.metrics.stage('snapshot load'):
+                        self.note_cache = NoteCache.load(self.snapshot_loc, vault)
+                if self.note_cache is None:
+                    self.note_cache = NoteCache()
+                self.data = self._build(vault, None)
+            except Exception as e:
+                error = e
+                raise
+            finally:
+                self.progress = None
+                self.metrics.finish_reload(error, self.data['version'] if self.data else None)
+        return self.data
+
+    def start(self, paths=None):
+        """Start a reload on a background thread.
+
+        If a reload is already running, another one is run right after it, so
+        the changes made in the meantime are not missed.
+
+        Args:
+            paths (iterable, optional): Paths of the note files that changed,
+                to check just them instead of scanning the whole vault. Defaults
+                to None.
+
+        Returns:
+            bool: True if a new reload thread was started.
+        """
+        with self._lock:
+            if paths is None:
+                self._rescan = True
+            else:
+                self._changed_paths.update(paths)
+            if self._thread is not None:
+                return False
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+            return True
+
+    def is_running(self):
+        """Check if a reload is running.
+
+        Returns:
+            bool: True if a reload is running.
+        """
+        return self._thread is not None
+
+    def wait(self, timeout=None):
+        """Wait for the running reload, if any, to finish.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. Defaults to None.
+        """
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._rescan and not self._changed_paths:
+                    self._thread = None
+                    return
+                rescan, changed_paths = self._rescan, self._changed_paths
+                self._rescan, self._changed_paths = False, set()
+            with profile_reload(self._pop_profile_loc()):
+                self.metrics.start_reload('reload')
+                try:
+                    self.progress = (1, RELOAD_STAGES[0])
+                    with self.metrics.stage('scan'):
+                        if rescan or self.vault is None:
+                            self.vault = Vault(self.vault_loc)
+                        else:
+                            self.vault = self.vault.update(changed_paths)
+                    self.data = self._build(self.vault, self.data)
+                    self.error = None
+                except Exception as e:
+                    logger.exception("Reload failed, keeping the previous data")
+                    self.error = e
+                finally:
+                    self.progress = None
+                    self.metrics.finish_reload(
+                        self.error, self.data['version'] if self.data else None)
+
+    def _pop_profile_loc(self):
+        """Get where to write the profile of the reload about to run, once per
+        arming of the profiler.
+
+        Returns:
+            Path: Path of the profiles folder, None if the reload is not profiled.
+        """
+        profile_next, self._profile_next = self._profile_next, False
+        if profile_next or pop_profile_trigger(self.profile_loc):
+            return self.profile_loc
+        return None
+
+    def _build(self, vault, previous):
+        """Build the data of the dashboard, reusing the previous data if given.
+
+        Args:
+            vault (Vault): The vault object.
+            previous (dict): Previous data of the dashboard, None to build it all.
+
+        Returns:
+            dict: Data of the dashboard, the previous one if nothing changed.
+        """
+        self.progress = (2, RELOAD_STAGES[1])
+        today = dt.date.today()
+        start_dates = [dt.date.fromisoformat(date) for date in self.start_dates]
+        with self.metrics.stage('parse'):
+            # Only the daily notes within the dates of a tracker are parsed
+            new_changed_notes = self.note_cache.refresh(
+                vault, [(start_date, today) for start_date in start_dates])
+        if new_changed_notes and self.snapshot_loc:
+            with self.metrics.stage('snapshot save'):
+                self.note_cache.save(self.snapshot_loc, vault)
+        self.checked_at = dt.datetime.now()
+        self.metrics.count('notes', len(vault.md_file_index))
+        self.metrics.count('changed_notes', len(new_changed_notes))
+        self.metrics.count('tasks', len(self.note_cache.get_table()))
+        self._changed_notes.update(new_changed_notes)
+        self._changed_okr_notes.update(self.note_cache.pop_changed_okr_notes())
+        changed_notes = self._changed_notes
+        # The scores also depend on today's date, so recompute them on a new day
+        if previous is not None and not changed_notes and \
+                previous['data_date'] == today:
+            return previous
+
+        # Daily notes are parsed once and shared by all the trackers, each
+        # tracker reads the daily notes within its dates
+        self.progress = (3, RELOAD_STAGES[2])
+        with self.metrics.stage('daily tasks'):
+            habit_tasks = {start_date: get_daily_notes_tasks(self.note_cache, start_date, today)
+                           for start_date in set(start_dates)}
+        # The habit dates all end today, so the earliest start date reads them all
+        self.metrics.count('daily_tasks', max(map(len, habit_tasks.values()), default=0))
+        changed_dates = {get_note_date(note) for note, note_path in changed_notes.items()
+                         if is_daily_note(note_path)} - {None}
+        with self.metrics.stage('okr'):
+            okr_cycles, okr_infos = self._parse_okr_cycles(vault, previous, changed_dates)
+        with self.metrics.stage('keywords'):
+            # The keywords of all the trackers are found in the daily tasks in
+            # one scan, each tracker then keeps the tasks within its dates
+            self.note_cache.get_keyword_index().find(
+                self.habits + get_kr_keywords(okr_infos.values()))
+        with self.metrics.stage('okr'):
+            okr_cycles = self._build_okr_cycles(vault, okr_cycles, okr_infos)
+        self.metrics.count('okr_cycles', len(okr_cycles))
+
+        self.progress = (4, RELOAD_STAGES[3])
+        with self.metrics.stage('habits'):
+            if previous is None:
+                habit_data = {habit: get_habit_tracker_data(
+                    habit, self.criteria[i], start_dates[i], habit_tasks[start_dates[i]])
+                    for i, habit in enumerate(self.habits)}
+                habit_rollups = {habit: get_habit_rollups(scores_df)
+                                 for habit, scores_df in habit_data.items()}
+            else:
+                habit_data = {habit: update_habit_tracker_data(
+                    previous['habit_data'][habit], habit, self.criteria[i],
+                    start_dates[i], habit_tasks[start_dates[i]], changed_dates)
+                    for i, habit in enumerate(self.habits)}
+                habit_rollups = {habit: update_habit_rollups(
+                    previous['habit_rollups'][habit], scores_df, changed_dates)
+                    for habit, scores_df in habit_data.items()}
+
+        self._changed_notes = {}
+        self._changed_okr_notes = set()
+        return {
+            'version': previous['version'] + 1 if previous is not None else 1,
+            'built_at': dt.datetime.now(),
+            'data_date': today,
+            'vault': vault,
+            # The cycle of OKR_NOTE is shown by default, its data is also kept
+            # at the top level
+            'okr_note': self.okr_note,
+            **okr_cycles[self.okr_note],
+            'okr_cycles': okr_cycles,
+            'habit_data': habit_data,
+            'habit_rollups': habit_rollups,
+        }
+
+    def _parse_okr_cycles(self, vault, previous, changed_dates):
+        """Find the OKR cycles of the vault that must be computed again, and
+        parse their OKR notes.
+
+        A cycle is computed again if its OKR note changed, if a daily note of
+        its date range changed, if the tasks marked for it may have changed,
+        or on a new day within its date range, as the scores depend on today's
+        date.
+
+        Args:
+            vault (Vault): The vault object.
+            previous (dict): Previous data of the dashboard, None to build it all.
+            changed_dates (set): Dates of the changed daily notes.
+
+        Returns:
+            tuple: Data of the cycles of the previous data that no change can
+                affect, keyed by the OKR note name, & the KR info of the cycles
+                to compute again, from parse_okr_note.
+        """
+        previous_cycles = previous['okr_cycles'] if previous is not None else {}
+        today = dt.date.today()
+        okr_cycles = {}
+        okr_infos = {}
+        for okr_note in set(self.note_cache.get_cycles()) | {self.okr_note}:
+            cycle = previous_cycles.get(okr_note)
+            if cycle is None or okr_note in self._changed_notes or \
+                    okr_note in self._changed_okr_notes or \
+                    any(cycle['okr_start_date'] <= date <= cycle['okr_end_date']
+                        for date in changed_dates) or \
+                    (previous['data_date'] != today and cycle['okr_start_date'] <= today
+                     and cycle['okr_end_date'] >= previous['data_date']):
+                try:
+                    okr_infos[okr_note] = parse_okr_note(okr_note, vault)
+                except (OSError, ValueError, KeyError, yaml.YAMLError) as e:
+                    self._skip_okr_cycle(okr_note, e)
+            else:
+                okr_cycles[okr_note] = cycle
+        return okr_cycles, okr_infos
+
+    def _build_okr_cycles(self, vault, okr_cycles, okr_infos):
+        """Build the index of the OKR cycles in the vault.
+
+        Args:
+            vault (Vault): The vault object.
+            okr_cycles (dict): Data of the cycles to keep, keyed by the OKR note name.
+            okr_infos (dict): KR info of the cycles to compute, keyed by the
+                OKR note name.
+
+        Returns:
+            dict: Data of each cycle from get_okr_cycle_data, keyed by the OKR
+                note name, in the order of the start dates.
+        """
+        okr_cycles = dict(okr_cycles)
+        for okr_note, okr_info in okr_infos.items():
+            try:
+                cycle = get_okr_cycle_data(okr_note, vault, self.note_cache, okr_info)
+            except (OSError, ValueError, KeyError, yaml.YAMLError) as e:
+                self._skip_okr_cycle(okr_note, e)
+                continue
+            if cycle is not None:
+                okr_cycles[okr_note] = cycle
+            elif okr_note == self.okr_note:
+                raise ValueError(f"No KRs in the OKR note {okr_note}")
+        self.metrics.count('computed_okr_cycles', len(okr_infos))
+        return dict(sorted(okr_cycles.items(),
+                           key=lambda item: (item[1]['okr_start_date'], item[0])))
+
+    def _skip_okr_cycle(self, okr_note, error):
+        """Skip an OKR cycle whose OKR note is broken, unless it is OKR_NOTE.
+
+        Args:
+            okr_note (str): Name of the OKR note.
+            error (Exception): Error of the OKR note.
+
+        Raises:
+            Exception: The error, if the OKR note is OKR_NOTE.
+        """
+        if okr_note == self.okr_note:
+            raise error
+        # Only the cycle of OKR_NOTE is needed, skip the broken others
+        logger.warning("Ignoring the OKR cycle %s: %r", okr_note, error)
+
+    def get_status(self):
+        """Get a short status of the data, for showing in the dashboard.
+
+        Returns:
+            str: Progress of the running reload, or how old the data is.
+        """
+        return format_status(self.progress, self.checked_at, self.error)
+
+    def get_metrics(self):
+        """Get the timing metrics of the loads & reloads.
+
+        Returns:
+            dict: Metrics from ReloadMetrics.to_dict.
+        """
+        return self.metrics.to_dict()
+
+
+def format_status(progress, checked_at, error):
+    """Get a short status of the data, for showing in the dashboard.
+
+    Args:
+        progress (tuple): Stage number & name of the running reload, None if
+            no reload is running.
+        checked_at (datetime): When the vault was last checked for changes.
+        error (Exception): Error of the last reload, None if it succeeded.
+
+    Returns:
+        str: Progress of the running reload, or how old the data is.
+    """
+    if progress is not None:
+        return f"Reloading: {progress[1]} ({progress[0]}/{len(RELOAD_STAGES)})"
+    status = f"Data checked at {checked_at:%H:%M:%S}, " \
+        f"{get_age(dt.datetime.now() - checked_at)} ago"
+    if error is not None:
+        status = f"Reload failed ({error}). {status}"
+    return status
+
+
+def get_age(delta):
+    """Get a rough, readable duration.
+
+    Args:
+        delta (timedelta): Duration.
+
+    Returns:
+        str: Duration in seconds, minutes, hours or days.
+    """
+    seconds = int(delta.total_seconds())
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60} min"
+    if seconds < 86400:
+        return f"{seconds // 3600} h"
+    return f"{seconds // 86400} days"
@@ -0,0 +1,388 @@
+import datetime as dt
+import json
+import logging
+import os
+import pathlib
+import shutil
+import threading
+import time
+import numpy as np
+import pandas as pd
+from src.cache_utils import get_snapshot_dirpath
+from src.reload_utils import format_status
+from src.task_utils import TaskTable
+from src.utils import split_okr_pivot_data
+
+SHARED_DATA_VERSION = 4  # Version of the shared data format
+STATUS_FILE = 'STATUS.json'
+METRICS_FILE = 'METRICS.json'  # Timing metrics of the builder's reloads
+RELOAD_FILE = 'RELOAD'  # Created by the dashboard to ask the builder for a reload
+
+logger = logging.getLogger(__name__)
+
+
+def save_frame(df, dirpath, name):
+    """Write the columns of a DataFrame to a folder, as .npy files.
+
+    The text columns are written as the codes of their values in a .npy file,
+    with the values in a .json file, so no column needs pickling. The index is
+    not written.
+
+    Args:
+        df (DataFrame): DataFrame object with a default index.
+        dirpath (Path): Path of an existing folder.
+        name (str): Prefix of the file names.
+
+    Returns:
+        dict: Name of the type of each column, keyed by the column name.
+    """
+    column_types = {}
+    for i, column in enumerate(df.columns):
+        values = df[column].to_numpy()
+        if values.dtype == object:
+            codes, uniques = pd.factorize(values)
+            np.save(dirpath / f'{name}-{i}.npy', codes.astype(np.int32))
+            with open(dirpath / f'{name}-{i}.json', 'w', encoding="utf-8") as f:
+                json.dump(list(uniques), f, ensure_ascii=False)
+        else:
+            np.save(dirpath / f'{name}-{i}.npy', values)
+        column_types[column] = values.dtype.str
+    return column_types
+
+
+def load_frame(dirpath, name, column_types, mmap_mode=None):
+    """Read a DataFrame written by save_frame.
+
+    Args:
+        dirpath (Path): Path of the folder.
+        name (str): Prefix of the file names.
+        column_types (dict): Name of the type of each column, keyed by the
+            column name, as returned by save_frame.
+        mmap_mode (str, optional): Memory-map the numeric columns instead of
+            reading them, see numpy.load. Defaults to None.
+
+    Raises:
+        ValueError: If a column is missing the expected type or length.
+
+    Returns:
+        DataFrame: DataFrame object, sharing the memory of the mapped columns.
+    """
+    columns = {}
+    for i, (column, dtype) in enumerate(column_types.items()):
+        values = np.load(dirpath / f'{name}-{i}.npy', mmap_mode=mmap_mode,
+                         allow_pickle=False)
+        if np.dtype(dtype) == object:
+            with open(dirpath / f'{name}-{i}.json', 'r', encoding="utf-8") as f:
+                values = np.array(json.load(f) + [None], dtype=object)[values]
+        elif values.dtype != np.dtype(dtype):
+            raise ValueError(f"Unexpected type for the {column} column of {name}")
+        if columns and len(values) != len(next(iter(columns.values()))):
+            raise ValueError(f"Unexpected length for the {column} column of {name}")
+        columns[column] = values
+    return pd.DataFrame(columns, copy=False)
+
+
+def save_shared_data(data, shared_loc):
+    """Save the data shown by the dashboard as a new shared snapshot, replacing
+    the previous ones.
+
+    Only the data the dashboard callbacks & the JSON API read is saved, not
+    the vault index. Like the note cache snapshots, it is written to a folder
+    of its own, then made the latest one by atomically replacing the CURRENT
+    file.
+
+    Args:
+        data (dict): Data of the dashboard, as built by DataReloader.
+        shared_loc (Path): Path of the shared data folder.
+
+    Returns:
+        Path: Path of the snapshot folder.
+    """
+    shared_loc = pathlib.Path(shared_loc)
+    current_dirpath = get_snapshot_dirpath(shared_loc)
+    number = int(current_dirpath.name.split('-')[1]) + 1 if current_dirpath else 1
+    snapshot_dirpath = shared_loc / f'data-{number}'
+    if snapshot_dirpath.exists():  # Left over by an interrupted save
+        shutil.rmtree(snapshot_dirpath)
+    snapshot_dirpath.mkdir(parents=True)
+
+    meta = {
+        'format_version': SHARED_DATA_VERSION,
+        'version': data['version'],
+        'built_at': data['built_at'].isoformat(),
+        'data_date': data['data_date'].isoformat(),
+        'okr_note': data['okr_note'],
+        # The cycles are kept in order, like the habits below
+        'okr_cycles': [[okr_note, {
+            'okr_data': {okr: {key: value for key, value in kr_data.items() if key != 'data'}
+                         for okr, kr_data in cycle['okr_data'].items()},
+            'okr_start_date': cycle['okr_start_date'].isoformat(),
+            'okr_end_date': cycle['okr_end_date'].isoformat(),
+            'okr_pivot_data': save_frame(cycle['okr_pivot_data'], snapshot_dirpath,
+                                         f'okr_pivot_data-{i}'),
+            'okr_tasks': save_okr_tasks(cycle['okr_data'], snapshot_dirpath / f'okr_tasks-{i}'),
+        }] for i, (okr_note, cycle) in enumerate(data['okr_cycles'].items())],
+        # The habits are kept in order, their names may not be valid file names
+        'habit_data': [[habit, save_frame(df, snapshot_dirpath, f'habit_data-{i}')]
+                       for i, (habit, df) in enumerate(data['habit_data'].items())],
+        'habit_rollups': [[habit, {freq: save_frame(df, snapshot_dirpath, f'habit_rollups-{i}-{freq}')
+                                   for freq, df in rollups.items()}]
+                          for i, (habit, rollups) in enumerate(data['habit_rollups'].items())],
+    }
+    with open(snapshot_dirpath / 'meta.json', 'w', encoding="utf-8") as f:
+        # numpy scalars, e.g. the KR targets, as plain numbers
+        json.dump(meta, f, ensure_ascii=False, default=lambda value: value.item())
+
+    with open(shared_loc / 'CURRENT.tmp', 'w', encoding="utf-8") as f:
+        f.write(snapshot_dirpath.name)
+    os.replace(shared_loc / 'CURRENT.tmp', shared_loc / 'CURRENT')
+
+    # Keep the previous snapshot, it may still be being loaded by a worker
+    for dirpath in shared_loc.glob('data-*'):
+        if dirpath not in [snapshot_dirpath, current_dirpath]:
+            shutil.rmtree(dirpath, ignore_errors=True)
+    return snapshot_dirpath
+
+
+def load_shared_data(snapshot_dirpath):
+    """Load a shared snapshot, memory-mapping its numeric columns read-only.
+
+    Args:
+        snapshot_dirpath (Path): Path of the snapshot folder.
+
+    Raises:
+        ValueError: If the snapshot has another format version.
+
+    Returns:
+        dict: Data of the dashboard, without the vault.
+    """
+    with open(snapshot_dirpath / 'meta.json', 'r', encoding="utf-8") as f:
+        meta = json.load(f)
+    if meta['format_version'] != SHARED_DATA_VERSION:
+        raise ValueError(f"Unexpected shared data format: {meta['format_version']}")
+    okr_cycles = {}
+    for i, (okr_note, cycle_meta) in enumerate(meta['okr_cycles']):
+        okr_pivot_data = load_frame(snapshot_dirpath, f'okr_pivot_data-{i}',
+                                    cycle_meta['okr_pivot_data'], mmap_mode='r')
+        okr_cycles[okr_note] = {
+            'okr_data': load_okr_tasks(cycle_meta['okr_data'], cycle_meta['okr_tasks'],
+                                       snapshot_dirpath / f'okr_tasks-{i}'),
+            'okr_start_date': dt.date.fromisoformat(cycle_meta['okr_start_date']),
+            'okr_end_date': dt.date.fromisoformat(cycle_meta['okr_end_date']),
+            'okr_pivot_data': okr_pivot_data,
+            'okr_pivot_parts': split_okr_pivot_data(okr_pivot_data),
+        }
+    return {
+        # The snapshot number keeps growing when the builder is restarted
+        'version': int(snapshot_dirpath.name.split('-')[1]),
+        'built_at': dt.datetime.fromisoformat(meta['built_at']),
+        'data_date': dt.date.fromisoformat(meta['data_date']),
+        'okr_note': meta['okr_note'],
+        **okr_cycles[meta['okr_note']],
+        'okr_cycles': okr_cycles,
+        'habit_data': {habit: load_frame(snapshot_dirpath, f'habit_data-{i}',
+                                         column_types, mmap_mode='r')
+                       for i, (habit, column_types) in enumerate(meta['habit_data'])},
+        'habit_rollups': {habit: {freq: load_frame(snapshot_dirpath, f'habit_rollups-{i}-{freq}',
+                                                   column_types, mmap_mode='r')
+                                  for freq, column_types in rollup_types.items()}
+                          for i, (habit, rollup_types) in enumerate(meta['habit_rollups'])},
+    }
+
+
+def save_okr_tasks(okr_data, dirpath):
+    """Write the task tables of the KRs of a cycle to a folder, as a single table.
+
+    Args:
+        okr_data (dict): OKR data of the cycle, with the full task table of each KR.
+        dirpath (Path): Path of the folder, created.
+
+    Returns:
+        list: Name of each KR with a task table & its number of tasks, in the
+            order of the table.
+    """
+    dirpath.mkdir()
+    krs = [okr for okr, kr_data in okr_data.items() if 'data' in kr_data]
+    TaskTable.concat(okr_data[okr]['data'] for okr in krs).save(dirpath)
+    return [[okr, len(okr_data[okr]['data'])] for okr in krs]
+
+
+def load_okr_tasks(okr_data, okr_tasks, dirpath):
+    """Read the task tables of the KRs of a cycle written by save_okr_tasks,
+    memory-mapping their numeric columns read-only.
+
+    Args:
+        okr_data (dict): OKR data of the cycle, without the task tables.
+        okr_tasks (list): Name of each KR & its number of tasks, as returned
+            by save_okr_tasks.
+        dirpath (Path): Path of the folder.
+
+    Returns:
+        dict: OKR data of the cycle, with the task table of each KR.
+    """
+    table = TaskTable.load(dirpath, mmap_mode='r')
+    start = 0
+    for okr, length in okr_tasks:
+        okr_data[okr]['data'] = table.slice(start, start + length)
+        start += length
+    return okr_data
+
+
+def write_json_atomic(path, value):
+    """Write a JSON file, replacing it atomically so it is never read half-written.
+
+    Args:
+        path (Path): Path of the file.
+        value: Value to write.
+    """
+    with open(f'{path}.tmp', 'w', encoding="utf-8") as f:
+        json.dump(value, f, ensure_ascii=False)
+    os.replace(f'{path}.tmp', path)
+
+
+def serve_shared_data(reloader, shared_loc, interval=0.5):
+    """Keep the shared snapshot of the data up to date, forever.
+
+    Meant for the builder process: every `interval` seconds the reload status
+    & metrics are published, the reloads asked for by the dashboard are
+    started, and the data of a finished reload is saved.
+
+    Args:
+        reloader (DataReloader): The reloader of the data, already loaded.
+        shared_loc (Path): Path of the shared data folder.
+        interval (float, optional): Interval in seconds of the checks.
+            Defaults to 0.5.
+    """
+    shared_loc = pathlib.Path(shared_loc)
+    shared_loc.mkdir(parents=True, exist_ok=True)
+    saved_data = None
+    status = None
+    metrics = None
+    while True:
+        if reloader.data is not saved_data:
+            saved_data = reloader.data
+            save_shared_data(saved_data, shared_loc)
+        new_status = {
+            'progress': reloader.progress,
+            'checked_at': reloader.checked_at.isoformat(),
+            'error': str(reloader.error) if reloader.error is not None else None,
+        }
+        if new_status != status:
+            status = new_status
+            write_json_atomic(shared_loc / STATUS_FILE, status)
+        new_metrics = reloader.get_metrics()
+        if new_metrics != metrics:
+            metrics = new_metrics
+            write_json_atomic(shared_loc / METRICS_FILE, metrics)
+        try:
+            os.remove(shared_loc / RELOAD_FILE)
+            reloader.start()
+        except FileNotFoundError:
+            pass
+        time.sleep(interval)
+
+
+class SharedDataReader:
+    """Reads the data shared by the builder process, for the dashboard workers.
+
+    Has the parts of the DataReloader interface used by the dashboard. The
+    numeric columns of the data, e.g. the dates & scores, are memory-mapped
+    read-only, so all the workers share the same pages of memory for them.
+    The text columns, e.g. the task titles & the KR names, are not shared:
+    each worker builds them from the values in their .json files. A new
+    snapshot is loaded as soon as the builder makes it the latest one.
+    """
+
+    def __init__(self, shared_loc, timeout=60):
+        """
+        Args:
+            shared_loc (Path): Path of the shared data folder.
+            timeout (float, optional): Time in seconds to wait for the builder
+                to save the first snapshot. Defaults to 60.
+
+        Raises:
+            TimeoutError: If there is no snapshot in time.
+        """
+        self.shared_loc = pathlib.Path(shared_loc)
+        self._lock = threading.Lock()
+        self._snapshot_dirpath = None
+        # Inode, mtime & size of the CURRENT file the snapshot was found in
+        self._current_stat = None
+        self._data = None
+        deadline = time.monotonic() + timeout
+        while self._data is None:
+            self._refresh()
+            if self._data is None:
+                if time.monotonic() > deadline:
+                    raise TimeoutError(f"No shared data in {self.shared_loc}")
+                time.sleep(0.5)
+
+    @property
+    def data(self):
+        """dict: Data of the dashboard, from the latest snapshot."""
+        self._refresh()
+        return self._data
+
+    def _refresh(self):
+        # The CURRENT file is only read again once the builder replaced it, so
+        # the callbacks of an unchanged snapshot just cost a stat call
+        try:
+            stat = os.stat(self.shared_loc / 'CURRENT')
+        except FileNotFoundError:
+            return
+        current_stat = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if current_stat == self._current_stat:
+            return
+        with self._lock:
+            if current_stat == self._current_stat:
+                return
+            snapshot_dirpath = get_snapshot_dirpath(self.shared_loc)
+            if snapshot_dirpath is None:
+                return
+            if snapshot_dirpath == self._snapshot_dirpath:
+                self._current_stat = current_stat
+                return
+            try:
+                self._data = load_shared_data(snapshot_dirpath)
+                self._snapshot_dirpath = snapshot_dirpath
+                self._current_stat = current_stat
+            except (OSError, ValueError, KeyError) as e:
+                # e.g. replaced & deleted while loading, the next call will retry
+                logger.warning("Cannot load the shared data in %s: %r", snapshot_dirpath, e)
+
+    def start(self):
+        """Ask the builder process for a reload.
+
+        Returns:
+            bool: Always True.
+        """
+        with open(self.shared_loc / RELOAD_FILE, 'w', encoding="utf-8"):
+            pass
+        return True
+
+    def get_status(self):
+        """Get a short status of the data, as published by the builder process.
+
+        Returns:
+            str: Progress of the running reload, or how old the data is.
+        """
+        try:
+            with open(self.shared_loc / STATUS_FILE, 'r', encoding="utf-8") as f:
+                status = json.load(f)
+        except (OSError, ValueError):
+            return "Waiting for the builder"
+        return format_status(status['progress'],
+                             dt.datetime.fromisoformat(status['checked_at']),
+                             status['error'])
+
+    def get_metrics(self):
+        """Get the timing metrics of the reloads, as published by the builder process.
+
+        Returns:
+            dict: Metrics from ReloadMetrics.to_dict, empty if not published yet.
+        """
+        try:
+            with open(self.shared_loc / METRICS_FILE, 'r', encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
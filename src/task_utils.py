@@ -0,0 +1,462 @@
+import datetime as dt
+import functools
+import json
+import re
+import numpy as np
+import pandas as pd
+from src.note_utils import STATUS_MAP
+
+STATUSES = list(STATUS_MAP.values())
+STATUS_CODES = {status: code for code, status in enumerate(STATUSES)}
+EVENT_PATTERN = re.compile(
+    r'^\b(\d{1,2}(:\d{2})?\s*(AM|PM)?)\s*-\s*(\d{1,2}(:\d{2})?\s*(AM|PM)?)\b')
+EVENT_CACHE_SIZE = 2**16  # Most task titles & dates kept with their event times
+
+
+class TaskTable:
+    """Columnar table of tasks, one row per task.
+
+    Each column is a numpy array of one of the COLUMNS types. The hierarchy of
+    the tasks is kept in the parent column, as the row of the parent task (-1
+    for the top level tasks), and a parent task always comes before its subtasks.
+
+    Filtering a table does not copy its columns: the filtered table shares the
+    columns of the full table and only keeps the index of the selected rows.
+    """
+    COLUMNS = {
+        'date': 'datetime64[D]',  # Date of the daily note, NaT for other notes
+        'status': np.int8,  # Index in STATUSES, -1 if the status is unknown
+        'duration': np.float64,  # Duration in hours, NaN if none
+        'story_points': np.float64,  # NaN if none
+        'done_date': 'datetime64[D]',  # NaT if none
+        'okr': object,  # OKR tag, None if none
+        'file': object,  # Name of the note containing the task
+        'title': object,
+        'parent': np.int32,  # Row of the parent task, -1 if none
+    }
+
+    def __init__(self, columns, rows=None, keyword_index=None):
+        self.columns = columns
+        # Index of the selected rows, None if all the rows are selected
+        self.rows = rows
+        # KeywordIndex over the titles of these columns, shared by the tables
+        # selected from them, built on the first keyword lookup if None
+        self.keyword_index = keyword_index
+
+    def __len__(self):
+        if self.rows is None:
+            return len(self.columns['parent'])
+        return len(self.rows)
+
+    def __getitem__(self, name):
+        if self.rows is None:
+            return self.columns[name]
+        return self.columns[name][self.rows]
+
+    @classmethod
+    def from_tree(cls, task_tree, date=None):
+        """Create a task table from the tasks tree of a note.
+
+        Args:
+            task_tree (Tree): Tasks tree object from parse_text_for_tasks.
+            date (datetime.date, optional): Date of the note if it is a daily note,
+                the durations of its events are then read from the task titles.
+                Defaults to None.
+
+        Returns:
+            TaskTable: Table of the tasks in the tree, in document order.
+        """
+        values = {name: [] for name in cls.COLUMNS}
+        rows = {}
+        for nid in task_tree.expand_tree(sorting=False):
+            parent = task_tree.parent(nid)
+            if parent is None:  # Root node
+                continue
+            task = task_tree[nid].data
+            rows[nid] = len(values['parent'])
+            values['parent'].append(rows.get(parent.identifier, -1))
+            values['date'].append(date)
+            values['status'].append(STATUS_CODES.get(task['status'], -1))
+            duration = task.get('duration', np.nan)
+            if date is not None:
+                event_data = read_event(date.isoformat(), task['title'])
+                if event_data is not None:
+                    duration = event_data['duration']
+            values['duration'].append(duration)
+            values['story_points'].append(task.get('Story Points', np.nan))
+            values['done_date'].append(task.get('Done Date'))
+            values['okr'].append(task.get('okr'))
+            values['file'].append(task['file_name'])
+            values['title'].append(task['title'])
+        return cls({name: np.array(values[name], dtype=dtype)
+                    for name, dtype in cls.COLUMNS.items()})
+
+    @classmethod
+    def concat(cls, tables):
+        """Concatenate some full task tables, e.g. the tables of all the notes.
+
+        Args:
+            tables (list): TaskTable objects, without any filtering.
+
+        Returns:
+            TaskTable: Table of the tasks of all the tables.
+        """
+        tables = list(tables)
+        columns = {name: np.concatenate([table[name] for table in tables] +
+                                        [np.array([], dtype=dtype)])
+                   for name, dtype in cls.COLUMNS.items()}
+        # Shift the parent rows by the position of their table, keeping the -1s
+        lengths = [len(table) for table in tables]
+        offsets = np.repeat(np.cumsum([0] + lengths)[:-1], lengths).astype(np.int32)
+        parents = columns['parent']
+        columns['parent'] = np.where(parents >= 0, parents + offsets, -1).astype(np.int32)
+        return cls(columns)
+
+    def save(self, dirpath):
+        """Write the columns of a full task table to a folder, as .npy files.
+
+        The text columns are written as the codes of their values in a .npy file,
+        with the values in a .json file, so no column needs pickling.
+
+        Args:
+            dirpath (Path): Path of an existing folder.
+        """
+        for name, column in self.columns.items():
+            if column.dtype == object:
+                codes, values = pd.factorize(column)
+                np.save(dirpath / f'{name}.npy', codes.astype(np.int32))
+                with open(dirpath / f'{name}.json', 'w', encoding="utf-8") as f:
+                    json.dump(list(values), f, ensure_ascii=False)
+            else:
+                np.save(dirpath / f'{name}.npy', column)
+
+    @classmethod
+    def load(cls, dirpath, mmap_mode=None):
+        """Read a task table written by TaskTable.save.
+
+        Args:
+            dirpath (Path): Path of the folder.
+            mmap_mode (str, optional): Memory-map the numeric columns instead of
+                reading them, see numpy.load. Defaults to None.
+
+        Raises:
+            ValueError: If a column is missing the expected type or length.
+
+        Returns:
+            TaskTable: The task table.
+        """
+        columns = {}
+        for name, dtype in cls.COLUMNS.items():
+            column = np.load(dirpath / f'{name}.npy', mmap_mode=mmap_mode,
+                             allow_pickle=False)
+            if dtype is object:
+                if column.dtype != np.int32:
+                    raise ValueError(f"Unexpected codes type for the {name} column")
+                with open(dirpath / f'{name}.json', 'r', encoding="utf-8") as f:
+                    # The -1 codes of the missing values pick the last value
+                    values = np.array(json.load(f) + [None], dtype=object)
+                column = values[column]
+            elif column.dtype != np.dtype(dtype):
+                raise ValueError(f"Unexpected type for the {name} column: {column.dtype}")
+            if len(column) != len(columns.get('date', column)):
+                raise ValueError(f"Unexpected length for the {name} column")
+            columns[name] = column
+        return cls(columns)
+
+    def slice(self, start, stop):
+        """Get a range of rows of a full task table, as a table of its own.
+
+        Args:
+            start (int): First row of the range.
+            stop (int): Row after the last row of the range.
+
+        Returns:
+            TaskTable: Table of the rows in the range.
+        """
+        columns = {name: column[start:stop] for name, column in self.columns.items()}
+        parents = columns['parent']
+        columns['parent'] = np.where(parents >= 0, parents - start, -1).astype(np.int32)
+        return TaskTable(columns)
+
+    def select(self, mask):
+        """Select some rows of the table, without copying its columns.
+
+        Args:
+            mask (ndarray): Boolean mask over the rows of this table.
+
+        Returns:
+            TaskTable: Table of the selected rows.
+        """
+        if self.rows is None:
+            return TaskTable(self.columns, np.flatnonzero(mask), self.keyword_index)
+        return TaskTable(self.columns, self.rows[mask], self.keyword_index)
+
+    def copy(self):
+        """Copy the selected rows to a table of their own, which no longer
+        shares, nor keeps in memory, the columns of the full table.
+
+        A task whose parent is not selected becomes a top level task.
+
+        Returns:
+            TaskTable: Table of the selected rows.
+        """
+        rows = self.rows if self.rows is not None else np.arange(len(self))
+        # New rows of the selected rows. The extra last position is for the -1 parent rows.
+        positions = np.full(len(self.columns['parent']) + 1, -1, dtype=np.int32)
+        positions[rows] = np.arange(len(rows))
+        columns = {name: column[rows] for name, column in self.columns.items()}
+        columns['parent'] = positions[columns['parent']]
+        return TaskTable(columns)
+
+    def filter_keywords(self, keywords, start_date=None, end_date=None):
+        """Get the daily note tasks matching some keywords within a date range.
+
+        Args:
+            keywords (list): List of keywords to match in the task title.
+            start_date (datetime.date, optional): Start date for filtering. Defaults to None.
+            end_date (datetime.date, optional): End date for filtering. Defaults to None.
+
+        Returns:
+            TaskTable: Table of the matching tasks.
+        """
+        dates = self['date']
+        mask = ~np.isnat(dates)
+        if start_date is not None:
+            mask &= dates >= np.datetime64(start_date, 'D')
+        if end_date is not None:
+            mask &= dates <= np.datetime64(end_date, 'D')
+        if self.keyword_index is None:
+            self.keyword_index = KeywordIndex(self.columns['title'], self.rows)
+        rows = self.rows if self.rows is not None else np.arange(len(self))
+        return self.select(mask & np.isin(rows, self.keyword_index.match(keywords),
+                                          assume_unique=True))
+
+    def filter_okr(self, okr):
+        """Get the tasks marked for an OKR, along with all their subtasks.
+
+        Args:
+            okr (str): The OKR tag used in the tasks to mark for a specific OKR.
+
+        Returns:
+            TaskTable: Table of the tasks marked for the OKR.
+        """
+        return self.filter_okrs([okr])[okr]
+
+    def filter_okrs(self, okrs):
+        """Get the tasks marked for each of some OKRs, along with all their subtasks.
+
+        The tasks under any OKR tag are found with a single pass over the full
+        table, each OKR is then resolved among those tasks only.
+
+        Args:
+            okrs (list): The OKR tags used in the tasks to mark for specific OKRs.
+
+        Returns:
+            dict: Table of the tasks marked for each OKR, keyed by the OKR tag.
+        """
+        # The marks are spread down the hierarchy one level at a time, as the
+        # parent rows always refer to the full table
+        candidates = np.flatnonzero(spread_marks(
+            self.columns['okr'] != None, self.columns['parent']))  # noqa: E711
+        # Parents of the candidates, as positions in the candidates. The extra
+        # last position is for the -1 parent rows.
+        positions = np.full(len(self.columns['parent']) + 1, -1, dtype=np.int64)
+        positions[candidates] = np.arange(len(candidates))
+        parents = positions[self.columns['parent'][candidates]]
+        okr_column = self.columns['okr'][candidates]
+
+        okr_tasks = {}
+        for okr in okrs:
+            rows = candidates[spread_marks(okr_column == okr, parents)]
+            if self.rows is not None:
+                rows = np.intersect1d(rows, self.rows)
+            okr_tasks[okr] = TaskTable(self.columns, rows)
+        return okr_tasks
+
+    def to_frame(self, columns):
+        """Get some columns of the table as a DataFrame.
+
+        Args:
+            columns (list): Names of the columns, the status column is given
+                as the status names.
+
+        Returns:
+            DataFrame: DataFrame object containing the columns.
+        """
+        data = {}
+        for name in columns:
+            if name == 'status':
+                data[name] = pd.Categorical.from_codes(self[name], STATUSES)
+            else:
+                data[name] = self[name]
+        return pd.DataFrame(data)
+
+
+class KeywordIndex:
+    """Lowercase substring index over the titles of some tasks of a table.
+
+    The titles are lowercased once and joined in a single string. The keywords
+    not looked up yet are found together, with a single scan of that string for
+    a pattern matching any of them, and the rows found for each keyword are
+    kept: the trackers sharing a keyword only pay for it once, and the tasks of
+    a tracker within some dates are an intersection with those rows.
+    """
+
+    def __init__(self, titles, rows=None):
+        """
+        Args:
+            titles (ndarray): Title column of a full task table.
+            rows (ndarray, optional): Rows of the tasks to index. Defaults to
+                None, for all the tasks.
+        """
+        self._rows = np.arange(len(titles)) if rows is None else np.asarray(rows)
+        lower_titles = [title.lower() for title in titles[self._rows]]
+        # Keywords never contain a line break, so a match is always in one title
+        self._text = '\n'.join(lower_titles)
+        lengths = np.array([len(title) + 1 for title in lower_titles], dtype=np.int64)
+        self._starts = np.cumsum(lengths) - lengths
+        self._matches = {}  # keyword -> sorted rows of the tasks with the keyword
+
+    def match(self, keywords):
+        """Get the tasks with any of some keywords in their title, ignoring the case.
+
+        Args:
+            keywords (list): List of keywords to match in the task title.
+
+        Returns:
+            ndarray: Sorted rows of the tasks, in the full table.
+        """
+        keywords = [keyword.lower() for keyword in keywords]
+        self.find(keywords)
+        if len(keywords) == 1:
+            return self._matches[keywords[0]]
+        return np.unique(np.concatenate(
+            [self._matches[keyword] for keyword in keywords] + [np.array([], dtype=np.int64)]))
+
+    def find(self, keywords):
+        """Find the tasks with some keywords in their title, ignoring the case,
+        with a single scan of the titles for all the keywords not found yet.
+
+        Args:
+            keywords (list): List of keywords, e.g. of all the trackers.
+        """
+        keywords = {keyword.lower() for keyword in keywords} - self._matches.keys()
+        if '' in keywords:
+            self._matches[''] = self._rows.copy()
+            keywords.remove('')
+        if not keywords:
+            return
+        # The longest keyword matching at a position comes first in the pattern,
+        # the other keywords matching there are its prefixes
+        keywords = sorted(keywords, key=len, reverse=True)
+        prefixes = {keyword: [other for other in keywords if keyword.startswith(other)]
+                    for keyword in keywords}
+        pattern = re.compile('|'.join(map(re.escape, keywords)))
+        positions = {keyword: [] for keyword in keywords}
+        # Matches may overlap, so the search starts again right after each match start
+        match = pattern.search(self._text)
+        while match is not None:
+            for keyword in prefixes[match[0]]:
+                positions[keyword].append(match.start())
+            match = pattern.search(self._text, match.start() + 1)
+        for keyword in keywords:
+            titles = np.searchsorted(self._starts, positions[keyword], side='right') - 1
+            self._matches[keyword] = self._rows[np.unique(titles)]
+
+
+def spread_marks(marked, parents):
+    """Mark the descendants of the marked tasks.
+
+    Args:
+        marked (ndarray): Boolean mask over the tasks.
+        parents (ndarray): Position of the parent of each task, -1 if none.
+
+    Returns:
+        ndarray: Boolean mask over the tasks, with the descendants marked.
+    """
+    has_parent = parents >= 0
+    while True:
+        spread = marked | (has_parent & marked[parents])
+        if (spread == marked).all():
+            return spread
+        marked = spread
+
+
+def read_event(date_string, title):
+    """Read the event start, end date-times from the title of a task if it is an event.
+
+    Args:
+        date_string (str): The date string in ISO format of the task/event.
+        title (str): The title of the task.
+
+    Returns:
+        dict: A dict containing the event start & end date-times and duration.
+    """
+    event_times = get_event_times(title)
+    if event_times is None:
+        return None
+    start_hours, start_minutes, end_hours, end_minutes = event_times
+    date = get_event_date(date_string)
+    event_start = date.replace(hour=start_hours, minute=start_minutes)
+    event_end = date.replace(hour=end_hours, minute=end_minutes)
+
+    # If the event ends on the next day
+    if event_end < event_start:
+        event_end += dt.timedelta(days=1)
+    duration = (event_end - event_start).total_seconds()/3600
+
+    return {'event_start': event_start, 'event_end': event_end, 'duration': duration}
+
+
+@functools.lru_cache(maxsize=EVENT_CACHE_SIZE)
+def get_event_times(title):
+    """Get the event start & end times from the title of a task if it is an event.
+
+    Args:
+        title (str): The title of the task.
+
+    Raises:
+        ValueError: If a time has no space before its AM/PM, e.g. '7PM'.
+
+    Returns:
+        tuple: The start hours & minutes and the end hours & minutes, on 24
+            hours, None if the task is not an event.
+    """
+    match = EVENT_PATTERN.search(title)
+    if match is None:
+        return None
+    return get_event_time(match[1], match[2], match[3]) + \
+        get_event_time(match[4], match[5], match[6])
+
+
+def get_event_time(time_string, minutes_string, am_pm):
+    """Get the hours & minutes on 24 hours of an event time.
+
+    Args:
+        time_string (str): The time, e.g. '7:15 PM'.
+        minutes_string (str): The minutes part of the time, e.g. ':15', None if not given.
+        am_pm (str): 'AM' or 'PM', None if not given.
+
+    Returns:
+        tuple: The hours & the minutes.
+    """
+    minutes = int(minutes_string[1:]) if minutes_string is not None else 0
+    hours = int(time_string.split(':')[0].split()[0])
+    if am_pm == 'PM' and hours != 12:
+        hours += 12
+    elif am_pm == 'AM' and hours == 12:
+        hours = 0
+    return hours, minutes
+
+
+@functools.lru_cache(maxsize=EVENT_CACHE_SIZE)
+def get_event_date(date_string):
+    """Get the midnight date-time of the date of an event.
+
+    Args:
+        date_string (str): The date string in ISO format of the task/event.
+
+    Returns:
+        datetime: The date-time at midnight.
+    """
+    return dt.datetime.combine(dt.date.fromisoformat(date_string), dt.time())
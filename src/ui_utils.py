@@ -1,18 +1,143 @@
+import threading
+from collections import OrderedDict
+import numpy as np
+import pandas as pd
+from dash import Patch
+from src.utils import HABIT_ROLLUP_FREQS
+
+FIGURE_CACHE_SIZE = 64  # Most figures kept, e.g. a few times all the trackers
+# Largest share of the points of a trace that are patched one by one, above
+# it the whole trace values are sent
+MAX_PATCHED_SHARE = 0.25
+MAX_BARS = 120  # Most bars in a habit graph, about 8 px per bar on a laptop screen
+RESOLUTION_NAMES = {'D': 'daily', 'W': 'weekly', 'M': 'monthly', 'Y': 'yearly'}
+
+
+class FigureCache:
+    """Bounded LRU cache of the figures of the recent data versions.
+
+    A figure is built the first time its tracker is shown for a data version,
+    then repeat page views & dropdown flips get the same figure back. The
+    figures of older versions are kept until they are the least recently
+    used, to patch the figures shown by the clients after a reload.
+    """
+
+    def __init__(self, maxsize=FIGURE_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._figures = OrderedDict()
+        self._lock = threading.Lock()  # Callbacks can run on several threads
+
+    def get(self, version, key, build):
+        """Get a figure, building it if it is not cached.
+
+        Args:
+            version (int): Version of the data the figure is built from.
+            key (Hashable): Key of the figure within the data version, e.g.
+                the tracker name.
+            build (callable): Builds the figure, called without arguments.
+
+        Returns:
+            The figure.
+        """
+        with self._lock:
+            if (version, key) in self._figures:
+                self._figures.move_to_end((version, key))
+                return self._figures[version, key]
+        figure = build()
+        with self._lock:
+            self._figures[version, key] = figure
+            if len(self._figures) > self.maxsize:
+                self._figures.popitem(last=False)
+        return figure
+
+    def peek(self, version, key):
+        """Get a cached figure, without building it.
+
+        Args:
+            version (int): Version of the data the figure is built from.
+            key (Hashable): Key of the figure within the data version.
+
+        Returns:
+            The figure, None if it is not cached.
+        """
+        with self._lock:
+            return self._figures.get((version, key))
+
+
+def get_figure_patch(old_figure, new_figure):
+    """Get the changes from a figure shown by a client to a newer one, as a
+    partial update of the figure.
+
+    The points of a trace are expected to be appended over time, e.g. the dates
+    of a habit, so only the changed values & the new points are sent.
+
+    Args:
+        old_figure (dict): Figure shown by the client, None if unknown.
+        new_figure (dict): Newer figure of the same graph.
+
+    Returns:
+        Patch or dict: Partial update of the figure, or the whole new figure if
+            the traces were not just changed or extended.
+    """
+    if old_figure is None or len(old_figure['data']) != len(new_figure['data']):
+        return new_figure
+    patch = Patch()
+    for i, (old_trace, new_trace) in enumerate(zip(old_figure['data'], new_figure['data'])):
+        old_x, new_x = np.asarray(old_trace['x']), np.asarray(new_trace['x'])
+        old_y, new_y = np.asarray(old_trace['y']), np.asarray(new_trace['y'])
+        if {key: value for key, value in old_trace.items() if key not in ('x', 'y')} != \
+                {key: value for key, value in new_trace.items() if key not in ('x', 'y')} or \
+                len(new_x) < len(old_x) or not np.array_equal(old_x, new_x[:len(old_x)]):
+            return new_figure
+        n_points = len(old_y)
+        changed = np.flatnonzero(~values_equal(old_y, new_y[:n_points]))
+        if len(changed) > MAX_PATCHED_SHARE * max(len(new_y), 1):
+            patch['data'][i]['y'] = list(new_y)
+            n_points = len(new_y)
+        else:
+            for j in changed:
+                patch['data'][i]['y'][int(j)] = new_y[j]
+        if len(new_x) > len(old_x):
+            patch['data'][i]['x'].extend(list(new_x[len(old_x):]))
+        if len(new_y) > n_points:
+            patch['data'][i]['y'].extend(list(new_y[n_points:]))
+    if old_figure['layout'] != new_figure['layout']:
+        patch['layout'] = new_figure['layout']
+    return patch
+
+
+def values_equal(a, b):
+    """Compare the values of two arrays, NaN values being equal to each other.
+
+    Args:
+        a (ndarray): First array.
+        b (ndarray): Second array, of the same length.
+
+    Returns:
+        ndarray: Mask of the equal values.
+    """
+    equal = a == b
+    if a.dtype.kind == 'f' and b.dtype.kind == 'f':
+        equal |= np.isnan(a) & np.isnan(b)
+    return equal
+
+
 # Functions to generate graph data for the OKR & Habit Trackers
-def get_okr_graph_data(okr, okr_data, okr_pivot_data):
+def get_okr_graph_data(okr, okr_data, okr_pivot_parts):
     """Get graph data to be used in okr_layout
 
     Args:
         okr (str): OKR name
         okr_data (dict): OKR data
-        okr_pivot_data (DataFrame): OKR pivot data to be used to generate OKR chart data
+        okr_pivot_parts (dict): OKR pivot data of each KR, from split_okr_pivot_data
 
     Returns:
         dict: Graph data to be used in okr_layout
     """
+    pivot_data = okr_pivot_parts.get(okr)
     return {'data': [
-        {'x': okr_pivot_data[okr_pivot_data.okr == okr]['date'],
-         'y': okr_pivot_data[okr_pivot_data.okr == okr][col],
+        {'x': pivot_data['date'] if pivot_data is not None else [],
+         'y': pivot_data[col] if pivot_data is not None else [],
          'type': 'line', 'name': name}
         for col, name in zip(['score', 'target_70_pct', 'target'],
                              ['score', '70% of target', 'target'])],
@@ -20,34 +145,189 @@ def get_okr_graph_data(okr, okr_data, okr_pivot_data):
                    'yaxis': {'title': okr_data[okr]['criteria']}}}
 
 
-def get_habit_graph_data(habit, habit_data):
+def get_okr_cycle_krs(okr_data):
+    """Get the KRs of an OKR cycle, in the order of their graphs.
+
+    Args:
+        okr_data (dict): OKR data of the cycle
+
+    Returns:
+        list: KR names, by priority
+    """
+    return [okr for okr, kr_data in sorted(
+        okr_data.items(), key=lambda item: item[1].get('priority', float('inf')))]
+
+
+def get_okr_cycle_options(okr_cycles):
+    """Get the options of the OKR cycle dropdown.
+
+    Args:
+        okr_cycles (dict): OKR cycle index - dict of the data of each cycle,
+            in the order of the start dates
+
+    Returns:
+        list: Dropdown options, labelled with the dates of the cycles
+    """
+    return [{'label': f"{okr_note} ({cycle['okr_start_date']} to {cycle['okr_end_date']})",
+             'value': okr_note}
+            for okr_note, cycle in okr_cycles.items()]
+
+
+def get_okr_grid_style(n_graphs):
+    """Get the style of the grid of the KR graphs.
+
+    Args:
+        n_graphs (int): Number of graphs
+
+    Returns:
+        dict: Style of the grid, with 2 rows of graphs
+    """
+    return {'display': 'grid',
+            'gap': '0px',  # Spacing between items
+            # 2 columns
+            'grid-template-columns': " ".join(['1fr'] * ((n_graphs+1)//2)),
+            'grid-auto-flow': 'row dense',  # Ensures children fill rows first
+            'align-items': 'start'  # Align items to the start of the row
+            }
+
+
+def get_okr_trend_graph_data(okr_cycles):
+    """Get graph data of the progress across the OKR cycles.
+
+    The progress of a KR is its latest score as a percentage of its target,
+    averaged over the KRs of each objective. Objectives are matched across
+    cycles by name.
+
+    Args:
+        okr_cycles (dict): OKR cycle index - dict of the data of each cycle,
+            in the order of the start dates
+
+    Returns:
+        dict: Graph data of the trend graph
+    """
+    progress = {}  # objective name -> cycle -> progress of each KR
+    for okr_note, cycle in okr_cycles.items():
+        for okr, kr_data in cycle['okr_data'].items():
+            pivot_data = cycle['okr_pivot_parts'].get(okr)
+            if pivot_data is None:
+                continue
+            scores = pivot_data['score'].to_numpy()
+            scores = scores[~np.isnan(scores)]
+            target = pivot_data['target'].to_numpy()[-1]
+            if len(scores) == 0 or not target > 0:
+                continue
+            progress.setdefault(kr_data['obj_name'], {}).setdefault(okr_note, []).append(
+                100 * scores[-1] / target)
+    okr_notes = list(okr_cycles.keys())
+    return {'data': [
+        {'x': okr_notes,
+         'y': [float(np.mean(cycle_progress[okr_note])) if okr_note in cycle_progress else None
+               for okr_note in okr_notes],
+         'type': 'line', 'name': obj_name}
+        for obj_name, cycle_progress in progress.items()],
+        'layout': {'title': 'Progress across the OKR cycles', 'showlegend': True,
+                   'font': {'size': 18}, 'yaxis': {'title': '% of target'}}}
+
+
+def get_habit_graph_data(habit, habit_rollups, view_range=None):
     """Get graph data to be used in habit_layout
 
+    The scores are shown at the finest resolution with at most MAX_BARS bars
+    in the viewed range, so a long-running habit is as cheap to show as a new
+    one. The second graph shows the next coarser resolution.
+
     Args:
         habit (str): Habit name
-        habit_data (dict): Habit data - dict of DataFrame objects
+        habit_rollups (dict): Habit rollups - dict of the rollups of each habit,
+            from get_habit_rollups
+        view_range (list, optional): Start & end dates of the viewed range, the
+            whole tracked range if None. Defaults to None.
 
     Returns:
-        dict: Graph data to be used in habit_layout
+        tuple: Graph data of the two graphs to be used in habit_layout
     """
-    df = habit_data[habit]
-    return {'data': [
-        {'x': df['date'], 'y': df['score'],
-         'type': 'bar', 'name': 'score'},
-    ], 'layout': {'title': habit if habit.startswith('#') else
-                  habit.title(), 'showlegend': False, 'font': {'size': 18},
-                  'yaxis': {'title': 'count'}}}, \
-        {'data': [
-            {'x': df['week'].unique(), 'y': df.groupby('week')['score'].sum(),
-             'type': 'bar', 'name': 'score'},
-        ], 'layout': {'title': habit if habit.startswith('#') else
-                      habit.title(), 'showlegend': False, 'font': {'size': 18},
-                      'yaxis': {'title': 'count'}}}
+    rollups = habit_rollups[habit]
+    dates = rollups['D']['date'].to_numpy()
+    if view_range is None:
+        start, end = (dates[0], dates[-1]) if len(dates) else (None, None)
+    else:
+        start, end = [np.datetime64(pd.Timestamp(date)) for date in view_range]
+    # Coarsest resolution as a fallback, a yearly graph has few bars anyway
+    main = next((i for i, freq in enumerate(HABIT_ROLLUP_FREQS)
+                 if len(get_period_rows(rollups[freq], start, end)) <= MAX_BARS),
+                len(HABIT_ROLLUP_FREQS) - 1)
+    title = habit if habit.startswith('#') else habit.title()
+    figures = []
+    for freq in [HABIT_ROLLUP_FREQS[main],
+                 HABIT_ROLLUP_FREQS[min(main + 1, len(HABIT_ROLLUP_FREQS) - 1)]]:
+        df = get_period_rows(rollups[freq], start, end)
+        layout = {'title': f"{title} ({RESOLUTION_NAMES[freq]})", 'showlegend': False,
+                  'font': {'size': 18}, 'yaxis': {'title': 'count'}}
+        if view_range is not None:
+            layout['xaxis'] = {'range': list(view_range)}
+        figures.append({'data': [
+            {'x': df['date'], 'y': df['score'], 'type': 'bar', 'name': 'score'},
+        ], 'layout': layout})
+    return tuple(figures)
 
 
-def display_page(pathname):
+def get_period_rows(period_scores, start, end):
+    """Get the periods of a habit rollup that overlap a date range.
+
+    Args:
+        period_scores (DataFrame): Rollup of a habit, sorted by the start date
+            of the periods.
+        start (datetime64): Start date of the range, None for an empty range.
+        end (datetime64): End date of the range.
+
+    Returns:
+        DataFrame: Rows of the periods.
+    """
+    if start is None:
+        return period_scores.iloc[:0]
+    dates = period_scores['date'].to_numpy()
+    first = max(np.searchsorted(dates, start, side='right') - 1, 0)
+    last = np.searchsorted(dates, end, side='right')
+    return period_scores.iloc[first:last]
+
+
+def get_view_range(relayout_data, view_range):
+    """Get the viewed date range of a graph after the user zoomed or panned it.
+
+    Args:
+        relayout_data (dict): relayoutData property of the graph.
+        view_range (list): Viewed range before, None for the whole range.
+
+    Returns:
+        list: Start & end dates of the viewed range, None for the whole range.
+    """
+    relayout_data = relayout_data or {}
+    if relayout_data.get('xaxis.autorange'):
+        return None
+    if 'xaxis.range[0]' in relayout_data:
+        return [relayout_data['xaxis.range[0]'], relayout_data['xaxis.range[1]']]
+    if 'xaxis.range' in relayout_data:
+        return list(relayout_data['xaxis.range'])
+    return view_range
+
+
+def get_page(pathname):
+    """Get the tracker shown at a path.
+
+    Args:
+        pathname (str): Path of the page, without the path prefix.
+
+    Returns:
+        str: 'okr' or 'habit', None if the path is unknown.
+    """
     if pathname == '/okr' or pathname == '/':
-        return {'display': 'block'}, {'display': 'none'}
+        return 'okr'
     elif pathname == '/habit':
-        return {'display': 'none'}, {'display': 'block'}
-    return {'display': 'none'}, {'display': 'none'}
+        return 'habit'
+    return None
+
+
+def display_page(pathname):
+    page = get_page(pathname)
+    return {'display': 'block' if page == 'okr' else 'none'}, \
+        {'display': 'block' if page == 'habit' else 'none'}
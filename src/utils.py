@@ -4,12 +4,11 @@ from bs4 import BeautifulSoup
 from dotenv import load_dotenv
 import pathlib
 import os
-from src.note_utils import parse_note_for_tasks, filter_daily_tasks
-from treelib import Tree
 import datetime as dt
 import ast
+import numpy as np
 import pandas as pd
-from itertools import product
+from src.vault_utils import get_front_matter_date
 
 md = MarkdownIt()
 load_dotenv()
@@ -18,87 +17,174 @@ DAILY_NOTES_LOC = pathlib.Path(os.getenv('DAILY_NOTES_LOC'))
 CRITERIA_STORY_POINTS = os.getenv('CRITERIA_STORY_POINTS')
 CRITERIA_COUNT = os.getenv('CRITERIA_COUNT')
 CRITERIA_DURATION = os.getenv('CRITERIA_DURATION')
+# Frequencies of the habit rollups, from the finest to the coarsest
+HABIT_ROLLUP_FREQS = ['D', 'W', 'M', 'Y']
 
 
 def get_okr_pivot_data(okr_data, okr_start_date, okr_end_date):
     """Get the chart data for a specific OKR cycle.
 
+    The scores of each KR are summed per date with a single groupby over the
+    columns of the KR tasks, then laid on the dates of the cycle & accumulated.
+
     Args:
-        okr_note (str): Name of the OKR note in the vault.
-        vault (Vault): The vault object containing the OKR note and data.
+        okr_data (dict): Dict object containing the OKR info & data from get_okr_data.
+        okr_start_date (datetime.date): Start date of the OKR cycle.
+        okr_end_date (datetime.date): End date of the OKR cycle.
 
     Returns:
         DataFrame: DataFrame object containing the chart data for the OKR cycle.
     """
     date_list = pd.date_range(okr_start_date, okr_end_date)
     today = dt.datetime.today()
-    pivot_data = pd.DataFrame(
-        list(product(okr_data.keys(), date_list)), columns=['okr', 'date'])
+    # Fraction of the cycle target to reach by each date
+    target_share = np.arange(1, len(date_list) + 1) / len(date_list)
 
+    pivot_list = []
     for okr in okr_data.keys():
-        score_list = []
-        node_list = okr_data[okr]['data'].all_nodes()[1:]
-        if okr_data[okr]['criteria'] == CRITERIA_COUNT:
-            for date in date_list[date_list <= today]:
-                score_list.append(
-                    len([n for n in node_list if n.data['file_name_date'] == date.date()]))
-        elif okr_data[okr]['criteria'] == CRITERIA_DURATION:
-            for date in date_list[date_list <= today]:
-                score_list.append(sum([n.data.get(
-                    'duration', 0) for n in node_list if n.data['file_name_date'] == date.date()]))
-        elif okr_data[okr]['criteria'] == CRITERIA_STORY_POINTS:
-            for date in date_list[date_list <= today]:
-                score_list.append(sum([n.data.get('Story Points', 0) for
-                                       n in node_list if 'Done Date' in n.data
-                                       and n.data['Done Date'] == date.date() and
-                                       n.data['status'] != 'Cancelled']))
-            okr_data[okr]['target'] = sum(
-                [n.data.get('Story Points') for n in node_list if n.data['status'] != 'Cancelled'])
-
-        pivot_data.loc[pivot_data['okr'] == okr, 'score'] = score_list + \
-            [None] * (len(date_list) - len(score_list))
-        pivot_data.loc[pivot_data['okr'] == okr, 'target'] = [
-            ((i+1) * okr_data[okr]['target']) / len(date_list) for i, date in enumerate(date_list)]
-
-    pivot_data['score'] = pivot_data.groupby(
-        'okr')['score'].transform(pd.Series.cumsum)
+        criteria = okr_data[okr]['criteria']
+        tasks_df = okr_data[okr]['data'].to_frame(
+            ['date', 'status', 'duration', 'story_points', 'done_date'])
+        if criteria in [CRITERIA_COUNT, CRITERIA_DURATION]:
+            daily_scores = get_daily_scores(tasks_df, criteria)
+        elif criteria == CRITERIA_STORY_POINTS:
+            tasks_df = tasks_df[tasks_df['status'] != 'Cancelled']
+            daily_scores = tasks_df.groupby('done_date')['story_points'].sum()
+            daily_scores.index = daily_scores.index.astype('datetime64[ns]')
+            okr_data[okr]['target'] = tasks_df['story_points'].sum()
+        else:
+            daily_scores = pd.Series(dtype=float)
+
+        if criteria in [CRITERIA_COUNT, CRITERIA_DURATION, CRITERIA_STORY_POINTS]:
+            scores = daily_scores.reindex(date_list, fill_value=0).astype(float)
+            scores[date_list > today] = np.nan
+        else:
+            scores = pd.Series(np.nan, index=date_list)
+        pivot_list.append(pd.DataFrame({
+            'okr': okr, 'date': date_list, 'score': scores.cumsum().values,
+            'target': target_share * okr_data[okr]['target']}))
+
+    pivot_data = pd.concat(pivot_list, ignore_index=True)
     pivot_data['target_70_pct'] = pivot_data['target'] * 0.7
 
     return pivot_data
 
 
-def get_okr_data(okr_note, vault):
+def split_okr_pivot_data(okr_pivot_data):
+    """Split the OKR pivot data by KR, so getting the data of a KR is a lookup.
+
+    Args:
+        okr_pivot_data (DataFrame): OKR pivot data from get_okr_pivot_data.
+
+    Returns:
+        dict: Pivot data of each KR, keyed by the KR name.
+    """
+    return dict(tuple(okr_pivot_data.groupby('okr', sort=False)))
+
+
+def get_daily_scores(tasks_df, criteria):
+    """Get the daily scores of some daily note tasks, for the count or duration criteria.
+
+    Args:
+        tasks_df (DataFrame): Tasks frame from TaskTable.to_frame, with the
+            date & duration columns.
+        criteria (str): Criteria used for scoring the tasks.
+
+    Returns:
+        Series: Series object containing the score for each date with tasks.
+    """
+    if criteria == CRITERIA_COUNT:
+        daily_scores = tasks_df.groupby('date').size()
+    elif criteria == CRITERIA_DURATION:
+        daily_scores = tasks_df.groupby('date')['duration'].sum()
+    daily_scores.index = daily_scores.index.astype('datetime64[ns]')
+    return daily_scores
+
+
+def get_okr_data(okr_note, vault, note_cache, okr_data=None):
     """Get all relevant data for a specific OKR cycle.
 
+    Only the daily notes within the dates of the cycle are read.
+
     Args:
         okr_note (str): Name of the OKR note in the vault.
         vault (Vault): The vault object containing the OKR note.
+        note_cache (NoteCache): Cache of the tasks parsed from every note.
+        okr_data (dict, optional): KR info from parse_okr_note, updated with
+            the KR data. Defaults to None, to parse the OKR note.
 
     Returns:
-        dict: Dict object containing the OKR info & data, uses Tree objects for
-         storing the KR data.
+        dict: Dict object containing the OKR info & data, uses TaskTable objects
+         for storing the KR data.
     """
     # okr_note = '2024 Nov'
     front_matter = vault.get_front_matter(okr_note)
-    okr_start_date = front_matter['start_date']
-    okr_end_date = front_matter['end_date']
+    okr_start_date = get_front_matter_date(front_matter['start_date'])
+    okr_end_date = get_front_matter_date(front_matter['end_date'])
 
     # Get the KR info from the OKR note
-    okr_data = parse_okr_note(okr_note, vault)
+    if okr_data is None:
+        okr_data = parse_okr_note(okr_note, vault)
 
     # Get the task / event / action data for each KR
-    daily_notes_tasks = get_daily_notes_tasks(vault)
+    # The tagged tasks of all the story points KRs are found together
+    kr_tagged_tasks = get_kr_tagged_tasks(
+        [okr_data[okr]['okr_tag'] for okr in okr_data.keys()
+         if okr_data[okr]['criteria'] == CRITERIA_STORY_POINTS], note_cache)
+    daily_notes_tasks = get_daily_notes_tasks(note_cache, okr_start_date, okr_end_date)
     for okr in okr_data.keys():
         keywords = okr_data[okr].get('keywords')
         if okr_data[okr]['criteria'] == CRITERIA_STORY_POINTS:
-            okr_data[okr]['data'] = get_kr_tagged_tasks(
-                okr_data[okr]['okr_tag'], vault)
+            okr_data[okr]['data'] = kr_tagged_tasks[okr_data[okr]['okr_tag']]
         elif okr_data[okr]['criteria'] in [CRITERIA_COUNT, CRITERIA_DURATION]:
-            okr_data[okr]['data'] = filter_daily_tasks(
-                daily_notes_tasks, keywords, okr_start_date, okr_end_date)
+            okr_data[okr]['data'] = daily_notes_tasks.filter_keywords(
+                keywords, okr_start_date, okr_end_date)
     return okr_data, okr_start_date, okr_end_date
 
 
+def get_okr_cycle_data(okr_note, vault, note_cache, okr_data=None):
+    """Get the OKR data & chart data of an OKR cycle, as kept in the OKR cycle index.
+
+    Args:
+        okr_note (str): Name of the OKR note in the vault.
+        vault (Vault): The vault object containing the OKR note.
+        note_cache (NoteCache): Cache of the tasks parsed from every note.
+        okr_data (dict, optional): KR info from parse_okr_note. Defaults to
+            None, to parse the OKR note.
+
+    Returns:
+        dict: Dict object with the okr_data, okr_start_date, okr_end_date,
+            okr_pivot_data & okr_pivot_parts of the cycle, None if the OKR
+            note has no KRs.
+    """
+    okr_data, okr_start_date, okr_end_date = get_okr_data(okr_note, vault, note_cache, okr_data)
+    if not okr_data:
+        return None
+    # The cycles are kept across reloads, without the task table they were found in
+    for okr in okr_data.keys():
+        if 'data' in okr_data[okr]:
+            okr_data[okr]['data'] = okr_data[okr]['data'].copy()
+    okr_pivot_data = get_okr_pivot_data(okr_data, okr_start_date, okr_end_date)
+    return {'okr_data': okr_data,
+            'okr_start_date': okr_start_date,
+            'okr_end_date': okr_end_date,
+            'okr_pivot_data': okr_pivot_data,
+            'okr_pivot_parts': split_okr_pivot_data(okr_pivot_data)}
+
+
+def get_kr_keywords(okr_infos):
+    """Get the keywords of the KRs of some OKR cycles.
+
+    Args:
+        okr_infos (iterable): KR info of each cycle, from parse_okr_note.
+
+    Returns:
+        list: The keywords.
+    """
+    return [keyword for okr_info in okr_infos for kr_info in okr_info.values()
+            for keyword in kr_info.get('keywords', [])]
+
+
 def parse_okr_note(okr_note, vault):
     """Get all the relevant OKR info from the OKR note for a specific OKR cycle.
 
@@ -119,20 +205,27 @@ def parse_okr_note(okr_note, vault):
     # Get the Objectives
     obj_pattern = r'(O\d+):(.+)'
     obj_matches = [re.search(obj_pattern, e.text)
-                   for e in soup.findAll('h1', recursive=False)]
+                   for e in soup.find_all('h1', recursive=False)]
+    if None in obj_matches:
+        raise ValueError(f"Objective heading without an objective key in {okr_note}")
     obj_map = {m[1].strip(): m[2].strip() for m in obj_matches}
 
     # Get the Key Results
     kr_pattern = r'(O\d+)\s(KR\d+):(.+)'
-    kr_elem_matches = [e for e in soup.findAll(
+    kr_elem_matches = [e for e in soup.find_all(
         'h3', recursive=False) if re.search(kr_pattern, e.text)]
-    kr_matches = [re.search(kr_pattern, e.text)
-                  for e in soup.findAll('h3', recursive=False)]
+    kr_matches = [re.search(kr_pattern, e.text) for e in kr_elem_matches]
 
     # Get the KR Criteria, Keywords and Targets
     criteria_pattern = r'\[criteria::(.+?)\]\s*(?:\[target::(.+?)\])?\s*(?:\[priority::(.+?)\])?\s*(?:\(keywords::(.+?)\))?'
-    criteria_matches = [re.search(
-        criteria_pattern, e.next_sibling.next_sibling.text) for e in kr_elem_matches]
+    criteria_matches = []
+    for e in kr_elem_matches:
+        # The criteria are in the block right after the KR heading
+        block = e.find_next_sibling()
+        match = re.search(criteria_pattern, block.text) if block is not None else None
+        if match is None:
+            raise ValueError(f"No criteria for the KR {e.text.strip()!r} in {okr_note}")
+        criteria_matches.append(match)
 
     # Create okr_info
     okr_info = {}
@@ -147,20 +240,26 @@ def parse_okr_note(okr_note, vault):
         if criteria_matches[i][3] is not None:
             okr_info[okr]['priority'] = int(criteria_matches[i][3].strip())
         if criteria_matches[i][4] is not None:
-            okr_info[okr]['keywords'] = ast.literal_eval(
-                criteria_matches[i][4].strip())
+            try:
+                keywords = ast.literal_eval(criteria_matches[i][4].strip())
+            except SyntaxError as e:
+                raise ValueError(f"Invalid keywords for the KR {okr} in {okr_note}") from e
+            if not isinstance(keywords, (list, tuple)) or \
+                    not all(isinstance(keyword, str) for keyword in keywords):
+                raise ValueError(f"Keywords of the KR {okr} in {okr_note} not a list of strings")
+            okr_info[okr]['keywords'] = keywords
 
     return okr_info
 
 
-def get_habit_tracker_data(habit, criteria, start_date, vault):
+def get_habit_tracker_data(habit, criteria, start_date, daily_notes_tasks):
     """Get the data for tracking a habit.
 
     Args:
         habit (str): Habit name
         criteria (str): Criteria used for tracking the habit
         start_date (datetime.date): Start date for tracking the habit
-        vault (Vault): The vault object containing the daily notes.
+        daily_notes_tasks (TaskTable): Tasks table from get_daily_notes_tasks.
 
     Returns:
         DataFrame: DataFrame object containing the data for tracking the habit.
@@ -168,125 +267,160 @@ def get_habit_tracker_data(habit, criteria, start_date, vault):
     today = dt.date.today()
     dates = pd.date_range(start_date, today)
 
-    daily_notes_tasks = get_daily_notes_tasks(vault)
-    habit_tasks = filter_daily_tasks(
-        daily_notes_tasks, [habit], start_date, today)
-    if criteria == CRITERIA_COUNT:
-        scores = [len([n for n in habit_tasks.all_nodes()[1:]
-                      if n.data['file_name_date'] == date.date()]) for date in dates]
-    elif criteria == CRITERIA_DURATION:
-        scores = [sum([n.data.get('duration', 0) for n in habit_tasks.all_nodes()[
-                      1:] if n.data['file_name_date'] == date.date()]) for date in dates]
+    habit_tasks = daily_notes_tasks.filter_keywords([habit], start_date, today)
+    tasks_df = habit_tasks.to_frame(['date', 'duration'])
+    scores = get_daily_scores(tasks_df, criteria).reindex(dates, fill_value=0)
 
-    scores_df = pd.DataFrame({'date': dates, 'score': scores})
+    scores_df = pd.DataFrame({'date': dates, 'score': scores.values})
     scores_df['week'] = scores_df['date'].dt.to_period('W').dt.start_time
     return scores_df
 
 
-# Functions to get the KR data for different KR criteria types
-def get_kr_tagged_tasks(okr_tag, vault):
-    """Get KR tagged tasks from the vault for KRs that depends on OKR tags.
+def update_habit_tracker_data(scores_df, habit, criteria, start_date, daily_notes_tasks,
+                              changed_dates):
+    """Update the data for tracking a habit after some daily notes changed.
+
+    Only the scores of the changed dates & of the new days since the last
+    update are computed, as a daily note only contributes to the score of its
+    own date. The given data is left as is, as it may still be in use by the
+    dashboard.
 
     Args:
-        okr_tag (str): The OKR tag used in the tasks to mark for a specific OKR.
-        vault (Vault): The vault object containing the OKR note and the tasks.
+        scores_df (DataFrame): Data for tracking the habit from get_habit_tracker_data.
+        habit (str): Habit name
+        criteria (str): Criteria used for tracking the habit
+        start_date (datetime.date): Start date for tracking the habit
+        daily_notes_tasks (TaskTable): Tasks table from get_daily_notes_tasks.
+        changed_dates (set): Dates of the daily notes that were added, modified
+            or deleted.
 
     Returns:
-        Tree: Tasks tree object containing the tasks tagged for a specific OKR.
+        DataFrame: DataFrame object containing the data for tracking the habit.
     """
-    note_metadata = vault.get_note_metadata()
-    tasks = Tree()
-    tasks.create_node("Master Root", 'master_root')
-    for note in vault.md_file_index.keys():
-        if note_metadata.loc[note_metadata.index == note, 'note_exists'].iloc[0]:
-            note_tasks = parse_note_for_tasks(note, vault, okr_tag)
-            tasks.paste('master_root', note_tasks)
-            tasks.link_past_node('root')
-    return tasks
+    today = dt.date.today()
+    if scores_df.empty or scores_df['date'].iloc[0].date() != start_date or \
+            scores_df['date'].iloc[-1].date() > today:
+        return get_habit_tracker_data(habit, criteria, start_date, daily_notes_tasks)
+
+    last_date = scores_df['date'].iloc[-1].date()
+    new_dates = pd.date_range(last_date + dt.timedelta(days=1), today)
+    changed_dates = [date for date in changed_dates if start_date <= date <= last_date]
+    changed_dates = pd.to_datetime(changed_dates).append(new_dates)
+    habit_tasks = daily_notes_tasks.filter_keywords([habit])
+    habit_tasks = habit_tasks.select(
+        np.isin(habit_tasks['date'], changed_dates.values.astype('datetime64[D]')))
+    tasks_df = habit_tasks.to_frame(['date', 'duration'])
+    scores = get_daily_scores(tasks_df, criteria).reindex(
+        changed_dates, fill_value=0)
+    scores_df = scores_df.copy()
+    changed_rows = scores_df['date'].isin(scores.index)
+    scores_df.loc[changed_rows, 'score'] = \
+        scores_df.loc[changed_rows, 'date'].map(scores)
+    if len(new_dates):
+        new_scores_df = pd.DataFrame({'date': new_dates, 'score': scores[new_dates].values})
+        new_scores_df['week'] = new_scores_df['date'].dt.to_period('W').dt.start_time
+        scores_df = pd.concat([scores_df, new_scores_df], ignore_index=True)
+    return scores_df
 
 
-def get_daily_notes_tasks(vault):
-    """Get all the tasks from the daily notes.
+def get_habit_rollups(scores_df):
+    """Get the total scores of a habit per day, week, month & year.
 
     Args:
-        vault (Vault): The vault object containing the daily notes.
+        scores_df (DataFrame): Data for tracking the habit from get_habit_tracker_data.
 
     Returns:
-        Tree: Tasks tree object containing the tasks from the daily notes.
+        dict: DataFrame object with the start date & score of each period,
+            keyed by the period frequency in HABIT_ROLLUP_FREQS.
     """
-    # Parse all Daily notes for all kinds of tasks / events
-    note_metadata = vault.get_note_metadata()
-    tasks = Tree()
-    tasks.create_node("Master Root", 'master_root')
-    for note in vault.md_file_index.keys():
-        note_path = note_metadata.loc[note_metadata.index ==
-                                      note, 'abs_filepath'].iloc[0]
-        if note_path.is_relative_to(DAILY_NOTES_LOC):
-            note_tasks = parse_note_for_tasks(note, vault)
-            tasks.paste('master_root', note_tasks)
-            tasks.link_past_node('root')
-
-    # Extract duration from all events
-    for task in tasks.all_nodes()[1:]:
-        date_string = task.data['file_name'].split()[0]
-        task.data['file_name_date'] = dt.date.fromisoformat(date_string)
-        event_data = read_event(date_string, task.data['title'])
-        if event_data is not None:
-            task.data.update(event_data)
-
-    return tasks
-
-
-# This belongs to a task_utils.py file if it existed
-def read_event(date_string, title):
-    """Read the event start, end date-times from the title of a task if it is an event.
+    return {freq: rollup_scores(scores_df, freq) for freq in HABIT_ROLLUP_FREQS}
+
+
+def update_habit_rollups(rollups, scores_df, changed_dates):
+    """Update the total scores of a habit per period after some daily notes changed.
+
+    The periods before the earliest changed date or new day are kept, the
+    later ones are computed again. The given rollups are left as is, as they
+    may still be in use by the dashboard.
 
     Args:
-        date_string (str): The date string in ISO format of the task/event.
-        title (str): The title of the task.
+        rollups (dict): Rollups of the habit from get_habit_rollups.
+        scores_df (DataFrame): Updated data for tracking the habit, from
+            update_habit_tracker_data.
+        changed_dates (set): Dates of the daily notes that were added, modified
+            or deleted.
 
     Returns:
-        dict: A dict containing the event start & end date-times and duration.
+        dict: Rollups of the habit.
     """
-    pattern_event = r'^\b(\d{1,2}(:\d{2})?\s*(AM|PM)?)\s*-\s*(\d{1,2}(:\d{2})?\s*(AM|PM)?)\b'
-    match = re.search(pattern_event, title)
+    daily_scores = rollups['D']
+    if daily_scores.empty or scores_df.empty or \
+            daily_scores['date'].iloc[0] != scores_df['date'].iloc[0]:
+        return get_habit_rollups(scores_df)
+    changed_dates = [pd.Timestamp(date) for date in changed_dates
+                     if scores_df['date'].iloc[0] <= pd.Timestamp(date)]
+    if len(scores_df) > len(daily_scores):  # New days since the last update
+        changed_dates.append(scores_df['date'].iloc[len(daily_scores)])
+    if not changed_dates:
+        return rollups
+    first_changed_date = min(changed_dates)
+
+    new_rollups = {}
+    for freq, period_scores in rollups.items():
+        period_start = first_changed_date.to_period(freq).start_time
+        new_rollups[freq] = pd.concat([
+            period_scores[period_scores['date'] < period_start],
+            rollup_scores(scores_df[scores_df['date'] >= period_start], freq)],
+            ignore_index=True)
+    return new_rollups
+
+
+def rollup_scores(scores_df, freq):
+    """Get the total scores of a habit per period.
 
-    if match is not None:
-        # Extract the event start time
-        if match[2] is not None:
-            minutes = int(match[2][1:])
-        else:
-            minutes = 0
-        hours = int(match[1].split(':')[0].split()[0])
-        am_pm = match[3]
-        if am_pm is not None:
-            if am_pm == 'PM' and hours != 12:
-                hours += 12
-            elif am_pm == 'AM' and hours == 12:
-                hours = 0
-        event_start = dt.datetime.strptime(
-            date_string + ' ' + str(hours) + ':' + str(minutes), '%Y-%m-%d %H:%M')
-
-        # Extract the event end time
-        if match[5] is not None:
-            minutes = int(match[5][1:])
-        else:
-            minutes = 0
-        hours = int(match[4].split(':')[0].split()[0])
-        am_pm = match[6]
-        if am_pm is not None:
-            if am_pm == 'PM' and hours != 12:
-                hours += 12
-            elif am_pm == 'AM' and hours == 12:
-                hours = 0
-        event_end = dt.datetime.strptime(
-            date_string + ' ' + str(hours) + ':' + str(minutes), '%Y-%m-%d %H:%M')
-
-        # If the event ends on the next day
-        if event_end < event_start:
-            event_end += dt.timedelta(days=1)
-        duration = (event_end - event_start).total_seconds()/3600
-
-        return {'event_start': event_start, 'event_end': event_end, 'duration': duration}
-    else:
-        return None
+    Args:
+        scores_df (DataFrame): Data for tracking the habit from get_habit_tracker_data.
+        freq (str): Frequency of the periods, D, W, M or Y.
+
+    Returns:
+        DataFrame: DataFrame object with the date & score columns, the date
+            being the start date of each period.
+    """
+    if freq == 'D':
+        return scores_df[['date', 'score']].reset_index(drop=True)
+    period_starts = scores_df['date'].dt.to_period(freq).dt.start_time
+    period_scores = scores_df.groupby(period_starts)['score'].sum()
+    return pd.DataFrame({'date': period_scores.index, 'score': period_scores.values})
+
+
+# Functions to get the KR data for different KR criteria types
+def get_kr_tagged_tasks(okr_tags, note_cache):
+    """Get KR tagged tasks from the vault for KRs that depends on OKR tags.
+
+    Args:
+        okr_tags (list): The OKR tags used in the tasks to mark for specific OKRs.
+        note_cache (NoteCache): Cache of the tasks parsed from every note.
+
+    Returns:
+        dict: Tasks table containing the tasks tagged for each OKR, keyed by the OKR tag.
+    """
+    return note_cache.get_table().filter_okrs(okr_tags)
+
+
+def get_daily_notes_tasks(note_cache, start_date=None, end_date=None):
+    """Get the tasks from the daily notes, within a date range if given.
+
+    Args:
+        note_cache (NoteCache): Cache of the tasks parsed from every note.
+        start_date (datetime.date, optional): First date of the range, e.g.
+            from a front matter. Defaults to None, for no lower bound.
+        end_date (datetime.date, optional): Last date of the range. Defaults
+            to None, for no upper bound.
+
+    Returns:
+        TaskTable: Tasks table containing the tasks from the daily notes.
+    """
+    # The front matter dates may be strings or date-times
+    start_date, end_date = [pd.Timestamp(date).date() if date is not None else None
+                            for date in [start_date, end_date]]
+    return note_cache.get_daily_tasks(start_date, end_date)
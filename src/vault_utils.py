@@ -0,0 +1,276 @@
+import bisect
+import datetime as dt
+import os
+import pathlib
+import yaml
+import pandas as pd
+
+
+class Vault:
+    """Lightweight index of the notes in an Obsidian vault.
+
+    Covers the parts of the obsidiantools Vault used by the dashboard, without
+    building the link graph or reading the text of every note: the vault folder
+    is walked once with os.scandir, and the front matter / text of a note is
+    only read when asked for.
+    """
+
+    def __init__(self, dirpath):
+        self.dirpath = pathlib.Path(dirpath)
+        # note name -> path of the note file relative to the vault
+        self.md_file_index = {}
+        # note name -> (mtime in ns, size in bytes) of the note file
+        self.file_stats = {}
+        # path of a folder relative to the vault -> names of the notes in it
+        self.dir_index = {}
+        self._front_matter_index = {}
+        self._scan(self.dirpath)
+
+    def _scan(self, dirpath):
+        """Recursively add the Markdown files in a folder to the index, skipping
+        hidden folders like .obsidian.
+
+        Args:
+            dirpath (Path): Path of the folder to scan.
+        """
+        reldirpath = pathlib.Path(dirpath).relative_to(self.dirpath)
+        dir_notes = self.dir_index.setdefault(reldirpath, [])
+        with os.scandir(dirpath) as entries:
+            for entry in entries:
+                if entry.name.startswith('.'):
+                    continue
+                if entry.is_dir():
+                    self._scan(entry.path)
+                elif entry.name.endswith('.md'):
+                    note = entry.name[:-3]
+                    stat = entry.stat()
+                    self.md_file_index[note] = reldirpath / entry.name
+                    self.file_stats[note] = (stat.st_mtime_ns, stat.st_size)
+                    dir_notes.append(note)
+
+    def update(self, paths):
+        """Get a copy of the vault with some note files checked again, leaving
+        this vault unchanged.
+
+        Args:
+            paths (iterable): Paths of the created, modified or deleted note
+                files, under the vault folder.
+
+        Returns:
+            Vault: The updated vault object.
+        """
+        vault = Vault.__new__(Vault)
+        vault.dirpath = self.dirpath
+        vault.md_file_index = dict(self.md_file_index)
+        vault.file_stats = dict(self.file_stats)
+        vault.dir_index = {reldirpath: list(dir_notes)
+                           for reldirpath, dir_notes in self.dir_index.items()}
+        vault._front_matter_index = dict(self._front_matter_index)
+        for path in paths:
+            path = pathlib.Path(path)
+            if not path.is_relative_to(self.dirpath) or path.suffix != '.md':
+                continue
+            relpath = path.relative_to(self.dirpath)
+            if any(part.startswith('.') for part in relpath.parts):
+                continue
+            note = path.stem
+            vault._front_matter_index.pop(note, None)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+            old_relpath = vault.md_file_index.get(note)
+            if old_relpath is not None and (stat is None or old_relpath != relpath):
+                if stat is None and old_relpath != relpath:
+                    continue  # Another file of the same name was deleted
+                del vault.md_file_index[note]
+                del vault.file_stats[note]
+                vault.dir_index[old_relpath.parent].remove(note)
+            if stat is not None:
+                if note not in vault.md_file_index:
+                    vault.dir_index.setdefault(relpath.parent, []).append(note)
+                vault.md_file_index[note] = relpath
+                vault.file_stats[note] = (stat.st_mtime_ns, stat.st_size)
+        return vault
+
+    def get_notes_in(self, dirpath):
+        """Get the notes in a folder of the vault, including its subfolders.
+
+        Args:
+            dirpath (Path): Path of the folder, e.g. the daily notes folder.
+
+        Returns:
+            list: Names of the notes in the folder.
+        """
+        if not pathlib.Path(dirpath).is_relative_to(self.dirpath):
+            return []
+        reldirpath = pathlib.Path(dirpath).relative_to(self.dirpath)
+        return [note for subdirpath, dir_notes in self.dir_index.items()
+                if subdirpath == reldirpath or reldirpath in subdirpath.parents
+                for note in dir_notes]
+
+    def get_front_matter(self, note):
+        """Get the front matter of a note, reading just the front matter block.
+
+        Args:
+            note (str): Name of the note in the vault.
+
+        Returns:
+            dict: Front matter of the note, empty if it has none.
+        """
+        if note not in self._front_matter_index:
+            self._front_matter_index[note] = read_front_matter(
+                self.dirpath / self.md_file_index[note])
+        return self._front_matter_index[note]
+
+    def get_source_text(self, note):
+        """Get the text of a note, read from the note file on every call.
+
+        Args:
+            note (str): Name of the note in the vault.
+
+        Returns:
+            str: Markdown text of the note.
+        """
+        with open(self.dirpath / self.md_file_index[note], 'r', encoding="utf-8") as f:
+            return f.read()
+
+    def get_note_metadata(self):
+        """Get the file metadata of the notes in the vault.
+
+        Returns:
+            DataFrame: DataFrame object indexed by the note name, with the
+                rel_filepath, abs_filepath, note_exists & modified_time columns.
+        """
+        notes = list(self.md_file_index.keys())
+        df = pd.DataFrame({
+            'rel_filepath': [self.md_file_index[note] for note in notes],
+            'abs_filepath': [self.dirpath / self.md_file_index[note] for note in notes],
+            'note_exists': True,
+            'modified_time': pd.to_datetime(
+                [self.file_stats[note][0] for note in notes], unit='ns'),
+        }, index=pd.Index(notes, name='note'))
+        return df
+
+
+class JournalIndex:
+    """Index of the daily notes of a vault, sorted by their date.
+
+    The names of the daily notes start with their ISO date, e.g.
+    `2025-01-04 Saturday`, so the index only needs the vault index and no
+    file is read. A range of dates is found by bisection, so a tracker only
+    touches the daily notes within its own dates.
+    """
+
+    def __init__(self, vault, dirpath):
+        dated_notes = sorted((date, note) for note in vault.get_notes_in(dirpath)
+                             if (date := get_note_date(note)) is not None)
+        self.dates = [date for date, _ in dated_notes]
+        self.notes = [note for _, note in dated_notes]
+        self._note_dates = {note: date for date, note in dated_notes}
+
+    def __len__(self):
+        return len(self.notes)
+
+    def __contains__(self, note):
+        return note in self._note_dates
+
+    def get_date(self, note):
+        """Get the date of a daily note.
+
+        Args:
+            note (str): Name of the daily note.
+
+        Returns:
+            datetime.date: Date of the note, None if it is not in the index.
+        """
+        return self._note_dates.get(note)
+
+    def get_notes(self, start_date=None, end_date=None):
+        """Get the daily notes within a date range.
+
+        Args:
+            start_date (datetime.date, optional): First date of the range.
+                Defaults to None, for no lower bound.
+            end_date (datetime.date, optional): Last date of the range.
+                Defaults to None, for no upper bound.
+
+        Returns:
+            list: Names of the daily notes in the range, in the order of their dates.
+        """
+        start = bisect.bisect_left(self.dates, start_date) if start_date is not None else 0
+        stop = bisect.bisect_right(self.dates, end_date) if end_date is not None \
+            else len(self.dates)
+        return self.notes[start:stop]
+
+
+def get_note_date(note):
+    """Get the date of a daily note from its name, e.g. `2025-01-04 Saturday`.
+
+    Args:
+        note (str): Name of the note.
+
+    Returns:
+        datetime.date: Date of the note, None if its name does not start with a date.
+    """
+    try:
+        return dt.date.fromisoformat(note.split()[0])
+    except (ValueError, IndexError):
+        return None
+
+
+def get_front_matter_date(value):
+    """Get a date of the front matter of a note, e.g. the start date of a cycle.
+
+    YAML reads the ISO dates as date objects, the ones with a time as datetime
+    objects & the quoted ones as strings.
+
+    Args:
+        value: Value of the front matter field.
+
+    Raises:
+        ValueError: If the value is not a date.
+
+    Returns:
+        datetime.date: The date, without its time.
+    """
+    if isinstance(value, dt.datetime):
+        return value.date()
+    if isinstance(value, dt.date):
+        return value
+    return dt.datetime.fromisoformat(str(value)).date()
+
+
+def read_front_matter(note_path):
+    """Read the YAML front matter block at the start of a note file.
+
+    Args:
+        note_path (Path): Path of the note file.
+
+    Returns:
+        dict: Front matter of the note, empty if it has none.
+    """
+    with open(note_path, 'r', encoding="utf-8") as f:
+        return parse_front_matter(f)
+
+
+def parse_front_matter(lines):
+    """Parse the YAML front matter block at the start of a note, reading only
+    the lines of the block.
+
+    Args:
+        lines (iterable): Lines of the note, with their line endings.
+
+    Returns:
+        dict: Front matter of the note, empty if it has none.
+    """
+    lines = iter(lines)
+    if next(lines, '').rstrip() != '---':
+        return {}
+    block = []
+    for line in lines:
+        if line.rstrip() in ['---', '...']:
+            return yaml.safe_load(''.join(block)) or {}
+        block.append(line)
+    # The front matter block is never closed
+    return {}
@@ -0,0 +1,220 @@
+import ctypes
+import ctypes.util
+import logging
+import os
+import pathlib
+import select
+import struct
+import threading
+import time
+from src.vault_utils import Vault
+
+# inotify flags, from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | \
+    IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+EVENT_HEADER = struct.Struct('iIII')  # wd, mask, cookie, len of struct inotify_event
+
+logger = logging.getLogger(__name__)
+
+
+class InotifyBackend:
+    """Reports the changed note files of a vault with Linux inotify, called
+    through ctypes.
+
+    inotify does not watch subfolders, so every folder of the vault gets its
+    own watch, and new folders are watched as they appear.
+    """
+
+    def __init__(self, dirpath):
+        self.dirpath = pathlib.Path(dirpath)
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches = {}  # watch descriptor -> path of the watched folder
+        self._watch_tree(self.dirpath)
+
+    def _watch_tree(self, dirpath):
+        """Watch a folder & its subfolders, skipping hidden folders like .obsidian.
+
+        Args:
+            dirpath (Path): Path of the folder.
+        """
+        wd = self._add_watch(self._fd, os.fsencode(dirpath), WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            if dirpath == self.dirpath:
+                raise OSError(errno, f"Cannot watch {dirpath}: {os.strerror(errno)}")
+            return  # The folder was deleted in the meantime
+        self._watches[wd] = pathlib.Path(dirpath)
+        try:
+            with os.scandir(dirpath) as entries:
+                for entry in entries:
+                    if entry.is_dir() and not entry.name.startswith('.'):
+                        self._watch_tree(entry.path)
+        except FileNotFoundError:
+            pass
+
+    def wait(self, timeout):
+        """Wait for changes in the vault.
+
+        Args:
+            timeout (float): Timeout in seconds.
+
+        Returns:
+            tuple: Paths of the changed note files, and whether the vault must
+                be scanned again, e.g. after a folder was moved.
+        """
+        paths, rescan = set(), False
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return paths, rescan
+        try:
+            buffer = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return paths, rescan
+        offset = 0
+        while offset < len(buffer):
+            wd, mask, _, length = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size
+            name = os.fsdecode(buffer[offset:offset + length].rstrip(b'\0'))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                rescan = True
+            elif mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+            elif wd in self._watches and not name.startswith('.'):
+                path = self._watches[wd] / name
+                if mask & IN_ISDIR:
+                    # Files moved in with a folder have no events of their own
+                    rescan = True
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        self._watch_tree(path)
+                elif name.endswith('.md'):
+                    paths.add(path)
+        return paths, rescan
+
+    def close(self):
+        os.close(self._fd)
+
+
+class PollingBackend:
+    """Reports the changed note files of a vault by scanning it at regular
+    intervals and comparing the file stats, for file systems without inotify,
+    e.g. bind mounts in containers.
+    """
+
+    def __init__(self, dirpath, interval=1.0):
+        self.dirpath = pathlib.Path(dirpath)
+        self.interval = interval
+        self._vault = Vault(self.dirpath)
+
+    def wait(self, timeout):
+        """Wait for changes in the vault.
+
+        Args:
+            timeout (float): Unused, the vault is scanned after each polling interval.
+
+        Returns:
+            tuple: Paths of the changed note files, and whether the vault must
+                be scanned again, always False.
+        """
+        time.sleep(self.interval)
+        vault = Vault(self.dirpath)
+        old_vault, self._vault = self._vault, vault
+        paths = {self.dirpath / relpath for note, relpath in old_vault.md_file_index.items()
+                 if vault.md_file_index.get(note) != relpath}
+        paths.update(self.dirpath / relpath for note, relpath in vault.md_file_index.items()
+                     if old_vault.md_file_index.get(note) != relpath
+                     or old_vault.file_stats[note] != vault.file_stats[note])
+        return paths, False
+
+    def close(self):
+        pass
+
+
+class VaultWatcher:
+    """Watches the note files of a vault on a background thread & reports the
+    changes in batches.
+
+    Saving a note in Obsidian often writes it several times in a row, so the
+    changes are only reported once the vault has been quiet for `debounce`
+    seconds, or after `max_delay` seconds of continuous changes.
+    """
+
+    def __init__(self, vault_loc, on_change, mode='auto', debounce=0.5,
+                 max_delay=2.0, poll_interval=1.0):
+        """
+        Args:
+            vault_loc (Path): Path of the vault folder.
+            on_change (callable): Called with the set of changed note file
+                paths, or None if the whole vault must be scanned again.
+            mode (str, optional): 'inotify', 'poll', or 'auto' to use inotify
+                when available. Defaults to 'auto'.
+            debounce (float, optional): Quiet time in seconds. Defaults to 0.5.
+            max_delay (float, optional): Longest delay in seconds of a change.
+                Defaults to 2.0.
+            poll_interval (float, optional): Interval in seconds of the polling
+                backend. Defaults to 1.0.
+        """
+        self.vault_loc = pathlib.Path(vault_loc)
+        self.on_change = on_change
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.backend = None
+        if mode in ['auto', 'inotify']:
+            try:
+                self.backend = InotifyBackend(self.vault_loc)
+            except (OSError, AttributeError, TypeError):
+                # No inotify, e.g. not on Linux, or out of watches
+                if mode == 'inotify':
+                    raise
+        if self.backend is None:
+            self.backend = PollingBackend(self.vault_loc, poll_interval)
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Start watching the vault on a background thread."""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching the vault."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.backend.close()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            paths, rescan = self.backend.wait(self.debounce)
+            if not paths and not rescan:
+                continue
+            # Gather the changes until the vault is quiet
+            first_change_at = time.monotonic()
+            while time.monotonic() - first_change_at < self.max_delay:
+                more_paths, more_rescan = self.backend.wait(self.debounce)
+                if not more_paths and not more_rescan:
+                    break
+                paths |= more_paths
+                rescan = rescan or more_rescan
+            try:
+                self.on_change(None if rescan else paths)
+            except Exception:
+                logger.exception("Handling the vault changes failed")
@@ -0,0 +1,16 @@
+# The tests run on the sample vault with the example configuration, whatever
+# the local .env says
+import os
+import pathlib
+from dotenv import load_dotenv
+
+ROOT = pathlib.Path(__file__).parent.parent
+os.environ.update({
+    'VAULT_LOC': str(ROOT / 'sample_data'),
+    'DAILY_NOTES_LOC': str(ROOT / 'sample_data' / 'journals'),
+    'SNAPSHOT_LOC': '',
+    'WATCH_VAULT': '',
+    'SHARED_DATA_LOC': '',
+    'PROFILE_LOC': '',
+})
+load_dotenv(ROOT / '.env.example')
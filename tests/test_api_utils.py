@@ -0,0 +1,85 @@
+import gzip
+import json
+import pytest
+import app
+
+PREFIX = app.PATH_PREFIX or '/'
+
+
+@pytest.fixture(scope='module')
+def client():
+    return app.server.test_client()
+
+
+def get_json(response):
+    body = response.get_data()
+    if response.headers.get('Content-Encoding') == 'gzip':
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+@pytest.mark.parametrize('path', ['api/tasks', 'api/habits', 'api/okr-pivot'])
+def test_etag(client, path):
+    response = client.get(PREFIX + path)
+    assert response.status_code == 200
+    assert response.headers['Cache-Control'] == 'no-cache'
+    etag = response.headers['ETag']
+    assert etag.startswith('W/')
+    cached = client.get(PREFIX + path, headers={'If-None-Match': etag})
+    assert cached.status_code == 304
+    assert cached.get_data() == b''
+    assert cached.headers['ETag'] == etag
+    # Another version of the data is sent in full
+    other = client.get(PREFIX + path, headers={'If-None-Match': 'W/"0-0"'})
+    assert other.status_code == 200
+
+
+def test_gzip(client):
+    plain = client.get(PREFIX + 'api/tasks')
+    zipped = client.get(PREFIX + 'api/tasks', headers={'Accept-Encoding': 'gzip'})
+    assert 'Content-Encoding' not in plain.headers
+    assert zipped.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in zipped.headers['Vary']
+    assert get_json(zipped) == get_json(plain)
+
+
+def test_paging(client):
+    everything = get_json(client.get(PREFIX + 'api/tasks?limit=all'))
+    assert everything['next_offset'] is None
+    assert len(everything['rows']) == everything['total'] > 2
+    page = get_json(client.get(PREFIX + 'api/tasks?offset=1&limit=2'))
+    assert page['total'] == everything['total']
+    assert (page['offset'], page['limit'], page['next_offset']) == (1, 2, 3)
+    assert page['rows'] == everything['rows'][1:3]
+    last = get_json(client.get(PREFIX + f"api/tasks?offset={everything['total'] - 1}"))
+    assert last['next_offset'] is None
+    assert last['rows'] == everything['rows'][-1:]
+    beyond = get_json(client.get(PREFIX + f"api/tasks?offset={everything['total'] + 5}"))
+    assert beyond['rows'] == [] and beyond['next_offset'] is None
+
+
+def test_filters(client):
+    rows = get_json(client.get(PREFIX + 'api/tasks?limit=all'))['rows']
+    done = get_json(client.get(PREFIX + 'api/tasks?limit=all&status=Done'))['rows']
+    assert done == [row for row in rows if row['status'] == 'Done']
+    dated = get_json(client.get(PREFIX + 'api/okr-pivot?limit=all&start=2025-01-03&end=2025-01-04'))
+    assert dated['rows'] and all('2025-01-03' <= row['date'] <= '2025-01-04'
+                                 for row in dated['rows'])
+    habits = get_json(client.get(PREFIX + 'api/habits?limit=all&tracker=jogging&freq=W'))
+    assert habits['rows'] and all(row['habit'] == 'jogging' for row in habits['rows'])
+
+
+@pytest.mark.parametrize('query, status', [
+    ('api/tasks?tracker=nope', 404),
+    ('api/okr-pivot?cycle=nope', 404),
+    ('api/tasks?status=x', 400),
+    ('api/tasks?limit=-1', 400),
+    ('api/tasks?limit=0', 400),
+    ('api/tasks?offset=x', 400),
+    ('api/habits?freq=Q', 400),
+    ('api/habits?end=2025-13-01', 400),
+])
+def test_errors(client, query, status):
+    response = client.get(PREFIX + query)
+    assert response.status_code == status
+    assert 'error' in get_json(response)
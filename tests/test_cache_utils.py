@@ -0,0 +1,233 @@
+import datetime as dt
+import os
+import pathlib
+import numpy as np
+import pandas as pd
+import pytest
+from src import cache_utils
+from src.cache_utils import NoteCache, may_have_okr_tasks, read_note_tasks
+from src.note_utils import parse_text_for_tasks
+from src.task_utils import TaskTable
+from src.vault_utils import Vault
+
+SAMPLE_VAULT = Vault(pathlib.Path(__file__).parent.parent / 'sample_data')
+
+NOTES = {
+    '2025 Jan - 1.md': '---\nstart_date: 2025-01-01\nend_date: 2025-01-15\n---\n'
+                       '### O1 KR1: Ship\n[criteria:: story-points]\n',
+    'notes/Project.md': '- [ ] Plan #story (okr:: [[2025 Jan - 1#O1 KR1 Ship]])\n'
+                        '    - [x] Write the plan #task [Story Points:: 2]\n'
+                        '- [ ] Unmarked #task\n',
+    'notes/Other.md': '- [ ] Not for any OKR #task\n',
+    'journals/2025-01-02 Thursday.md': '- [x] Jogging [duration:: 0.5]\n',
+    'journals/2025-01-03 Friday.md': '- [x] 7 AM - 8 AM Mindful breathing\n'
+                                     '- [ ] Read #gratitude\n',
+}
+
+
+@pytest.fixture
+def vault_dir(tmp_path, monkeypatch):
+    for relpath, text in NOTES.items():
+        (tmp_path / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relpath).write_text(text, encoding='utf-8')
+    monkeypatch.setattr(cache_utils, 'DAILY_NOTES_LOC', tmp_path / 'journals')
+    return tmp_path
+
+OKR_TEXTS = [
+    '- [ ] Ship #story (okr:: [[OKR#O1 KR1 Ship]])\n',
+    '- [ ] Ship #story ( okr ::[[OKR#O1 KR1 Ship]])\n',
+    '1. [ ] Ship\n\t- [ ] Part #task (okr::[[OKR#O1 KR1 Ship]]) ⏫\n',
+    '> - [ ] Quoted (okr:: [[OKR#O1 KR1 Ship]])\n',
+    '- [ ] Ship (title:: Renamed) (okr:: [[OKR#O1 KR1 Ship]])\n',
+    '- [ ] Ship (OKR:: [[OKR#O1 KR1 Ship]]) [okr:: [[OKR#O1 KR1 Ship]]]\n',
+    '- [ ] okrs & the :: separator on their own\n',
+    '- [ ] No field #task ⏫ [duration:: 1]\n',
+    '- [ ] (ok r:: [[OKR#O1 KR1 Ship]])\n',
+    '',
+]
+
+
+def assert_same_table(table, expected):
+    columns = list(TaskTable.COLUMNS)
+    pd.testing.assert_frame_equal(table.to_frame(columns), expected.to_frame(columns))
+
+
+def assert_same_as_cold(note_cache, vault):
+    cold_cache = NoteCache()
+    cold_cache.refresh(vault)
+    assert_same_table(note_cache.get_table(), cold_cache.get_table())
+    for note in cold_cache.notes():
+        assert_same_table(note_cache.get_tasks(note), cold_cache.get_tasks(note))
+    assert note_cache.get_cycles() == cold_cache.get_cycles()
+
+
+def test_refresh(vault_dir):
+    note_cache = NoteCache()
+    changed_notes = note_cache.refresh(Vault(vault_dir))
+    assert sorted(changed_notes) == sorted(path.rsplit('/')[-1][:-3] for path in NOTES)
+    table = note_cache.get_table()
+    # Only the daily notes & the notes with OKR fields are parsed
+    assert sorted(table['file']) == ['2025-01-02 Thursday'] + ['2025-01-03 Friday'] * 2 + \
+        ['Project'] * 3
+    assert len(note_cache.get_daily_tasks(end_date=dt.date(2025, 1, 2))) == 1
+    assert note_cache.refresh(Vault(vault_dir)) == {}
+    assert note_cache.get_table() is table
+
+
+def test_refresh_edited_note(vault_dir):
+    note_cache = NoteCache()
+    note_cache.refresh(Vault(vault_dir))
+    note_cache.pop_changed_okr_notes()
+    (vault_dir / 'notes' / 'Project.md').write_text(
+        '- [ ] Plan #story (okr:: [[2025 Jan - 1#O1 KR1 Ship]])\n', encoding='utf-8')
+    (vault_dir / 'journals' / '2025-01-02 Thursday.md').write_text(
+        '- [x] Jogging [duration:: 1]\n- [x] Mindful breathing\n', encoding='utf-8')
+    vault = Vault(vault_dir)
+    changed_notes = note_cache.refresh(vault)
+    assert sorted(changed_notes) == ['2025-01-02 Thursday', 'Project']
+    assert note_cache.pop_changed_okr_notes() == {'2025 Jan - 1'}
+    assert_same_as_cold(note_cache, vault)
+
+
+def test_refresh_touched_note(vault_dir, monkeypatch):
+    note_cache = NoteCache()
+    note_cache.refresh(Vault(vault_dir))
+    table = note_cache.get_table()
+    note_path = vault_dir / 'notes' / 'Project.md'
+    mtime = note_path.stat().st_mtime_ns + 10**9
+    os.utime(note_path, ns=(mtime, mtime))
+    vault = Vault(vault_dir)
+    # The note is read to hash its content but not parsed again
+    with monkeypatch.context() as patch:
+        patch.setattr(cache_utils, 'parse_text_for_tasks', None)
+        assert note_cache.refresh(vault) == {}
+    assert note_cache.get_table() is table
+    assert note_cache._entries['Project']['mtime'] == mtime
+    assert_same_as_cold(note_cache, vault)
+
+
+def test_refresh_deleted_note(vault_dir):
+    note_cache = NoteCache()
+    note_cache.refresh(Vault(vault_dir))
+    note_cache.pop_changed_okr_notes()
+    (vault_dir / 'notes' / 'Project.md').unlink()
+    (vault_dir / 'journals' / '2025-01-02 Thursday.md').unlink()
+    vault = Vault(vault_dir)
+    changed_notes = note_cache.refresh(vault)
+    assert changed_notes == {
+        'Project': vault_dir / 'notes' / 'Project.md',
+        '2025-01-02 Thursday': vault_dir / 'journals' / '2025-01-02 Thursday.md'}
+    assert 'Project' not in note_cache
+    assert note_cache.pop_changed_okr_notes() == {'2025 Jan - 1'}
+    assert set(note_cache.get_table()['file']) == {'2025-01-03 Friday'}
+    assert_same_as_cold(note_cache, vault)
+
+
+def test_refresh_moved_note(vault_dir):
+    note_cache = NoteCache()
+    note_cache.refresh(Vault(vault_dir))
+    (vault_dir / 'notes' / 'Project.md').rename(vault_dir / 'Project.md')
+    vault = Vault(vault_dir)
+    changed_notes = note_cache.refresh(vault)
+    assert changed_notes == {'Project': vault_dir / 'Project.md'}
+    assert note_cache._entries['Project']['path'] == vault_dir / 'Project.md'
+    assert_same_as_cold(note_cache, vault)
+
+
+def test_refresh_date_ranges(vault_dir):
+    note_cache = NoteCache()
+    # Outside the OKR cycle & the tracker dates, a daily note is only parsed
+    # if it may have OKR tasks
+    (vault_dir / 'journals' / '2025-02-01 Saturday.md').write_text(
+        '- [ ] Outside #task\n', encoding='utf-8')
+    vault = Vault(vault_dir)
+    note_cache.refresh(vault, [(dt.date(2025, 1, 3), dt.date(2025, 1, 3))])
+    assert len(note_cache.get_tasks('2025-02-01 Saturday')) == 0
+    assert len(note_cache.get_tasks('2025-01-02 Thursday')) == 1
+    # Once a tracker reads its date, the note is parsed in full
+    assert note_cache.refresh(vault, [(None, None)]) == {
+        '2025-02-01 Saturday': vault_dir / 'journals' / '2025-02-01 Saturday.md'}
+    assert_same_as_cold(note_cache, vault)
+
+
+def test_snapshot_round_trip(vault_dir, tmp_path_factory):
+    snapshot_loc = tmp_path_factory.mktemp('snapshots')
+    vault = Vault(vault_dir)
+    note_cache = NoteCache()
+    note_cache.refresh(vault)
+    note_cache.save(snapshot_loc, vault)
+    assert note_cache.save(snapshot_loc, vault).name == 'snapshot-2'
+    # The previous snapshot is kept, it may still be being read
+    assert sorted(path.name for path in snapshot_loc.iterdir()) == \
+        ['CURRENT', 'snapshot-1', 'snapshot-2']
+    loaded_cache = NoteCache.load(snapshot_loc, vault)
+    assert_same_table(loaded_cache.get_table(), note_cache.get_table())
+    assert loaded_cache._entries == note_cache._entries
+    assert_same_table(loaded_cache.get_daily_tasks(), note_cache.get_daily_tasks())
+    assert loaded_cache.refresh(vault) == {}
+    assert_same_as_cold(loaded_cache, vault)
+
+
+def break_version(snapshot_dirpath, monkeypatch):
+    monkeypatch.setattr(cache_utils, 'SNAPSHOT_VERSION', cache_utils.SNAPSHOT_VERSION + 1)
+
+
+def break_column_types(snapshot_dirpath, monkeypatch):
+    monkeypatch.setitem(TaskTable.COLUMNS, 'duration', np.float32)
+
+
+def break_location(snapshot_dirpath, monkeypatch):
+    monkeypatch.setattr(cache_utils, 'DAILY_NOTES_LOC', snapshot_dirpath)
+
+
+def truncate_column(snapshot_dirpath, monkeypatch):
+    with open(snapshot_dirpath / 'title.npy', 'r+b') as f:
+        f.truncate(f.seek(0, 2) - 4)
+
+
+@pytest.mark.parametrize('break_snapshot', [break_version, break_column_types,
+                                            break_location, truncate_column])
+def test_snapshot_fallback(vault_dir, tmp_path_factory, monkeypatch, break_snapshot):
+    snapshot_loc = tmp_path_factory.mktemp('snapshots')
+    vault = Vault(vault_dir)
+    note_cache = NoteCache()
+    note_cache.refresh(vault)
+    break_snapshot(note_cache.save(snapshot_loc, vault), monkeypatch)
+    assert NoteCache.load(snapshot_loc, vault) is None
+
+
+def test_snapshot_other_vault(vault_dir, tmp_path_factory):
+    snapshot_loc = tmp_path_factory.mktemp('snapshots')
+    assert NoteCache.load(snapshot_loc, Vault(vault_dir)) is None
+    NoteCache().save(snapshot_loc, Vault(vault_dir))
+    other_dir = tmp_path_factory.mktemp('other')
+    assert NoteCache.load(snapshot_loc, Vault(other_dir)) is None
+
+
+@pytest.mark.parametrize('text', OKR_TEXTS)
+def test_may_have_okr_tasks(text):
+    okr_tags = TaskTable.from_tree(parse_text_for_tasks(text, 'Note'))['okr']
+    if not may_have_okr_tasks(text.encode('utf-8')):
+        assert (okr_tags == None).all()  # noqa: E711
+
+
+def test_may_have_okr_tasks_sample_vault():
+    for note in SAMPLE_VAULT.md_file_index:
+        note_path = SAMPLE_VAULT.dirpath / SAMPLE_VAULT.md_file_index[note]
+        tasks = TaskTable.from_tree(parse_text_for_tasks(
+            note_path.read_text(encoding='utf-8'), note))
+        if (tasks['okr'] != None).any():  # noqa: E711
+            assert may_have_okr_tasks(note_path.read_bytes()), note
+
+
+def test_read_note_tasks(tmp_path):
+    note_path = tmp_path / 'Note.md'
+    note_path.write_text('- [ ] No field #task\n', encoding='utf-8')
+    # A note without any OKR field is skipped, unless it is a daily note
+    digest, tasks, cycle = read_note_tasks(note_path, 'Note')
+    assert len(tasks) == 0 and cycle is None
+    assert read_note_tasks(note_path, 'Note', digest=digest) == (digest, None, None)
+    assert len(read_note_tasks(note_path, 'Note', dt.date(2025, 1, 1))[1]) == 1
+    assert len(read_note_tasks(note_path, 'Note', dt.date(2025, 1, 1), okr_only=True)[1]) == 0
+    note_path.write_text(OKR_TEXTS[0], encoding='utf-8')
+    assert list(read_note_tasks(note_path, 'Note')[1]['okr']) == ['[[OKR#O1 KR1 Ship]]']
@@ -0,0 +1,86 @@
+import datetime as dt
+import pathlib
+import pytest
+from src.note_utils import convert_to_task, get_title_fields
+from src.task_utils import read_event, get_event_date
+from src.vault_utils import Vault
+from benchmarks.bench_task_fields import get_inputs, get_result, is_same
+from benchmarks.reference_fields import convert_to_task_reference, read_event_reference
+
+SAMPLE_VAULT = Vault(pathlib.Path(__file__).parent.parent / 'sample_data')
+EDGE_CASES = [
+    '[ ] Task %% comment %%', '[ ] Task %%', '[ ] Task %%%', '[x] %% only a comment',
+    '[ ] "quoted" title "', '[ ] Back\\slash \\u23eb', '[ ] Tab\tand\nnewline #task',
+    '[ ] Emojis ⏫ 🔽 ✅ 2025-01-02 📅 2025-01-03T10:00', '[ ] Bad date ✅ 2025-13-01',
+    '[ ] Last date ✅', '[ ] ✅️ 2025-01-02 variation selector', '[ ] café ünicode …',
+    '[ ] Date twice ✅ 2025-01-02 ✅ 2025-01-03', '[ ] Quoted date ✅ 2025-01-02"',
+    '[ ] #task (okr:: [[OKR#O1 KR1 Ship]]) [Story Points:: 3]', '[ ] [duration:: x]',
+    '[ ] (title:: Other) [tags:: story]', '[ ] #story (tags:: task) [title:: New]',
+    '[ ] #tag(okr:: [[OKR#O1 KR1 Ship]]) [duration:: 1]', '[ ] ⏫\t#tag (a:: b) (c:: d)',
+    '[ ] [a:: b] [c:: d] (e:: f', '[ ] #epic #story #task', '[/] #story#task',
+    '[?] Unknown status', '[ ]', '[ ]   ',
+]
+EDGE_EVENT_TITLES = [
+    '7:15 AM - 8 PM Dinner', '11 PM - 1 AM Late', '12 AM - 12 PM', '19:30 - 20:15',
+    '9:5 - 10', '13 PM - 2 PM', '7:15AM-8:00AM', '7PM - 8PM', '25:00 - 26:00', '7:61 - 8',
+    '7 - 9', 'Not an event 7 - 9', '',
+]
+
+
+@pytest.mark.parametrize('text', EDGE_CASES)
+def test_convert_to_task_matches_reference(text):
+    expected = get_result(convert_to_task_reference, (text, 'Note'))
+    assert is_same(expected, get_result(convert_to_task, (text, 'Note')))
+
+
+@pytest.mark.parametrize('title', EDGE_EVENT_TITLES)
+def test_read_event_matches_reference(title):
+    expected = get_result(read_event_reference, ('2025-03-04', title))
+    assert is_same(expected, get_result(read_event, ('2025-03-04', title)))
+
+
+def test_sample_vault_matches_reference():
+    task_args, event_args = get_inputs(SAMPLE_VAULT, SAMPLE_VAULT.dirpath / 'journals')
+    for args in task_args:
+        assert is_same(get_result(convert_to_task_reference, args),
+                       get_result(convert_to_task, args)), args
+    for args in event_args:
+        assert is_same(get_result(read_event_reference, args), get_result(read_event, args)), args
+
+
+def test_convert_to_task():
+    task = convert_to_task('[x] Jogging #gratitude ⏫ ✅ 2025-01-02 [duration:: 0.5]', 'Note').data
+    assert task['title'] == 'Jogging #gratitude ⏫ ✅ 2025-01-02 [duration:: 0.5]'
+    assert task['status'] == 'Done'
+    assert task['tags'] == ['gratitude']
+    assert task['fields'] == ['\\u23eb', '\\u2705']
+    assert task['priority'] == 'High'
+    assert task['Done Date'] == dt.datetime(2025, 1, 2)
+    assert task['duration'] == 0.5
+    assert task['type'] == 'todo'
+
+
+def test_convert_to_task_okr_fields():
+    task = convert_to_task(
+        '[ ] #task (okr:: [[OKR#O1 KR1 Ship]]) [Story Points:: 3] %% note %%', 'Note').data
+    assert task['title'] == '#task  [Story Points:: 3]'
+    assert task['okr'] == '[[OKR#O1 KR1 Ship]]'
+    assert task['Story Points'] == 3.0
+    assert task['type'] == 'task'
+
+
+def test_title_fields_errors():
+    with pytest.raises(ValueError):
+        get_title_fields('Bad date ✅ 2025-13-01')
+    with pytest.raises(IndexError):
+        get_title_fields('Last date ✅')
+    with pytest.raises(ValueError):
+        convert_to_task('[ ] #story #task', 'Note')
+
+
+def test_read_event():
+    assert read_event('2025-03-04', '11 PM - 1 AM Late') == {
+        'event_start': dt.datetime(2025, 3, 4, 23), 'event_end': dt.datetime(2025, 3, 5, 1),
+        'duration': 2.0}
+    assert read_event('2025-03-04', 'Not an event 7 - 9') is None
+    assert get_event_date('2025-03-04') == dt.datetime(2025, 3, 4)
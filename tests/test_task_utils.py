@@ -0,0 +1,85 @@
+import datetime as dt
+import numpy as np
+from src.note_utils import parse_text_for_tasks
+from src.task_utils import TaskTable, KeywordIndex, spread_marks
+
+OKR_TEXT = '''- [ ] Unmarked #task
+    - [ ] Child
+- [ ] Plan #story (okr:: [[OKR#O1 KR1 Ship]])
+    - [x] Write #task
+        - [x] Draft
+    - [ ] Other KR #task (okr:: [[OKR#O1 KR2 Learn]])
+        - [ ] Read
+- [ ] Learn #story (okr:: [[OKR#O1 KR2 Learn]])
+'''
+
+
+def test_spread_marks():
+    parents = np.array([-1, 0, 1, -1, 3, 0])
+    marked = np.array([False, True, False, False, False, False])
+    assert spread_marks(marked, parents).tolist() == [False, True, True, False, False, False]
+    assert spread_marks(np.zeros(6, dtype=bool), parents).tolist() == [False] * 6
+
+
+def test_filter_okrs():
+    table = TaskTable.from_tree(parse_text_for_tasks(OKR_TEXT, 'Note'))
+    okr_tasks = table.filter_okrs(['[[OKR#O1 KR1 Ship]]', '[[OKR#O1 KR2 Learn]]',
+                                   '[[OKR#O2 KR1 None]]'])
+    # A subtask inherits the OKR tag of its parent, whatever its own tag
+    assert list(okr_tasks['[[OKR#O1 KR1 Ship]]']['title']) == \
+        ['Plan #story', 'Write #task', 'Draft', 'Other KR #task', 'Read']
+    assert list(okr_tasks['[[OKR#O1 KR2 Learn]]']['title']) == \
+        ['Other KR #task', 'Read', 'Learn #story']
+    assert len(okr_tasks['[[OKR#O2 KR1 None]]']) == 0
+    assert list(table.filter_okr('[[OKR#O1 KR2 Learn]]').rows) == [5, 6, 7]
+
+
+def test_filter_okrs_of_selection():
+    table = TaskTable.concat([TaskTable.from_tree(parse_text_for_tasks(OKR_TEXT, note))
+                              for note in ['Note', 'Other']])
+    selection = table.select(table['file'] == 'Other')
+    # The tags are inherited through the full table, even from unselected rows
+    selection = selection.select(selection['title'] != 'Plan #story')
+    okr_tasks = selection.filter_okr('[[OKR#O1 KR1 Ship]]')
+    assert list(okr_tasks.rows) == [11, 12, 13, 14]
+    assert set(okr_tasks['file']) == {'Other'}
+
+
+def test_keyword_index():
+    titles = np.array(['Mindful breathing', 'JOGGING #Gratitude', 'jog', 'Body awareness',
+                       'Mindful jogging'], dtype=object)
+    index = KeywordIndex(titles)
+    # The keywords are matched ignoring the case
+    assert index.match(['jogging']).tolist() == [1, 4]
+    assert index.match(['#gratitude', 'MINDFUL']).tolist() == [0, 1, 4]
+    # A keyword & its prefix, or overlapping keywords, are all found
+    index = KeywordIndex(titles)
+    index.find(['jog', 'jogging', 'ging #grat', 'ful j', 'fully'])
+    assert index.match(['jog']).tolist() == [1, 2, 4]
+    assert index.match(['jogging']).tolist() == [1, 4]
+    assert index.match(['ging #grat']).tolist() == [1]
+    assert index.match(['ful j']).tolist() == [4]
+    assert index.match(['fully']).tolist() == []
+    assert index.match([]).tolist() == []
+    assert index.match(['']).tolist() == [0, 1, 2, 3, 4]
+    # A match never spans two titles
+    assert index.match(['breathingjogging', 'jogbody']).tolist() == []
+
+
+def test_keyword_index_rows():
+    titles = np.array(['Jogging', 'Jogging', 'Read', 'jogging'], dtype=object)
+    index = KeywordIndex(titles, np.array([1, 2, 3]))
+    assert index.match(['JOG']).tolist() == [1, 3]
+    text = '- [ ] Jogging\n- [ ] Mindful breathing\n'
+    table = TaskTable.concat([TaskTable.from_tree(parse_text_for_tasks(text, 'Note')),
+                              TaskTable.from_tree(parse_text_for_tasks(text, 'Day 1'),
+                                                  dt.date(2025, 1, 1)),
+                              TaskTable.from_tree(parse_text_for_tasks(text, 'Day 2'),
+                                                  dt.date(2025, 1, 2))])
+    # Only the tasks of the daily notes within the dates are matched
+    assert list(table.filter_keywords(['JOGGING']).rows) == [2, 4]
+    selection = table.select(table['file'] != 'Day 1')
+    assert list(selection.filter_keywords(['jogging', 'mindful'], dt.date(2025, 1, 2)).rows) \
+        == [4, 5]
+    # The index built for the selection is shared by the tables selected from it
+    assert selection.select(selection['status'] >= 0).keyword_index is selection.keyword_index
@@ -0,0 +1,123 @@
+import copy
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from dash import Patch
+from plotly.utils import PlotlyJSONEncoder
+from src.ui_utils import FigureCache, get_figure_patch, MAX_PATCHED_SHARE
+
+
+def get_figure(dates, scores, title='Jogging (daily)'):
+    return {'data': [{'x': pd.Series(pd.to_datetime(dates)), 'y': pd.Series(scores),
+                      'type': 'bar', 'name': 'score'}],
+            'layout': {'title': title, 'showlegend': False}}
+
+
+# Figure as the client has it once it applied a patch
+def apply_patch(figure, patch):
+    json.dumps(patch.to_plotly_json(), cls=PlotlyJSONEncoder)  # Can be sent
+    figure = copy.deepcopy(figure)
+    for trace in figure['data']:
+        trace['x'], trace['y'] = list(trace['x']), list(trace['y'])
+    for operation in patch.to_plotly_json()['operations']:
+        *location, last = operation['location']
+        target = figure
+        for key in location:
+            target = target[key]
+        if operation['operation'] == 'Assign':
+            target[last] = operation['params']['value']
+        elif operation['operation'] == 'Extend':
+            target[last].extend(operation['params']['value'])
+        else:
+            raise ValueError(f"Unexpected patch operation: {operation['operation']}")
+    return figure
+
+
+def assert_same_figure(figure, expected):
+    assert figure['layout'] == expected['layout']
+    assert len(figure['data']) == len(expected['data'])
+    for trace, expected_trace in zip(figure['data'], expected['data']):
+        for key, value in expected_trace.items():
+            if key in ('x', 'y'):
+                pd.testing.assert_series_equal(pd.Series(list(trace[key])),
+                                               pd.Series(list(value)))
+            else:
+                assert trace[key] == value
+
+
+def get_operations(patch):
+    return [(operation['operation'], operation['location'])
+            for operation in patch.to_plotly_json()['operations']]
+
+
+def test_figure_patch_changed_points():
+    dates = pd.date_range('2025-01-01', periods=20)
+    old_figure = get_figure(dates, np.arange(20.0))
+    scores = np.arange(20.0)
+    scores[[3, 17]] = [10, np.nan]
+    new_figure = get_figure(dates, scores)
+    patch = get_figure_patch(old_figure, new_figure)
+    assert isinstance(patch, Patch)
+    assert get_operations(patch) == [('Assign', ['data', 0, 'y', 3]),
+                                     ('Assign', ['data', 0, 'y', 17])]
+    assert_same_figure(apply_patch(old_figure, patch), new_figure)
+    # NaN values are not changes
+    assert get_operations(get_figure_patch(new_figure, new_figure)) == []
+
+
+def test_figure_patch_extended_dates():
+    old_figure = get_figure(pd.date_range('2025-01-01', periods=20), np.arange(20.0))
+    scores = np.arange(23.0)
+    scores[19] = 0
+    new_figure = get_figure(pd.date_range('2025-01-01', periods=23), scores,
+                            'Jogging (weekly)')
+    patch = get_figure_patch(old_figure, new_figure)
+    assert get_operations(patch) == [('Assign', ['data', 0, 'y', 19]),
+                                     ('Extend', ['data', 0, 'x']),
+                                     ('Extend', ['data', 0, 'y']),
+                                     ('Assign', ['layout'])]
+    assert_same_figure(apply_patch(old_figure, patch), new_figure)
+
+
+@pytest.mark.parametrize('n_points', [0, 3])
+def test_figure_patch_most_points_changed(n_points):
+    dates = pd.date_range('2025-01-01', periods=20)
+    old_figure = get_figure(dates, np.zeros(20))
+    scores = np.zeros(20 + n_points)
+    scores[:int(MAX_PATCHED_SHARE * 20) + 1] = 1
+    new_figure = get_figure(pd.date_range('2025-01-01', periods=20 + n_points), scores)
+    patch = get_figure_patch(old_figure, new_figure)
+    # The whole trace values are sent, along with the new dates
+    assert get_operations(patch) == [('Assign', ['data', 0, 'y'])] + \
+        [('Extend', ['data', 0, 'x'])] * (n_points > 0)
+    assert_same_figure(apply_patch(old_figure, patch), new_figure)
+
+
+def test_figure_patch_whole_figure():
+    dates = pd.date_range('2025-01-01', periods=20)
+    old_figure = get_figure(dates, np.arange(20.0))
+    # The dates do not just extend the shown ones
+    for new_dates in [dates[:19], dates + pd.Timedelta(days=1)]:
+        new_figure = get_figure(new_dates, np.arange(len(new_dates), dtype=float))
+        assert get_figure_patch(old_figure, new_figure) is new_figure
+    # The traces are not the same
+    new_figure = get_figure(dates, np.arange(20.0))
+    new_figure['data'][0]['type'] = 'line'
+    assert get_figure_patch(old_figure, new_figure) is new_figure
+    new_figure = get_figure(dates, np.arange(20.0))
+    new_figure['data'].append(new_figure['data'][0])
+    assert get_figure_patch(old_figure, new_figure) is new_figure
+
+
+def test_figure_patch_evicted_figure():
+    dates = pd.date_range('2025-01-01', periods=20)
+    figure_cache = FigureCache(maxsize=2)
+    figure_cache.get(1, 'habit', lambda: get_figure(dates, np.zeros(20)))
+    new_figure = figure_cache.get(2, 'habit', lambda: get_figure(dates, np.ones(20)))
+    assert figure_cache.peek(1, 'habit') is not None
+    figure_cache.get(2, 'okr', lambda: get_figure(dates, np.ones(20)))
+    # The figure shown by the client is no longer cached
+    assert figure_cache.peek(1, 'habit') is None
+    assert figure_cache.get(2, 'habit', lambda: None) is new_figure
+    assert get_figure_patch(figure_cache.peek(1, 'habit'), new_figure) is new_figure
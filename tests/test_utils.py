@@ -0,0 +1,147 @@
+import datetime as dt
+import numpy as np
+import pandas as pd
+import pytest
+from src.note_utils import parse_text_for_tasks
+from src.task_utils import TaskTable
+from src.utils import get_okr_pivot_data, get_habit_tracker_data, update_habit_tracker_data, \
+    get_habit_rollups, update_habit_rollups, rollup_scores, CRITERIA_COUNT, CRITERIA_DURATION, \
+    CRITERIA_STORY_POINTS, HABIT_ROLLUP_FREQS
+
+TODAY = dt.date.today()
+START_DATE = TODAY - dt.timedelta(days=400)
+# Daily notes of more than a year, with a jog every third day
+DAILY_TEXTS = {START_DATE + dt.timedelta(days=day): f'- [x] Jogging [duration:: {day % 4}]\n'
+               '- [x] Read #gratitude\n' for day in range(0, 401, 3)}
+
+
+# Task table of some daily notes, from their text keyed by their date
+def get_daily_tasks(daily_texts):
+    return TaskTable.concat([TaskTable.from_tree(parse_text_for_tasks(text, date.isoformat()),
+                                                 date)
+                             for date, text in sorted(daily_texts.items())])
+
+
+def test_okr_pivot_data_story_points():
+    tasks = TaskTable.from_tree(parse_text_for_tasks(
+        '- [ ] Ship #story (okr:: [[OKR#O1 KR1 Ship]])\n'
+        '    - [x] Plan #task [Story Points:: 2] ✅ 2025-01-02\n'
+        '    - [x] Build #task [Story Points:: 3] ✅ 2025-01-04\n'
+        '    - [x] Test #task [Story Points:: 1] ✅ 2025-01-04\n'
+        '    - [-] Dropped #task [Story Points:: 5] ✅ 2025-01-03\n'
+        '    - [ ] Release #task [Story Points:: 4]\n', 'Project'))
+    okr_data = {'O1 KR1 Ship': {'criteria': CRITERIA_STORY_POINTS, 'target': 0,
+                                'data': tasks.filter_okr('[[OKR#O1 KR1 Ship]]')}}
+    pivot_data = get_okr_pivot_data(okr_data, dt.date(2025, 1, 1), dt.date(2025, 1, 5))
+    # The points count on the day of their done date, read as a date-time, and
+    # the cancelled tasks do not count at all
+    assert pivot_data['score'].tolist() == [0, 2, 2, 6, 6]
+    assert okr_data['O1 KR1 Ship']['target'] == 10
+    assert pivot_data['target'].tolist() == [2, 4, 6, 8, 10]
+    assert np.allclose(pivot_data['target_70_pct'], [1.4, 2.8, 4.2, 5.6, 7])
+
+
+def test_okr_pivot_data_count_duration():
+    today = dt.date.today()
+    tasks = get_daily_tasks({
+        today - dt.timedelta(days=2): '- [x] Jogging [duration:: 0.5]\n- [x] Jogging\n',
+        today: '- [x] 7 AM - 8:30 AM Jogging\n'})
+    okr_data = {
+        'O2 KR1 Count': {'criteria': CRITERIA_COUNT, 'target': 6, 'data': tasks},
+        'O2 KR2 Duration': {'criteria': CRITERIA_DURATION, 'target': 3, 'data': tasks},
+        'O2 KR3 Other': {'criteria': 'other', 'target': 3, 'data': tasks}}
+    pivot_data = get_okr_pivot_data(okr_data, today - dt.timedelta(days=2),
+                                    today + dt.timedelta(days=3))
+    scores = dict(tuple(pivot_data.groupby('okr')['score']))
+    # No score for the days to come
+    np.testing.assert_array_equal(scores['O2 KR1 Count'], [2, 2, 3] + [np.nan] * 3)
+    np.testing.assert_array_equal(scores['O2 KR2 Duration'], [0.5, 0.5, 2] + [np.nan] * 3)
+    assert scores['O2 KR3 Other'].isna().all()
+    assert pivot_data['target'].tolist()[:6] == [1, 2, 3, 4, 5, 6]
+
+
+def edit_daily_texts(days_ago):
+    daily_texts = dict(DAILY_TEXTS)
+    edited_date = TODAY - dt.timedelta(days=days_ago)
+    daily_texts[edited_date] = '- [x] jogging [duration:: 2.5]\n- [x] Jogging again\n'
+    deleted_date = max(date for date in daily_texts if date < edited_date)
+    del daily_texts[deleted_date]
+    return daily_texts, {edited_date, deleted_date}
+
+
+@pytest.mark.parametrize('criteria', [CRITERIA_COUNT, CRITERIA_DURATION])
+def test_habit_tracker_data(criteria):
+    scores_df = get_habit_tracker_data('JOGGING', criteria, START_DATE,
+                                       get_daily_tasks(DAILY_TEXTS))
+    assert scores_df['date'].iloc[0].date() == START_DATE
+    assert scores_df['date'].iloc[-1].date() == TODAY
+    expected = {date: 1 if criteria == CRITERIA_COUNT else (date - START_DATE).days % 4
+                for date in DAILY_TEXTS}
+    assert scores_df['score'].tolist() == [expected.get(date.date(), 0)
+                                           for date in scores_df['date']]
+    assert (scores_df['week'].dt.dayofweek == 0).all()
+
+
+# The scores may be updated on the day they were computed or some days later
+@pytest.mark.parametrize('criteria', [CRITERIA_COUNT, CRITERIA_DURATION])
+@pytest.mark.parametrize('days_ago', [0, 200])
+@pytest.mark.parametrize('new_days', [0, 1, 40])
+def test_update_habit_tracker_data(criteria, days_ago, new_days):
+    scores_df = get_habit_tracker_data('jogging', criteria, START_DATE,
+                                       get_daily_tasks(DAILY_TEXTS))
+    scores_df = scores_df.iloc[:len(scores_df) - new_days]
+    old_scores_df = scores_df.copy()
+    daily_texts, changed_dates = edit_daily_texts(days_ago)
+    daily_tasks = get_daily_tasks(daily_texts)
+    updated_scores_df = update_habit_tracker_data(
+        scores_df, 'jogging', criteria, START_DATE, daily_tasks, changed_dates)
+    pd.testing.assert_frame_equal(updated_scores_df, get_habit_tracker_data(
+        'jogging', criteria, START_DATE, daily_tasks))
+    # The data may still be in use by the dashboard
+    pd.testing.assert_frame_equal(scores_df, old_scores_df)
+
+
+def test_rollup_scores():
+    dates = pd.date_range('2024-12-30', '2025-02-02')
+    scores_df = pd.DataFrame({'date': dates, 'score': np.arange(len(dates), dtype=float)})
+    pd.testing.assert_frame_equal(rollup_scores(scores_df, 'D'), scores_df)
+    weeks = rollup_scores(scores_df, 'W')
+    assert weeks['date'].tolist() == list(pd.date_range('2024-12-30', '2025-01-27', freq='W-MON'))
+    assert weeks['score'].tolist() == [21, 70, 119, 168, 217]
+    months = rollup_scores(scores_df, 'M')
+    assert months['date'].tolist() == [pd.Timestamp(date) for date in
+                                       ['2024-12-01', '2025-01-01', '2025-02-01']]
+    assert months['score'].tolist() == [1, sum(range(2, 33)), 33 + 34]
+    years = rollup_scores(scores_df, 'Y')
+    assert years['score'].tolist() == [1, sum(range(2, 35))]
+
+
+@pytest.mark.parametrize('days_ago', [0, 200, 399])
+@pytest.mark.parametrize('new_days', [0, 1, 40])
+def test_update_habit_rollups(days_ago, new_days):
+    scores_df = get_habit_tracker_data('jogging', CRITERIA_DURATION, START_DATE,
+                                       get_daily_tasks(DAILY_TEXTS))
+    scores_df = scores_df.iloc[:len(scores_df) - new_days]
+    rollups = get_habit_rollups(scores_df)
+    daily_texts, changed_dates = edit_daily_texts(days_ago)
+    daily_tasks = get_daily_tasks(daily_texts)
+    updated_scores_df = update_habit_tracker_data(
+        scores_df, 'jogging', CRITERIA_DURATION, START_DATE, daily_tasks, changed_dates)
+    updated_rollups = update_habit_rollups(rollups, updated_scores_df, changed_dates)
+    expected_rollups = get_habit_rollups(get_habit_tracker_data(
+        'jogging', CRITERIA_DURATION, START_DATE, daily_tasks))
+    assert list(updated_rollups) == HABIT_ROLLUP_FREQS
+    for freq in HABIT_ROLLUP_FREQS:
+        pd.testing.assert_frame_equal(updated_rollups[freq], expected_rollups[freq])
+        # The rollups may still be in use by the dashboard
+        pd.testing.assert_frame_equal(rollups[freq], get_habit_rollups(scores_df)[freq])
+
+
+def test_update_habit_rollups_unchanged():
+    scores_df = get_habit_tracker_data('jogging', CRITERIA_COUNT, START_DATE,
+                                       get_daily_tasks(DAILY_TEXTS))
+    rollups = get_habit_rollups(scores_df)
+    assert update_habit_rollups(rollups, scores_df, set()) is rollups
+    # Changes before the start date of the habit do not count
+    assert update_habit_rollups(rollups, scores_df,
+                                {START_DATE - dt.timedelta(days=1)}) is rollups
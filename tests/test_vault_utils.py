@@ -0,0 +1,107 @@
+import datetime as dt
+import pathlib
+import pytest
+from src.vault_utils import Vault, JournalIndex, get_note_date, get_front_matter_date, \
+    parse_front_matter
+
+
+@pytest.fixture
+def vault_dir(tmp_path):
+    for relpath in ['Note.md', 'notes/Other.md', 'journals/2025-01-01 Wednesday.md',
+                    'journals/2025-01-03 Friday.md', 'journals/2024/2024-12-31 Tuesday.md',
+                    'journals/Ideas.md', '.obsidian/Hidden.md', 'notes/image.png']:
+        (tmp_path / relpath).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / relpath).write_text('- [ ] Task\n', encoding='utf-8')
+    return tmp_path
+
+
+def test_vault_scan(vault_dir):
+    vault = Vault(vault_dir)
+    assert vault.md_file_index['Other'] == pathlib.Path('notes/Other.md')
+    assert '2024-12-31 Tuesday' in vault.md_file_index
+    assert 'Hidden' not in vault.md_file_index
+    assert 'image' not in vault.md_file_index
+    assert sorted(vault.get_notes_in(vault_dir / 'journals')) == \
+        ['2024-12-31 Tuesday', '2025-01-01 Wednesday', '2025-01-03 Friday', 'Ideas']
+
+
+def test_vault_update_create_modify_delete(vault_dir):
+    vault = Vault(vault_dir)
+    (vault_dir / 'notes' / 'New.md').write_text('- [x] Done\n', encoding='utf-8')
+    (vault_dir / 'Note.md').write_text('- [ ] Longer task\n', encoding='utf-8')
+    (vault_dir / 'notes' / 'Other.md').unlink()
+    updated = vault.update([vault_dir / 'notes' / 'New.md', vault_dir / 'Note.md',
+                            vault_dir / 'notes' / 'Other.md'])
+    assert updated.md_file_index['New'] == pathlib.Path('notes/New.md')
+    assert updated.file_stats['Note'][1] == len('- [ ] Longer task\n')
+    assert 'Other' not in updated.md_file_index and 'Other' not in updated.file_stats
+    assert updated.get_notes_in(vault_dir / 'notes') == ['New']
+    # The vault it was updated from is left unchanged
+    assert 'New' not in vault.md_file_index
+    assert vault.get_notes_in(vault_dir / 'notes') == ['Other']
+
+
+# The watcher may report the old path of a renamed note before or after the new one
+@pytest.mark.parametrize('old_first', [True, False])
+def test_vault_update_rename(vault_dir, old_first):
+    vault = Vault(vault_dir)
+    (vault_dir / 'notes' / 'Other.md').rename(vault_dir / 'Other.md')
+    paths = [vault_dir / 'notes' / 'Other.md', vault_dir / 'Other.md']
+    updated = vault.update(paths if old_first else paths[::-1])
+    assert updated.md_file_index['Other'] == pathlib.Path('Other.md')
+    assert updated.get_notes_in(vault_dir / 'notes') == []
+    assert sorted(updated.get_notes_in(vault_dir)) == sorted(vault.md_file_index)
+
+
+def test_vault_update_ignores_other_files(vault_dir, tmp_path_factory):
+    vault = Vault(vault_dir)
+    (vault_dir / '.obsidian' / 'New.md').write_text('', encoding='utf-8')
+    (vault_dir / 'notes' / 'new.txt').write_text('', encoding='utf-8')
+    outside = tmp_path_factory.mktemp('outside') / 'Outside.md'
+    outside.write_text('', encoding='utf-8')
+    updated = vault.update([vault_dir / '.obsidian' / 'New.md', vault_dir / 'notes' / 'new.txt',
+                            outside])
+    assert updated.md_file_index == vault.md_file_index
+
+
+def test_journal_index_ranges(vault_dir):
+    index = JournalIndex(Vault(vault_dir), vault_dir / 'journals')
+    assert index.notes == ['2024-12-31 Tuesday', '2025-01-01 Wednesday', '2025-01-03 Friday']
+    assert len(index) == 3
+    assert 'Ideas' not in index and '2025-01-01 Wednesday' in index
+    assert index.get_date('2025-01-03 Friday') == dt.date(2025, 1, 3)
+    assert index.get_date('Ideas') is None
+    assert index.get_notes() == index.notes
+    # Both dates are included
+    assert index.get_notes(dt.date(2025, 1, 1), dt.date(2025, 1, 3)) == \
+        ['2025-01-01 Wednesday', '2025-01-03 Friday']
+    assert index.get_notes(dt.date(2025, 1, 2)) == ['2025-01-03 Friday']
+    assert index.get_notes(end_date=dt.date(2025, 1, 2)) == \
+        ['2024-12-31 Tuesday', '2025-01-01 Wednesday']
+    assert index.get_notes(dt.date(2025, 1, 2), dt.date(2025, 1, 2)) == []
+    assert index.get_notes(dt.date(2025, 1, 4)) == []
+    assert index.get_notes(dt.date(2025, 1, 3), dt.date(2025, 1, 1)) == []
+
+
+def test_note_dates():
+    assert get_note_date('2025-01-04 Saturday') == dt.date(2025, 1, 4)
+    assert get_note_date('2025-01-04') == dt.date(2025, 1, 4)
+    assert get_note_date('Ideas 2025-01-04') is None
+    assert get_note_date('') is None
+
+
+def test_front_matter_dates():
+    assert get_front_matter_date(dt.date(2025, 1, 4)) == dt.date(2025, 1, 4)
+    assert get_front_matter_date(dt.datetime(2025, 1, 4, 10, 30)) == dt.date(2025, 1, 4)
+    assert get_front_matter_date('2025-01-04') == dt.date(2025, 1, 4)
+    assert get_front_matter_date('2025-01-04T10:30') == dt.date(2025, 1, 4)
+    with pytest.raises(ValueError):
+        get_front_matter_date('January 4th')
+    with pytest.raises(ValueError):
+        get_front_matter_date(None)
+    # YAML reads the dates as dates, date-times or strings, depending on their form
+    front_matter = parse_front_matter(['---\n', 'start_date: 2025-01-04\n',
+                                       'end_date: 2025-01-04 10:30:00\n',
+                                       'quoted_date: "2025-01-04"\n', '---\n'])
+    assert {key: get_front_matter_date(value) for key, value in front_matter.items()} == \
+        dict.fromkeys(['start_date', 'end_date', 'quoted_date'], dt.date(2025, 1, 4))